@@ -3,24 +3,61 @@ FastAPI Backend Module
 Exposes the RCA graph as API endpoints for interactive execution
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple
+import asyncio
+import copy
+import json
+import threading
+import time
 import uuid
 import os
 
 from app.graph_compiler import compile_graph
 from app.helpers import RCAState
+from app.inference_executor import run_io, run_node, shutdown_executors, speculation_pool, node_pool
+from app.config import (
+    SPECULATIVE_NEXT_QUESTION,
+    SESSION_SWEEP_INTERVAL_SECONDS,
+    INCIDENT_INDEX_ENABLED,
+    INCIDENT_INDEX_PATH,
+    INCIDENT_MATCH_THRESHOLD,
+    INCIDENT_MATCH_TOP_K,
+    VALIDATE_BATCH_MAX_ITEMS,
+    REPORT_DIR,
+    REPORT_RENDER_CACHE_SIZE
+)
+from app.incident_index import IncidentIndex, incident_document
+from app.jobs import JobRunner, create_job_store
+from app.metrics import registry
+from app.output_limits import deferred_lengths, record_lengths
+from app.report_store import FORMATS as REPORT_FORMATS, ReportStore
+from app.tracing import bind, chrome_trace, session_trace, span
+from app.session_store import SessionConflict, create_session_store
 
 # FastAPI app
 api_app = FastAPI(title="RCA Analysis API", version="1.0.0")
 
-# Global storage for sessions
-sessions: Dict[str, Dict[str, Any]] = {}
+# Session storage (SQLite by default, see session_store.py)
+session_store = create_session_store()
+
+# Session steps submitted through /jobs, run on the node pool and polled
+job_runner = JobRunner(create_job_store(), node_pool)
+
+# Generated reports per session, downloadable as Markdown, HTML or JSON
+report_store = ReportStore(REPORT_DIR, REPORT_RENDER_CACHE_SIZE)
+
+# Completed analyses, searched for similar incidents at /start
+incident_index = IncidentIndex(INCIDENT_INDEX_PATH) if INCIDENT_INDEX_ENABLED else None
 
 # Compiled graph (loaded once)
 rca_graph = None
 
+# Strong references to running streaming steps
+_background_tasks = set()
+
 class StartAnalysisRequest(BaseModel):
     problem: str
 
@@ -47,26 +84,146 @@ class SessionResponse(BaseModel):
     report: Optional[str] = None
     confidence_score: Optional[float] = None
     report_file: Optional[str] = None
+    
+    # Prior analyses similar to this problem (returned by /start)
+    similar_incidents: Optional[List[Dict[str, Any]]] = None
+    seeded_from: Optional[str] = None
 
-@api_app.on_event("startup")
-async def startup_event():
-    """Load model and compile graph on startup"""
+class JobResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str  # queued, running, succeeded, failed or cancelled
+    session_id: Optional[str] = None
+    progress: Dict[str, Any]  # generated_chars and the text generated so far
+    result: Optional[SessionResponse] = None
+    error: Optional[Dict[str, Any]] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+class ValidationItem(BaseModel):
+    question: str
+    answer: str
+
+class ValidateBatchRequest(BaseModel):
+    items: List[ValidationItem]
+
+class ValidationScore(BaseModel):
+    specificity: float
+    relevance: float
+    quality_score: float
+    needs_improvement: bool
+    suggestion: str
+
+class ValidateBatchResponse(BaseModel):
+    results: List[ValidationScore]
+    elapsed_seconds: float
+    answers_per_second: float
+
+def _load_in_background():
+    """Load and warm up the models, then compile the graph (see /ready)"""
     global rca_graph
     from app.model_loading import load_model
     
+    try:
+        load_model()
+        rca_graph = compile_graph()
+        print("FastAPI server ready!")
+    except Exception as e:
+        print(f"Model loading failed: {e}")
+
+def _require_ready():
+    """Dependency of endpoints that need the models"""
+    from app.model_loading import load_status, models_ready
+    
+    if not models_ready():
+        if load_status["state"] == "failed":
+            raise HTTPException(status_code=503, detail=f"Model loading failed: {load_status['error']}")
+        raise HTTPException(status_code=503, detail="Models are still loading", headers={"Retry-After": "5"})
+
+@api_app.on_event("startup")
+async def startup_event():
+    """Start loading the models and register background tasks"""
     print("Starting up FastAPI server...")
-    load_model()
-    rca_graph = compile_graph()
-    print("FastAPI server ready!")
+    # Loading runs in the background so /health and /ready answer meanwhile
+    threading.Thread(target=_load_in_background, name="rca-model-load", daemon=True).start()
+    
+    # Evicted or expired sessions no longer need their KV snapshots
+    from app.model_loading import discard_session_state
+    session_store.add_eviction_listener(discard_session_state)
+    
+    task = asyncio.ensure_future(_sweep_sessions())
+    _background_tasks.add(task)
 
-@api_app.post("/start", response_model=SessionResponse)
-async def start_analysis(request: StartAnalysisRequest):
-    """Start a new RCA analysis session"""
+@api_app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the inference workers and finish queued report writes"""
+    shutdown_executors(wait=False)
+    report_store.shutdown(wait=True)
+
+# ============================================================================
+# SESSION STEPS
+# Blocking implementations shared by the JSON and the streaming endpoints.
+# They run on the node pool; on_token receives generated text as it streams.
+# ============================================================================
+
+def _find_similar_incidents(problem: str) -> List[Dict[str, Any]]:
+    """Nearest completed analyses to a new problem, best first"""
+    if incident_index is None or len(incident_index) == 0:
+        return []
+    
+    from app.model_loading import generate_embedding
+    
+    try:
+        vector = generate_embedding(problem)
+    except Exception as e:
+        print(f"Similar-incident lookup failed: {e}")
+        return []
+    
+    return [
+        {
+            "session_id": record.get("session_id"),
+            "problem": record.get("problem"),
+            "root_cause": record.get("root_cause"),
+            "first_question": record.get("first_question"),
+            "score": round(score, 4)
+        }
+        for score, record in incident_index.search(vector, INCIDENT_MATCH_TOP_K)
+    ]
+
+def _seed_first_question(state: RCAState, question: str) -> RCAState:
+    """Use a prior analysis' first question instead of running why_asker"""
+    # Same fields why_asker sets
+    state["why_no"] = 1
+    state["current_question"] = question
+    state["needs_validation"] = True
+    state["retry_count"] = 0
+    return state
+
+def _index_completed_session(session_id: str, state: RCAState):
+    """Add a finished analysis to the incident index"""
+    from app.model_loading import generate_embedding
+    
+    try:
+        # Matched by its problem, like the query at /start; the full analysis is metadata
+        incident_index.add(generate_embedding(state["problem"]), {
+            "session_id": session_id,
+            "problem": state["problem"],
+            "document": incident_document(state["problem"], state["whys"], state["root_cause"]),
+            "root_cause": state["root_cause"],
+            "first_question": state["whys"][0]["question"] if state["whys"] else "",
+            "whys": [{"question": w["question"], "answer": w["answer"]} for w in state["whys"]]
+        })
+    except Exception as e:
+        print(f"Could not index session {session_id}: {e}")
+
+def _start_session(problem: str, on_token=None) -> SessionResponse:
+    """Create a session and generate the first why question"""
     session_id = str(uuid.uuid4())
     
     # Initialize state
     state: RCAState = {
-        "problem": request.problem,
+        "problem": problem,
         "why_no": 0,
         "whys": [],
         "root_cause": "",
@@ -79,31 +236,153 @@ async def start_analysis(request: StartAnalysisRequest):
         "needs_improvement": False,
         "improvement_suggestion": "",
         "improved_input": "",
-        "early_root_cause_found": False  # NEW FIELD ADDED
+        "early_root_cause_found": False,  # NEW FIELD ADDED
+        "session_id": session_id
     }
     
-    from app.node_definitions import why_asker
-    state = why_asker(state)
+    trace_events = []
+    with session_trace(trace_events, "start"):
+        # A near-identical prior incident supplies the first question directly
+        similar = _find_similar_incidents(problem)
+        seed = similar[0] if similar else None
+        if seed and seed["score"] >= INCIDENT_MATCH_THRESHOLD and seed["first_question"]:
+            print(f"Reusing first question from similar incident {seed['session_id']} (score {seed['score']})")
+            state = _seed_first_question(state, seed["first_question"])
+            if on_token is not None:
+                on_token(seed["first_question"])
+        else:
+            seed = None
+            from app.node_definitions import why_asker
+            state = why_asker(state, on_token=on_token)
     
-    sessions[session_id] = {
+    session_store.put(session_id, {
         "state": state,
-        "completed": False
-    }
+        "completed": False,
+        "trace": trace_events
+    })
     
     return SessionResponse(
         session_id=session_id,
         current_question=state.get("current_question"),
         why_no=state["why_no"],
-        needs_improvement=False
+        needs_improvement=False,
+        similar_incidents=similar or None,
+        seeded_from=seed["session_id"] if seed else None
     )
 
-@api_app.post("/answer", response_model=SessionResponse)
-async def submit_answer(request: AnswerRequest):
-    """Submit an answer and get the next question OR the root cause"""
-    if request.session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+def _speculate_next_question(state: RCAState):
+    """
+    Start generating the next why question on a copy of the state, assuming
+    the current answer will be accepted
+    Returns (future, streamed_text, snapshot_id) or None when no next question can follow
+    """
+    if not SPECULATIVE_NEXT_QUESTION or state["why_no"] >= 5:
+        return None
+    
+    speculative_state = copy.deepcopy(state)
+    speculative_state["whys"].append({
+        "question": state.get("current_question", ""),
+        "answer": state.get("improved_input", "") or state.get("user_input", ""),
+        "quality_score": 0.0  # Not used by the why prompt
+    })
+    speculative_state["needs_validation"] = False
+    
+    # The run starts from the session's KV snapshot but saves its own under a
+    # separate id, which only replaces the session's once the result is used
+    snapshot_id = f"{state['session_id']}.speculative-{uuid.uuid4().hex[:8]}"
+    
+    # Buffer the streamed text; it is only forwarded if the result is used
+    streamed_text = []
+    future = speculation_pool.submit(bind(_speculative_why), speculative_state, streamed_text.append, snapshot_id)
+    return future, streamed_text, snapshot_id
+
+def _speculative_why(state: RCAState, on_token, snapshot_id: str):
+    """
+    why_asker on the speculation pool, marked as such on the session trace
+    Returns (state, output lengths to record if the result is used)
+    """
+    from app.node_definitions import why_asker
+    from app.model_loading import speculative_snapshot
     
-    session = sessions[request.session_id]
+    with span("speculative_next_question", "speculation", why_no=state["why_no"] + 1):
+        with deferred_lengths() as lengths, speculative_snapshot(snapshot_id):
+            return why_asker(state, on_token=on_token), lengths
+
+def _commit_speculation(speculation, state: RCAState, on_token=None):
+    """
+    Apply a speculative why question to the validated state
+    Returns None if the speculative run failed
+    """
+    from app.model_loading import discard_session_state, promote_session_state
+    
+    future, streamed_text, snapshot_id = speculation
+    try:
+        speculative_state, lengths = future.result()
+    except Exception as e:
+        print(f"Speculative question generation failed, regenerating: {e}")
+        discard_session_state(snapshot_id)
+        return None
+    
+    promote_session_state(snapshot_id, state["session_id"])
+    record_lengths(lengths)
+    # Same fields why_asker sets
+    state["why_no"] = speculative_state["why_no"]
+    state["current_question"] = speculative_state["current_question"]
+    state["needs_validation"] = True
+    state["retry_count"] = 0
+    # A summary the speculative run made of older whys applies here as well
+    if "whys_summary" in speculative_state:
+        state["whys_summary"] = speculative_state["whys_summary"]
+    
+    if on_token is not None and streamed_text:
+        on_token("".join(streamed_text))
+    return state
+
+def _discard_speculation(speculation):
+    """Drop a speculative run whose answer was not accepted"""
+    from app.model_loading import discard_session_state
+    
+    if speculation is not None:
+        future, _, snapshot_id = speculation
+        future.cancel()
+        # A run already in progress saves its snapshot when it finishes
+        future.add_done_callback(lambda _: discard_session_state(snapshot_id))
+
+def _load_session(session_id: str) -> Dict[str, Any]:
+    """Fetch a session or fail with 404"""
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+def _load_session_version(session_id: str) -> Tuple[Dict[str, Any], int]:
+    """Fetch a session and its version for a step that saves it back, or fail with 404"""
+    found = session_store.get_with_version(session_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return found
+
+def _save_session(session_id: str, session: Dict[str, Any], version: int):
+    """
+    Save a step's session if nobody saved it since it was loaded, or fail with 409
+    The session lock only serializes steps within this API worker
+    """
+    try:
+        session_store.put(session_id, session, version=version)
+    except SessionConflict:
+        raise HTTPException(status_code=409, detail="Session was changed by another request; reload it and retry")
+
+def _answer_session(request: AnswerRequest, on_token=None) -> SessionResponse:
+    """Validate an answer, then ask the next question or extract the root cause"""
+    with session_store.lock(request.session_id):
+        session, version = _load_session_version(request.session_id)
+        with session_trace(session.setdefault("trace", []), "answer", why_no=session["state"]["why_no"]):
+            response = _apply_answer(session, request, on_token)
+        _save_session(request.session_id, session, version)
+        return response
+
+def _apply_answer(session: Dict[str, Any], request: AnswerRequest, on_token=None) -> SessionResponse:
+    """Run the answer step on a loaded session (mutates session)"""
     state = session["state"]
     
     state["user_input"] = request.answer
@@ -113,11 +392,20 @@ async def submit_answer(request: AnswerRequest):
     from app.node_definitions import answer_validator, why_asker, root_cause_extractor
     from app.graph_builder import should_continue_or_validate
     
+    # Generate the next question on the generator while the validator runs
+    speculation = _speculate_next_question(state)
+    
     # Validate
-    state = answer_validator(state)
+    try:
+        state = answer_validator(state)
+    except BaseException:
+        _discard_speculation(speculation)
+        raise
+    session["state"] = state
     
     # Improvement check
     if state.get("needs_improvement", False) and not request.improved_answer:
+        _discard_speculation(speculation)
         return SessionResponse(
             session_id=request.session_id,
             current_question=state.get("current_question"),
@@ -130,7 +418,9 @@ async def submit_answer(request: AnswerRequest):
     next_step = should_continue_or_validate(state)
     
     if next_step == "continue":
-        state = why_asker(state)
+        committed = _commit_speculation(speculation, state, on_token) if speculation else None
+        if committed is None:
+            state = why_asker(state, on_token=on_token)
         session["state"] = state
         return SessionResponse(
             session_id=request.session_id,
@@ -141,8 +431,11 @@ async def submit_answer(request: AnswerRequest):
         )
     
     elif next_step == "extract":
+        # Early stop fired (or Why 5 done): the speculative question is not needed
+        _discard_speculation(speculation)
+        
         # Only run extractor, pause before report generation
-        state = root_cause_extractor(state)
+        state = root_cause_extractor(state, on_token=on_token)
         session["state"] = state
         
         return SessionResponse(
@@ -157,45 +450,377 @@ async def submit_answer(request: AnswerRequest):
     
     return SessionResponse(session_id=request.session_id, why_no=state["why_no"])
 
-@api_app.post("/generate_report", response_model=SessionResponse)
-async def generate_report_endpoint(request: GenerateReportRequest):
-    """Separate endpoint to generate report after root cause extraction"""
-    if request.session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
+def _generate_session_report(session_id: str, on_token=None) -> SessionResponse:
+    """Generate the report for a session whose root cause has been extracted"""
+    with session_store.lock(session_id):
+        session, version = _load_session_version(session_id)
+        state = session["state"]
         
-    session = sessions[request.session_id]
-    state = session["state"]
+        from app.node_definitions import report_generator
+        from app.model_loading import discard_session_state
+        
+        with session_trace(session.setdefault("trace", []), "generate_report"):
+            state = report_generator(state, on_token=on_token)
+        session["state"] = state
+        session["completed"] = True
+        _save_session(session_id, session, version)
     
-    from app.node_definitions import report_generator
+    # Written to disk in the background
+    report_store.save(session_id, state)
     
-    state = report_generator(state)
-    session["state"] = state
-    session["completed"] = True
+    # No more generator calls for this session
+    discard_session_state(session_id)
+    
+    # Index in the background so the report is returned right away
+    if incident_index is not None:
+        node_pool.submit(_index_completed_session, session_id, copy.deepcopy(state))
     
     return SessionResponse(
-        session_id=request.session_id,
+        session_id=session_id,
         why_no=state["why_no"],
         completed=True,
         root_cause_extracted=True,
         root_cause=state["root_cause"],
         report=state["report"],
         confidence_score=state["confidence_score"],
-        report_file="rca_report.md"
+        report_file=f"/report/{session_id}/download"
+    )
+
+async def _sweep_sessions():
+    """Background task deleting sessions nobody has touched within the TTL"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        try:
+            expired = await run_io(session_store.sweep)
+            if expired:
+                print(f"Swept {len(expired)} expired session(s)")
+            await run_io(job_runner.store.sweep)
+        except Exception as e:
+            print(f"Session sweep failed: {e}")
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def step_events(step, *args) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run a session step on the node pool and iterate over its events:
+    ("token", {"text"}) while text is generated, then one ("done", SessionResponse
+    payload) or ("error", {"status_code", "detail"})
+    """
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def on_token(text: str):
+        loop.call_soon_threadsafe(events.put_nowait, ("token", {"text": text}))
+    
+    async def run():
+        try:
+            response = await run_node(step, *args, on_token=on_token)
+            await events.put(("done", response.model_dump()))
+        except HTTPException as e:
+            await events.put(("error", {"status_code": e.status_code, "detail": e.detail}))
+        except Exception as e:
+            await events.put(("error", {"status_code": 500, "detail": str(e)}))
+    
+    # The step keeps running if the client disconnects, so the session stays consistent
+    task = asyncio.ensure_future(run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    
+    async def drain():
+        while True:
+            event, data = await events.get()
+            yield event, data
+            if event != "token":
+                break
+    
+    return drain()
+
+def _stream_step(step, *args) -> StreamingResponse:
+    """Run a session step and stream its events as server-sent events"""
+    events = step_events(step, *args)
+    
+    async def event_source():
+        async for event, data in events:
+            yield _sse_event(event, data)
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def local_step_events(kind: str, payload: Dict[str, Any]) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    In-process equivalent of POST /{kind}/stream for a UI mounted on api_app:
+    same request body, same events, no HTTP round trip
+    """
+    try:
+        _require_ready()
+        if kind == "start":
+            events = step_events(_start_session, StartAnalysisRequest(**payload).problem)
+        elif kind == "answer":
+            events = step_events(_answer_session, AnswerRequest(**payload))
+        elif kind == "generate_report":
+            events = step_events(_generate_session_report, GenerateReportRequest(**payload).session_id)
+        else:
+            raise HTTPException(status_code=404, detail=f"Unknown step: {kind}")
+    except HTTPException as e:
+        yield "error", {"status_code": e.status_code, "detail": e.detail}
+        return
+    
+    async for event, data in events:
+        yield event, data
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+@api_app.post("/start", response_model=SessionResponse, dependencies=[Depends(_require_ready)])
+async def start_analysis(request: StartAnalysisRequest):
+    """Start a new RCA analysis session"""
+    # LLM calls run on the inference workers, not the event loop
+    return await run_node(_start_session, request.problem)
+
+@api_app.post("/answer", response_model=SessionResponse, dependencies=[Depends(_require_ready)])
+async def submit_answer(request: AnswerRequest):
+    """Submit an answer and get the next question OR the root cause"""
+    return await run_node(_answer_session, request)
+
+@api_app.post("/generate_report", response_model=SessionResponse, dependencies=[Depends(_require_ready)])
+async def generate_report_endpoint(request: GenerateReportRequest):
+    """Separate endpoint to generate report after root cause extraction"""
+    return await run_node(_generate_session_report, request.session_id)
+
+@api_app.post("/start/stream", dependencies=[Depends(_require_ready)])
+async def start_analysis_stream(request: StartAnalysisRequest):
+    """Streaming version of /start (server-sent events)"""
+    return _stream_step(_start_session, request.problem)
+
+@api_app.post("/answer/stream", dependencies=[Depends(_require_ready)])
+async def submit_answer_stream(request: AnswerRequest):
+    """Streaming version of /answer (server-sent events)"""
+    if not await run_io(session_store.exists, request.session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return _stream_step(_answer_session, request)
+
+@api_app.post("/generate_report/stream", dependencies=[Depends(_require_ready)])
+async def generate_report_stream(request: GenerateReportRequest):
+    """Streaming version of /generate_report (server-sent events)"""
+    if not await run_io(session_store.exists, request.session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return _stream_step(_generate_session_report, request.session_id)
+
+@api_app.post("/jobs/start", response_model=JobResponse, status_code=202, dependencies=[Depends(_require_ready)])
+async def start_analysis_job(request: StartAnalysisRequest):
+    """Queue /start as a job; poll GET /jobs/{job_id} for the result"""
+    return await run_io(job_runner.submit, "start", _start_session, request.problem)
+
+@api_app.post("/jobs/answer", response_model=JobResponse, status_code=202, dependencies=[Depends(_require_ready)])
+async def submit_answer_job(request: AnswerRequest):
+    """Queue /answer as a job"""
+    if not await run_io(session_store.exists, request.session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return await run_io(job_runner.submit, "answer", _answer_session, request, session_id=request.session_id)
+
+@api_app.post("/jobs/generate_report", response_model=JobResponse, status_code=202,
+              dependencies=[Depends(_require_ready)])
+async def generate_report_job(request: GenerateReportRequest):
+    """Queue /generate_report as a job"""
+    if not await run_io(session_store.exists, request.session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return await run_io(job_runner.submit, "generate_report", _generate_session_report, request.session_id,
+                        session_id=request.session_id)
+
+@api_app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Status, progress and (once succeeded) result of a job"""
+    record = await run_io(job_runner.get, job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return record
+
+@api_app.delete("/jobs/{job_id}", response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job; its session stays as before the step"""
+    record = await run_io(job_runner.cancel, job_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return record
+
+@api_app.post("/validate_batch", response_model=ValidateBatchResponse, dependencies=[Depends(_require_ready)])
+async def validate_batch(request: ValidateBatchRequest):
+    """Score many (question, answer) pairs without creating or changing sessions"""
+    if len(request.items) > VALIDATE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {VALIDATE_BATCH_MAX_ITEMS} items per batch"
+        )
+    
+    from app.node_definitions import validate_answers
+    
+    started = time.perf_counter()
+    results = await run_node(validate_answers, [(item.question, item.answer) for item in request.items])
+    elapsed = time.perf_counter() - started
+    
+    return ValidateBatchResponse(
+        results=[ValidationScore(**r) for r in results],
+        elapsed_seconds=round(elapsed, 3),
+        answers_per_second=round(len(results) / elapsed, 2) if elapsed > 0 else 0.0
     )
 
 @api_app.get("/report/{session_id}")
 async def get_report(session_id: str):
-    if session_id not in sessions:
-        raise HTTPException(status_code=404, detail="Session not found")
-    session = sessions[session_id]
+    session = await run_io(_load_session, session_id)
     state = session["state"]
     return {
         "report": state.get("report", ""),
         "confidence_score": state.get("confidence_score", 0.0),
         "root_cause": state.get("root_cause", ""),
-        "report_file": "rca_report.md"
+        "report_file": f"/report/{session_id}/download"
     }
 
+def _chunks(body: bytes, size: int = 64 * 1024):
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+@api_app.get("/report/{session_id}/download")
+async def download_report(session_id: str, request: Request, format: str = "md"):
+    """
+    The session's report as a Markdown, HTML or JSON file
+    gzip-encoded when the client accepts it; 304 when If-None-Match matches the ETag
+    """
+    if format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(REPORT_FORMATS)}")
+    rendered = await run_io(report_store.render, session_id, format)
+    if rendered is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    
+    gzipped = "gzip" in request.headers.get("accept-encoding", "")
+    etag = f'"{rendered["etag"]}-gz"' if gzipped else f'"{rendered["etag"]}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    
+    body = rendered["gzip"] if gzipped else rendered["body"]
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    headers["Content-Length"] = str(len(body))
+    headers["Content-Disposition"] = f'attachment; filename="{rendered["filename"]}"'
+    return StreamingResponse(_chunks(body), media_type=rendered["media_type"], headers=headers)
+
+@api_app.get("/trace/{session_id}")
+async def get_trace(session_id: str):
+    """
+    Timeline of the session's steps, nodes and LLM calls as a Chrome trace
+    (open in chrome://tracing or https://ui.perfetto.dev)
+    """
+    session = await run_io(_load_session, session_id)
+    return JSONResponse(
+        content=chrome_trace(session_id, session.get("trace", [])),
+        headers={"Content-Disposition": f'attachment; filename="rca-trace-{session_id}.json"'}
+    )
+
+@api_app.delete("/session/{session_id}")
+async def delete_session(session_id: str):
+    """Discard a session (e.g. when the UI starts a new analysis)"""
+    await run_io(session_store.delete, session_id)
+    try:
+        report_store.delete(session_id)
+    except ValueError:
+        pass
+    return {"deleted": session_id}
+
+@api_app.get("/ready")
+async def readiness_check(probe: bool = False):
+    """
+    200 with load and warm-up timings once the models are ready, 503 before
+    probe=true runs a fresh one-token decode per model
+    """
+    from app import model_loading
+    
+    status = model_loading.load_status
+    if not model_loading.models_ready() or rca_graph is None:
+        return JSONResponse(
+            status_code=503,
+            content={"ready": False, "state": status["state"], "error": status["error"]}
+        )
+    
+    body = {"ready": True, **status["timings"]}
+    if probe:
+        body["probe_seconds"] = await run_node(model_loading.backend.warmup)
+    return body
+
+# Values read once per /metrics scrape, shared by the metric callbacks below
+_scrape = {"inference": {}, "caches": {}, "sessions": 0}
+_scrape_lock = threading.Lock()
+
+def _token_totals(field: str):
+    def values():
+        return {(role,): totals[field] for role, totals in _scrape["inference"].get("tokens", {}).items()}
+    return values
+
+def _token_rate(tokens_field: str, seconds_field: str):
+    def values():
+        return {(role,): totals[tokens_field] / totals[seconds_field]
+                for role, totals in _scrape["inference"].get("tokens", {}).items()
+                if totals[seconds_field] > 0}
+    return values
+
+def _cache_values(value):
+    def values():
+        return {(name,): value(stats) for name, stats in _scrape["caches"].items()
+                if isinstance(stats, dict) and "hits" in stats and "misses" in stats}
+    return values
+
+registry.counter("rca_llm_prompt_tokens_total", "Prompt tokens evaluated (after KV/prefix cache reuse)",
+                 ["role"], _token_totals("prompt_tokens"))
+registry.counter("rca_llm_completion_tokens_total", "Tokens generated",
+                 ["role"], _token_totals("completion_tokens"))
+registry.counter("rca_llm_prompt_eval_seconds_total", "Time spent evaluating prompt tokens",
+                 ["role"], _token_totals("prompt_eval_seconds"))
+registry.counter("rca_llm_decode_seconds_total", "Time spent generating tokens",
+                 ["role"], _token_totals("decode_seconds"))
+registry.gauge("rca_llm_prompt_eval_tokens_per_second", "Average prompt evaluation speed since start",
+               ["role"], _token_rate("prompt_tokens", "prompt_eval_seconds"))
+registry.gauge("rca_llm_decode_tokens_per_second", "Average generation speed since start",
+               ["role"], _token_rate("completion_tokens", "decode_seconds"))
+registry.gauge("rca_inference_queue_depth", "Jobs waiting per model worker (requests in flight per llama-server)",
+               ["worker"], lambda: {(name,): depth for name, depth in _scrape["inference"].get("queue_depth", {}).items()})
+registry.gauge("rca_active_sessions", "Sessions in the session store",
+               (), lambda: {(): _scrape["sessions"]})
+registry.counter("rca_cache_hits_total", "Cache hits", ["cache"], _cache_values(lambda stats: stats["hits"]))
+registry.counter("rca_cache_misses_total", "Cache misses", ["cache"], _cache_values(lambda stats: stats["misses"]))
+registry.gauge("rca_cache_hit_ratio", "Cache hits over lookups since start", ["cache"], _cache_values(
+    lambda stats: stats["hits"] / (stats["hits"] + stats["misses"]) if stats["hits"] + stats["misses"] else 0.0
+))
+
+def _render_metrics() -> str:
+    from app import model_loading
+    
+    with _scrape_lock:
+        try:
+            _scrape["inference"] = model_loading.inference_metrics()
+            _scrape["caches"] = model_loading.cache_stats()
+        except Exception as e:
+            # e.g. the model server is not up yet; latency histograms still render
+            print(f"Could not collect inference metrics: {e}")
+            _scrape["inference"], _scrape["caches"] = {}, {}
+        _scrape["caches"]["report_render"] = report_store.stats()
+        _scrape["sessions"] = session_store.count()
+        return registry.render()
+
+@api_app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text format: node and LLM latencies, tokens, queues, sessions, caches"""
+    return PlainTextResponse(await run_io(_render_metrics), media_type="text/plain; version=0.0.4")
+
 @api_app.get("/health")
 async def health_check():
-    return {"status": "healthy", "model_loaded": rca_graph is not None}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "model_loaded": rca_graph is not None,
+        "active_sessions": await run_io(session_store.count)
+    }
\ No newline at end of file
@@ -0,0 +1,710 @@
+"""
+Inference Backends Module
+Where completions and embeddings actually run
+
+model_loading's generate_* functions build sampling parameters and apply the
+response cache, then hand the call to one backend, selected by RCA_BACKEND:
+
+- llama_cpp:    GGUF models in this process (the original setup)
+- model_server: a shared model server process over a Unix socket
+- llama_server: one or more OpenAI-compatible llama.cpp servers over HTTP
+- mock:         deterministic fake models (app/fake_model.py)
+
+Calls name a role rather than a model: "generator", "validator" or "embedder".
+"""
+
+import functools
+import json
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from app.config import (
+    INFERENCE_BACKEND,
+    KV_CACHE_ENABLED, KV_CACHE_MEMORY_MB, KV_CACHE_DIR,
+    PREFIX_CACHE_ENABLED, PREFIX_CACHE_PERSIST, PREFIX_CACHE_DIR,
+    INCIDENT_INDEX_ENABLED,
+    VALIDATOR_REPLICAS, GENERATOR_REPLICAS,
+    GENERATOR_MODEL_PATH, VALIDATOR_MODEL_PATH, MODEL_USE_MMAP, MODEL_USE_MLOCK, MODEL_PARALLEL_LOAD,
+    MODEL_SERVER_SOCKET,
+    LLAMA_SERVER_GENERATOR_URLS, LLAMA_SERVER_VALIDATOR_URLS, LLAMA_SERVER_EMBEDDING_URLS,
+    LLAMA_SERVER_POOL_SIZE, LLAMA_SERVER_TIMEOUT_SECONDS,
+    MOCK_PROMPT_MS_PER_TOKEN, MOCK_GEN_MS_PER_TOKEN
+)
+from app.inference_executor import get_executor
+from app.kv_cache import SessionStateCache
+from app.metrics import inference_snapshot, record_inference
+from app.model_files import resolve_gguf
+from app.prefix_cache import PromptPrefixCache
+from app.prompt_definitions import static_validator_prefixes
+
+
+# (Hugging Face repo, file) of the default models
+GENERATOR_GGUF = ("bartowski/Qwen2.5-3B-Instruct-GGUF", "Qwen2.5-3B-Instruct-Q4_K_M.gguf")
+VALIDATOR_GGUF = ("bartowski/Qwen2.5-1.5B-Instruct-GGUF", "Qwen2.5-1.5B-Instruct-Q4_K_M.gguf")
+
+
+class InferenceBackend:
+    """Interface shared by all inference backends"""
+
+    name = "base"
+
+    def __init__(self):
+        # Seconds spent loading, per model or server, filled in by load()
+        self.load_timings = {}
+
+    def load(self):
+        """Load models or check that the remote side is reachable"""
+        raise NotImplementedError
+
+    def warmup(self) -> dict:
+        """
+        One-token decode per role, so the first real request does not pay for
+        first-use costs; returns seconds per role
+        """
+        timings = {}
+        for role in ("generator", "validator"):
+            started = time.perf_counter()
+            self.complete(role, "Hi", {"max_tokens": 1, "temperature": 0.0})
+            timings[role] = round(time.perf_counter() - started, 3)
+        return timings
+
+    def complete(self, role: str, prompt: str, params: dict,
+                 on_token: Optional[Callable[[str], None]] = None,
+                 session_id: Optional[str] = None,
+                 snapshot_as: Optional[str] = None) -> str:
+        """
+        One chat completion for a single user prompt
+        on_token receives text as it is generated; session_id lets backends
+        reuse the session's evaluated prompt; snapshot_as saves the state
+        afterwards under that id instead of the session's (see promote_session)
+        """
+        raise NotImplementedError
+
+    def complete_batch(self, role: str, prompts: List[str], params: dict,
+                       on_result: Optional[Callable[[int, str], None]] = None,
+                       session_id: Optional[str] = None) -> List[str]:
+        """
+        Many independent completions, results in prompt order
+        on_result(index, text) is called as each one finishes; session_id lets
+        backends start every prompt from the session's evaluated prefix
+        """
+        results = []
+        for i, prompt in enumerate(prompts):
+            results.append(self.complete(role, prompt, params))
+            if on_result is not None:
+                on_result(i, results[-1])
+        return results
+
+    def embed(self, text: str) -> list:
+        """Embedding vector for the similar-incident index"""
+        raise NotImplementedError
+
+    def count_tokens(self, role: str, text: str) -> int:
+        """Prompt tokens a text takes for a role's model (rough estimate by default)"""
+        return max(1, len(text) // 4)
+
+    def discard_session(self, session_id: str):
+        """Forget any state kept for a finished session"""
+
+    def promote_session(self, snapshot_id: str, session_id: str):
+        """Make the state a snapshot_as call saved the session's state"""
+
+    def model_id(self, role: str) -> str:
+        """Identifies the model behind a role (part of response cache keys)"""
+        return f"{self.name}:{role}"
+
+    def stats(self) -> dict:
+        """Counters for monitoring"""
+        return {}
+
+    def inference_metrics(self) -> dict:
+        """Token totals and queue depths where the models run (see metrics.py)"""
+        return inference_snapshot()
+
+
+# ============================================================================
+# IN-PROCESS LLAMA-CPP
+# ============================================================================
+
+@functools.lru_cache(maxsize=16)
+def _compiled_grammar(grammar: str):
+    from llama_cpp import LlamaGrammar
+    return LlamaGrammar.from_string(grammar, verbose=False)
+
+
+def _llama_params(model, params: dict) -> dict:
+    """params with a GBNF grammar string compiled for llama-cpp (fake models take the string)"""
+    if "grammar" not in params or not hasattr(model, "_ctx"):
+        return params
+    return {**params, "grammar": _compiled_grammar(params["grammar"])}
+
+
+def _chat_completion(model, prompt: str, params: dict) -> str:
+    """
+    Run one chat completion on a model
+    Always called on that model's inference worker thread
+    """
+    # We wrap the prompt in a user message.
+    # The model handles strict stop tokens (<|im_end|>) automatically in this mode.
+    response = model.create_chat_completion(
+        messages=[{"role": "user", "content": prompt}],
+        **_llama_params(model, params)
+    )
+    return response["choices"][0]["message"]["content"].strip()
+
+
+def _reset_perf(model):
+    """Zero llama.cpp's per-context perf counters before a completion"""
+    if hasattr(model, "reset_perf"):
+        model.reset_perf()
+        return
+    try:
+        import llama_cpp
+        llama_cpp.llama_perf_context_reset(model._ctx.ctx)
+    except (AttributeError, ImportError):
+        pass
+
+
+def _read_perf(model) -> Optional[tuple]:
+    """
+    (prompt tokens, prompt seconds, decoded tokens, decode seconds) since
+    _reset_perf, or None if this llama-cpp-python has no perf API
+    Prompt tokens only count what was evaluated, not what the caches restored
+    """
+    if hasattr(model, "perf_counters"):
+        return model.perf_counters()
+    try:
+        import llama_cpp
+        data = llama_cpp.llama_perf_context(model._ctx.ctx)
+    except (AttributeError, ImportError):
+        return None
+    return data.n_p_eval, data.t_p_eval_ms / 1000.0, data.n_eval, data.t_eval_ms / 1000.0
+
+
+def _chat_completion_stream(model, prompt: str, params: dict):
+    """
+    Streaming variant of _chat_completion, yields text deltas as they decode
+    Always called on that model's inference worker thread
+    """
+    chunks = model.create_chat_completion(
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+        **_llama_params(model, params)
+    )
+    for chunk in chunks:
+        delta = chunk["choices"][0]["delta"].get("content")
+        if delta:
+            yield delta
+
+
+class LlamaCppBackend(InferenceBackend):
+    """
+    llama_cpp.Llama models owned by this process
+    Each model sits behind its own inference worker (see inference_executor.py)
+    """
+
+    name = "llama_cpp"
+
+    def __init__(self):
+        super().__init__()
+        self.gen_model = None
+        self.gen_replicas = []   # Extra generator contexts for parallel report sections
+        self.val_model = None
+        self.val_replicas = []   # Extra validator contexts for batch scoring
+        self.embed_model = None  # Embedding context for the similar-incident index
+
+        # Per-session generator state, so each why only evaluates the new tokens
+        self.session_kv_cache = SessionStateCache("generator", KV_CACHE_MEMORY_MB * 1024 * 1024, KV_CACHE_DIR)
+
+        # Evaluated validator instruction prefixes, so validation only pays for the answer
+        self.prompt_prefix_cache = PromptPrefixCache(PREFIX_CACHE_DIR if PREFIX_CACHE_PERSIST else None)
+
+    def _load_models(self):
+        """
+        Load GGUF models optimized for CPU
+        All contexts load at the same time; load_timings records how long each took
+        """
+        from llama_cpp import Llama, LLAMA_POOLING_TYPE_MEAN
+
+        print("\n" + "="*50)
+        print("LOADING LOCAL GGUF MODELS (CPU OPTIMIZED)")
+        print("="*50)
+
+        def load(name, gguf, local_path, **kwargs):
+            started = time.perf_counter()
+            path = resolve_gguf(*gguf, local_path=local_path)
+            resolved = time.perf_counter()
+            model = Llama(
+                model_path=path,
+                verbose=False,
+                use_mmap=MODEL_USE_MMAP,
+                use_mlock=MODEL_USE_MLOCK,
+                **kwargs
+            )
+            self.load_timings[name] = {
+                "resolve_seconds": round(resolved - started, 3),
+                "load_seconds": round(time.perf_counter() - resolved, 3)
+            }
+            print(f"   Loaded {name} in {time.perf_counter() - started:.1f}s")
+            return model
+
+        jobs = {
+            # 1. Generator Model (Qwen 2.5 3B)
+            "generator": (GENERATOR_GGUF, GENERATOR_MODEL_PATH, dict(
+                n_ctx=4096,      # Context for 5-Whys history
+                n_threads=4,     # Use 4 physical cores
+                n_batch=512
+            )),
+            # 2. Validator Model (Qwen 2.5 1.5B)
+            "validator": (VALIDATOR_GGUF, VALIDATOR_MODEL_PATH, dict(
+                n_ctx=1024,      # Short context for validation
+                n_threads=2,     # Lightweight background thread
+                n_batch=512
+            ))
+        }
+
+        # Extra contexts for batches; replicas map the same GGUF file
+        for i in range(1, GENERATOR_REPLICAS):
+            jobs[f"generator-{i}"] = jobs["generator"]
+        for i in range(1, VALIDATOR_REPLICAS):
+            jobs[f"validator-{i}"] = jobs["validator"]
+
+        # 3. Embedding context for similar-incident lookup
+        # Same GGUF as the validator, so the mmapped weights are shared in page cache
+        if INCIDENT_INDEX_ENABLED:
+            jobs["embedder"] = (VALIDATOR_GGUF, VALIDATOR_MODEL_PATH, dict(
+                embedding=True,
+                pooling_type=LLAMA_POOLING_TYPE_MEAN,
+                n_ctx=1024,
+                n_threads=2,
+                n_batch=1024
+            ))
+
+        print(f"\nLoading {', '.join(jobs)}...")
+        with ThreadPoolExecutor(max_workers=len(jobs) if MODEL_PARALLEL_LOAD else 1,
+                                thread_name_prefix="rca-model-load") as pool:
+            futures = {name: pool.submit(load, name, gguf, local_path, **kwargs)
+                       for name, (gguf, local_path, kwargs) in jobs.items()}
+            models = {name: future.result() for name, future in futures.items()}
+
+        self.gen_model = models["generator"]
+        self.gen_replicas = [models[f"generator-{i}"] for i in range(1, GENERATOR_REPLICAS)]
+        self.val_model = models["validator"]
+        self.val_replicas = [models[f"validator-{i}"] for i in range(1, VALIDATOR_REPLICAS)]
+        self.embed_model = models.get("embedder")
+
+    def load(self):
+        self._load_models()
+
+        if PREFIX_CACHE_ENABLED:
+            print("\nPre-evaluating validator prompt prefixes...")
+            for executor_name, model in self._validator_targets():
+                get_executor(executor_name).call(
+                    self.prompt_prefix_cache.warm, model, static_validator_prefixes()
+                )
+
+        print("\n✅ Both models loaded successfully on CPU!")
+
+    def _validator_targets(self) -> list:
+        """(executor name, model) for the validator and each replica"""
+        return [("validator", self.val_model)] + [
+            (f"validator-{i}", model) for i, model in enumerate(self.val_replicas, 1)
+        ]
+
+    def _generator_targets(self) -> list:
+        """(executor name, model) for the generator and each replica"""
+        return [("generator", self.gen_model)] + [
+            (f"generator-{i}", model) for i, model in enumerate(self.gen_replicas, 1)
+        ]
+
+    def _model(self, role: str):
+        return {"generator": self.gen_model, "validator": self.val_model, "embedder": self.embed_model}[role]
+
+    def _role_of(self, model) -> str:
+        if model is self.gen_model or any(model is replica for replica in self.gen_replicas):
+            return "generator"
+        return "embedder" if model is self.embed_model else "validator"
+
+    def _record_perf(self, model):
+        perf = _read_perf(model)
+        if perf is not None:
+            record_inference(self._role_of(model), *perf)
+
+    def _prepare_context(self, model, prompt: str, session_id: Optional[str]):
+        """
+        Load the best cached state into the model before a completion
+        Session calls resume their KV snapshot; other calls use a cached prompt prefix
+        """
+        if session_id is not None and KV_CACHE_ENABLED:
+            self.session_kv_cache.restore(model, session_id)
+            return
+
+        self.session_kv_cache.release(model)
+        if PREFIX_CACHE_ENABLED:
+            self.prompt_prefix_cache.prime(model, prompt)
+
+    def _save_context(self, model, session_id: Optional[str], save_session: bool, snapshot_as: Optional[str]):
+        """Snapshot the session's state after a completion (under snapshot_as if given)"""
+        if session_id is None or not KV_CACHE_ENABLED:
+            return
+        if save_session:
+            self.session_kv_cache.snapshot(model, snapshot_as or session_id)
+        else:
+            # The context has moved past the snapshot
+            self.session_kv_cache.release(model)
+
+    def _run_in_context(self, job, model, session_id: Optional[str], prompt: str, params: dict,
+                        save_session: bool = True, snapshot_as: Optional[str] = None):
+        """
+        Run a completion job with the model's cached state prepared
+        Saves the session's KV snapshot afterwards, unless save_session is False
+        (batches only start from the snapshot)
+        """
+        self._prepare_context(model, prompt, session_id)
+        _reset_perf(model)
+        result = job(model, prompt, params)
+        self._record_perf(model)
+        self._save_context(model, session_id, save_session, snapshot_as)
+        return result
+
+    def _stream_in_context(self, job, model, session_id: Optional[str], prompt: str, params: dict,
+                           snapshot_as: Optional[str] = None):
+        """Streaming variant of _run_in_context"""
+        self._prepare_context(model, prompt, session_id)
+        _reset_perf(model)
+        yield from job(model, prompt, params)
+        # Only reached when the stream completed
+        self._record_perf(model)
+        self._save_context(model, session_id, True, snapshot_as)
+
+    def complete(self, role, prompt, params, on_token=None, session_id=None, snapshot_as=None) -> str:
+        model = self._model(role)
+        executor = get_executor(role)
+        if on_token is None:
+            return executor.call(self._run_in_context, _chat_completion, model, session_id, prompt, params,
+                                 snapshot_as=snapshot_as)
+
+        pieces = []
+        stream = executor.stream(self._stream_in_context, _chat_completion_stream, model, session_id,
+                                 prompt, params, snapshot_as=snapshot_as)
+        try:
+            for delta in stream:
+                pieces.append(delta)
+                on_token(delta)
+        finally:
+            stream.close()
+        return "".join(pieces).strip()
+
+    def complete_batch(self, role, prompts, params, on_result=None, session_id=None) -> List[str]:
+        """Spread the prompts over the role's replicas (the embedder has none)"""
+        if role == "embedder":
+            return super().complete_batch(role, prompts, params, on_result)
+
+        targets = self._generator_targets() if role == "generator" else self._validator_targets()
+        # Queue everything first so all replicas work at once
+        futures = {
+            get_executor(executor_name).submit(
+                self._run_in_context, _chat_completion, model, session_id, prompt, params, False
+            ): i
+            for i, (prompt, (executor_name, model)) in enumerate(zip(prompts, _cycle(targets, len(prompts))))
+        }
+
+        results = [None] * len(prompts)
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result is not None:
+                on_result(i, results[i])
+        return results
+
+    def embed(self, text: str) -> list:
+        if self.embed_model is None:
+            raise RuntimeError("Embedding model not loaded (RCA_INCIDENT_INDEX is off)")
+        return get_executor("embedder").call(_embed, self.embed_model, text)
+
+    def count_tokens(self, role: str, text: str) -> int:
+        # Tokenizing only reads the vocabulary, so it needs no inference worker
+        return len(self._model(role).tokenize(text.encode("utf-8"), add_bos=False, special=True))
+
+    def discard_session(self, session_id: str):
+        self.session_kv_cache.discard(session_id)
+
+    def promote_session(self, snapshot_id: str, session_id: str):
+        self.session_kv_cache.promote(snapshot_id, session_id)
+
+    def model_id(self, role: str) -> str:
+        return getattr(self._model(role), "model_path", None) or role
+
+    def stats(self) -> dict:
+        return {
+            "session_kv_cache": self.session_kv_cache.stats(),
+            "prompt_prefix_cache": self.prompt_prefix_cache.stats()
+        }
+
+
+def _cycle(items: list, n: int) -> list:
+    """n items taken round-robin from a list"""
+    return [items[i % len(items)] for i in range(n)]
+
+
+def _embed(model, text: str) -> list:
+    """Mean-pooled embedding of a text (runs on the embedder worker)"""
+    import numpy as np
+
+    embedding = model.embed(text, truncate=True)
+    # Without pooling support llama-cpp returns one vector per token
+    if embedding and isinstance(embedding[0], list):
+        embedding = np.mean(np.asarray(embedding, dtype=np.float32), axis=0).tolist()
+    return embedding
+
+
+class MockBackend(LlamaCppBackend):
+    """
+    LlamaCppBackend over FakeLlama models
+    Same workers and caches as the real thing, with simulated latency
+    """
+
+    name = "mock"
+
+    def __init__(self, prompt_ms_per_token: float = MOCK_PROMPT_MS_PER_TOKEN,
+                 gen_ms_per_token: float = MOCK_GEN_MS_PER_TOKEN):
+        super().__init__()
+        self.prompt_ms_per_token = prompt_ms_per_token
+        self.gen_ms_per_token = gen_ms_per_token
+
+    def _load_models(self):
+        from app.fake_model import FakeLlama
+
+        def fake(path):
+            return FakeLlama(path, self.prompt_ms_per_token, self.gen_ms_per_token)
+
+        print("\nUsing mock models")
+        self.gen_model = fake("fake-generator.gguf")
+        self.gen_replicas = [fake("fake-generator.gguf") for _ in range(1, GENERATOR_REPLICAS)]
+        self.val_model = fake("fake-validator.gguf")
+        self.val_replicas = [fake("fake-validator.gguf") for _ in range(1, VALIDATOR_REPLICAS)]
+        self.embed_model = fake("fake-validator.gguf") if INCIDENT_INDEX_ENABLED else None
+
+
+# ============================================================================
+# SHARED MODEL SERVER (Unix socket)
+# ============================================================================
+
+class ModelServerBackend(InferenceBackend):
+    """Forwards every call to a model server process (see model_server.py)"""
+
+    name = "model_server"
+
+    def __init__(self, socket_path: str = MODEL_SERVER_SOCKET):
+        super().__init__()
+        from app.model_server import ModelServerClient
+        self.client = ModelServerClient(socket_path)
+
+    def load(self):
+        print(f"\nUsing shared model server at {self.client.socket_path}")
+        started = time.perf_counter()
+        self.client.ping()
+        self.load_timings["model_server"] = round(time.perf_counter() - started, 3)
+        print("✅ Model server reachable")
+
+    def complete(self, role, prompt, params, on_token=None, session_id=None, snapshot_as=None) -> str:
+        return self.client.call("complete", role, prompt, params, on_token=on_token, session_id=session_id,
+                                snapshot_as=snapshot_as)
+
+    def complete_batch(self, role, prompts, params, on_result=None, session_id=None) -> List[str]:
+        return self.client.call("complete_batch", role, prompts, params, session_id=session_id,
+                                on_token=on_result, callback="on_result")
+
+    def embed(self, text: str) -> list:
+        return self.client.call("generate_embedding", text)
+
+    def count_tokens(self, role: str, text: str) -> int:
+        return self.client.call("count_tokens", text, role)
+
+    def discard_session(self, session_id: str):
+        self.client.call("discard_session_state", session_id)
+
+    def promote_session(self, snapshot_id: str, session_id: str):
+        self.client.call("promote_session_state", snapshot_id, session_id)
+
+    def model_id(self, role: str) -> str:
+        return f"model_server:{self.client.socket_path}:{role}"
+
+    def stats(self) -> dict:
+        return self.client.call("cache_stats")
+
+    def inference_metrics(self) -> dict:
+        return self.client.call("inference_metrics")
+
+
+# ============================================================================
+# LLAMA.CPP SERVER (OpenAI-compatible HTTP)
+# ============================================================================
+
+class LlamaServerBackend(InferenceBackend):
+    """
+    Client for llama.cpp's llama-server, one or more replicas per role
+    Connections are kept alive in a shared pool. Session calls stick to one
+    replica so its prompt cache (cache_prompt) keeps the session's prefix;
+    other calls go to the replica with the fewest requests in flight.
+    """
+
+    name = "llama_server"
+
+    def __init__(self, urls: Optional[Dict[str, List[str]]] = None,
+                 pool_size: int = LLAMA_SERVER_POOL_SIZE,
+                 timeout: float = LLAMA_SERVER_TIMEOUT_SECONDS):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        super().__init__()
+        self.urls = urls or {
+            "generator": LLAMA_SERVER_GENERATOR_URLS,
+            "validator": LLAMA_SERVER_VALIDATOR_URLS,
+            "embedder": LLAMA_SERVER_EMBEDDING_URLS
+        }
+        self.timeout = timeout
+
+        all_urls = sorted({url for urls in self.urls.values() for url in urls})
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(all_urls), pool_maxsize=pool_size)
+        self._http.mount("http://", adapter)
+        self._http.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._in_flight = {url: 0 for url in all_urls}
+        self._requests = {url: 0 for url in all_urls}
+        self._batch_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="rca-llama-server")
+
+    def load(self):
+        roles = ["generator", "validator"] + (["embedder"] if INCIDENT_INDEX_ENABLED else [])
+        for url in sorted({url for role in roles for url in self.urls[role]}):
+            started = time.perf_counter()
+            response = self._http.get(f"{url}/health", timeout=self.timeout)
+            if response.status_code != 200:
+                raise RuntimeError(f"llama-server at {url} is not ready (HTTP {response.status_code})")
+            self.load_timings[url] = round(time.perf_counter() - started, 3)
+            print(f"✅ llama-server reachable at {url}")
+
+    def _pick(self, role: str, session_id: Optional[str]) -> str:
+        urls = self.urls[role]
+        if session_id is not None:
+            return urls[zlib.crc32(session_id.encode("utf-8")) % len(urls)]
+        with self._lock:
+            return min(urls, key=lambda url: self._in_flight[url])
+
+    @contextmanager
+    def _in_flight_on(self, url: str):
+        with self._lock:
+            self._in_flight[url] += 1
+            self._requests[url] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[url] -= 1
+
+    def complete(self, role, prompt, params, on_token=None, session_id=None, snapshot_as=None) -> str:
+        # snapshot_as needs nothing here: the server's prompt cache keeps the
+        # session's prefix whichever call came last
+        url = self._pick(role, session_id)
+        body = {"messages": [{"role": "user", "content": prompt}], "cache_prompt": True, **params}
+
+        with self._in_flight_on(url):
+            if on_token is None:
+                response = self._http.post(f"{url}/v1/chat/completions", json=body, timeout=self.timeout)
+                response.raise_for_status()
+                result = response.json()
+                _record_timings(role, result.get("timings"))
+                return result["choices"][0]["message"]["content"].strip()
+
+            body["stream"] = True
+            pieces = []
+            with self._http.post(f"{url}/v1/chat/completions", json=body, stream=True,
+                                 timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    # The last chunk carries the request's timings
+                    _record_timings(role, chunk.get("timings"))
+                    choices = chunk.get("choices") or []
+                    delta = choices[0].get("delta", {}).get("content") if choices else None
+                    if delta:
+                        pieces.append(delta)
+                        on_token(delta)
+            return "".join(pieces).strip()
+
+    def complete_batch(self, role, prompts, params, on_result=None, session_id=None) -> List[str]:
+        """
+        Fan the prompts out over the pooled connections (and replicas)
+        Not pinned to the session's replica; each server's prompt cache still
+        reuses the shared prefix across the batch
+        """
+        futures = {self._batch_pool.submit(self.complete, role, prompt, params): i
+                   for i, prompt in enumerate(prompts)}
+        results = [None] * len(prompts)
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result is not None:
+                on_result(i, results[i])
+        return results
+
+    def embed(self, text: str) -> list:
+        url = self._pick("embedder", None)
+        with self._in_flight_on(url):
+            response = self._http.post(f"{url}/v1/embeddings", json={"input": text}, timeout=self.timeout)
+            response.raise_for_status()
+            return response.json()["data"][0]["embedding"]
+
+    def count_tokens(self, role: str, text: str) -> int:
+        url = self._pick(role, None)
+        response = self._http.post(f"{url}/tokenize", json={"content": text}, timeout=self.timeout)
+        response.raise_for_status()
+        return len(response.json()["tokens"])
+
+    def model_id(self, role: str) -> str:
+        return f"llama_server:{','.join(self.urls[role])}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"llama_server": {url: {"in_flight": self._in_flight[url], "requests": self._requests[url]}
+                                     for url in self._in_flight}}
+
+    def inference_metrics(self) -> dict:
+        # Requests wait inside the servers; in-flight counts are the closest to a queue depth
+        snapshot = inference_snapshot()
+        with self._lock:
+            snapshot["queue_depth"] = dict(self._in_flight)
+        return snapshot
+
+
+def _record_timings(role: str, timings: Optional[dict]):
+    """Record the per-request timings llama-server adds to completions"""
+    if timings:
+        record_inference(role, timings.get("prompt_n", 0), timings.get("prompt_ms", 0.0) / 1000.0,
+                         timings.get("predicted_n", 0), timings.get("predicted_ms", 0.0) / 1000.0)
+
+
+BACKENDS = {
+    "llama_cpp": LlamaCppBackend,
+    "model_server": ModelServerBackend,
+    "llama_server": LlamaServerBackend,
+    "mock": MockBackend
+}
+
+
+def create_backend(name: str = INFERENCE_BACKEND) -> InferenceBackend:
+    """Build the backend selected by RCA_BACKEND"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name}")
+    return BACKENDS[name]()
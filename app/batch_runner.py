@@ -0,0 +1,252 @@
+"""
+Batch Runner Module
+Non-interactive RCA over a JSONL file of incidents with recorded answers
+
+Usage:
+    python -m app.batch_runner incidents.jsonl results.jsonl --workers 2
+
+Each input line is one incident:
+    {"id": "INC-1", "problem": "...", "answers": ["why 1 answer", ...]}
+An answer may also be {"answer": "...", "improved_answer": "..."}; the improved
+text is submitted when the validator asks for a better answer (otherwise the
+same answer is resubmitted, as a user would).
+
+Incidents are spread over a pool of worker processes, each loading its own
+model contexts (or sharing RCA_MODEL_SERVER). Every finished incident is
+appended to the output file as one JSON line with its report and timings;
+rerunning with the same output file skips incidents already done.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, Set, Tuple
+
+
+# ============================================================================
+# WORKER PROCESS
+# ============================================================================
+
+def _init_worker():
+    """Load the models once per worker process"""
+    from app.model_loading import load_model
+    load_model()
+
+
+def _answer_texts(answer) -> Tuple[str, str]:
+    """(answer, improved answer) from a recorded answer entry"""
+    if isinstance(answer, dict):
+        text = answer.get("answer", "")
+        return text, answer.get("improved_answer") or text
+    return answer, answer
+
+
+def _timed(timings: Dict[str, float], name: str, node, state):
+    started = time.perf_counter()
+    state = node(state)
+    timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+    return state
+
+
+def run_incident(incident: Dict) -> Dict:
+    """
+    Drive one incident through the RCA nodes with its recorded answers
+    Same step order as the API (see api._apply_answer); runs in a worker process
+    """
+    from app.graph_builder import should_continue_or_validate
+    from app.model_loading import discard_session_state
+    from app.node_definitions import answer_validator, why_asker, root_cause_extractor, report_generator
+
+    session_id = f"batch-{uuid.uuid4()}"
+    state = {
+        "problem": incident["problem"],
+        "why_no": 0,
+        "whys": [],
+        "root_cause": "",
+        "confidence_score": 0.0,
+        "report": "",
+        "user_input": "",
+        "needs_validation": False,
+        "retry_count": 0,
+        "current_question": "",
+        "needs_improvement": False,
+        "improvement_suggestion": "",
+        "improved_input": "",
+        "early_root_cause_found": False,
+        "session_id": session_id
+    }
+
+    answers = list(incident.get("answers", []))
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    try:
+        state = _timed(timings, "why_asker", why_asker, state)
+        answers_exhausted = False
+
+        while should_continue_or_validate(state) != "extract":
+            if not answers:
+                # Fewer recorded answers than whys: extract from what we have
+                answers_exhausted = True
+                break
+
+            answer, improved_answer = _answer_texts(answers.pop(0))
+            state["user_input"] = answer
+            state = _timed(timings, "answer_validator", answer_validator, state)
+
+            if state.get("needs_improvement", False):
+                state["improved_input"] = improved_answer
+                state = _timed(timings, "answer_validator", answer_validator, state)
+
+            if should_continue_or_validate(state) == "continue":
+                state = _timed(timings, "why_asker", why_asker, state)
+
+        state = _timed(timings, "root_cause_extractor", root_cause_extractor, state)
+        state = _timed(timings, "report_generator", report_generator, state)
+    finally:
+        discard_session_state(session_id)
+
+    return {
+        "whys": [{"question": w["question"], "answer": w["answer"],
+                  "quality_score": w.get("quality_score")} for w in state["whys"]],
+        "root_cause": state["root_cause"],
+        "confidence_score": state["confidence_score"],
+        "report": state["report"],
+        "early_root_cause_found": state.get("early_root_cause_found", False),
+        "answers_exhausted": answers_exhausted,
+        "timings": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "elapsed_seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def _run_incident_safe(incident_id: str, incident: Dict) -> Dict:
+    """run_incident wrapped into an output record; failures become error records"""
+    record = {"id": incident_id, "problem": incident.get("problem", "")}
+    try:
+        record.update(run_incident(incident), status="ok")
+    except Exception as e:
+        record.update(status="error", error=f"{type(e).__name__}: {e}")
+    record["worker_pid"] = os.getpid()
+    return record
+
+
+# ============================================================================
+# DRIVER
+# ============================================================================
+
+def _completed_ids(output_path: str, retry_failed: bool) -> Set[str]:
+    """Ids already written to the output file (for resuming)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of an interrupted run
+                continue
+            if record.get("status") == "ok" or not retry_failed:
+                done.add(str(record["id"]))
+    return done
+
+
+def _read_incidents(input_path: str) -> Iterator[Tuple[str, Dict]]:
+    """(id, incident) for each input line; the line number is the default id"""
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            incident = json.loads(line)
+            yield str(incident.get("id", line_no)), incident
+
+
+def _open_output(output_path: str):
+    """Open the output for appending, terminating a partially written last line"""
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+
+    needs_newline = False
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+
+    out = open(output_path, "a", encoding="utf-8")
+    if needs_newline:
+        out.write("\n")
+    return out
+
+
+def run_batch(input_path: str, output_path: str, workers: int = 1, retry_failed: bool = True) -> Dict:
+    """
+    Analyze every incident of input_path not yet in output_path
+    Returns counts of processed, failed and skipped incidents
+    """
+    done = _completed_ids(output_path, retry_failed)
+    summary = {"processed": 0, "failed": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    # Fresh interpreters: llama-cpp contexts and worker threads do not survive fork
+    context = multiprocessing.get_context("spawn")
+
+    with _open_output(output_path) as out, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        pending = set()
+
+        def write(future):
+            record = future.result()
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+            summary["processed"] += 1
+            if record["status"] != "ok":
+                summary["failed"] += 1
+            print(f"[{summary['processed']}] {record['id']}: {record['status']} "
+                  f"({record.get('elapsed_seconds', 0)}s)")
+
+        for incident_id, incident in _read_incidents(input_path):
+            if incident_id in done:
+                summary["skipped"] += 1
+                continue
+
+            # Keep the queue short so the input is streamed, not loaded at once
+            if len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    write(future)
+
+            pending.add(pool.submit(_run_incident_safe, incident_id, incident))
+
+        for future in wait(pending).done:
+            write(future)
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run RCA over a JSONL file of incidents")
+    parser.add_argument("input", help="JSONL file with problem and answers per line")
+    parser.add_argument("output", help="JSONL file receiving one result per incident")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes, each with its own models (default: 1)")
+    parser.add_argument("--skip-failed", action="store_true",
+                        help="On resume, do not retry incidents that failed before")
+    args = parser.parse_args()
+
+    # Workers only need the generator and one validator
+    os.environ.setdefault("RCA_INCIDENT_INDEX", "0")
+    os.environ.setdefault("RCA_VALIDATOR_REPLICAS", "1")
+
+    summary = run_batch(args.input, args.output, args.workers, retry_failed=not args.skip_failed)
+    print(f"\nDone: {summary}")
+
+
+if __name__ == "__main__":
+    main()
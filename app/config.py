@@ -0,0 +1,344 @@
+"""
+Configuration Module
+Runtime settings for the RCA application, read from environment variables
+
+The defaults are NOT the original single-user setup. Out of the box the API
+and UI share one process (RCA_SINGLE_SERVER), sessions are kept in SQLite
+(RCA_SESSION_STORE) and these features, none of which the original had, are
+on: fused validation (RCA_FUSED_VALIDATION), grammar-constrained validator
+output (RCA_VALIDATOR_GRAMMAR), speculative next questions
+(RCA_SPECULATIVE_NEXT_QUESTION), the why-history budget (RCA_CONTEXT_BUDGET),
+adaptive token caps (RCA_ADAPTIVE_MAX_TOKENS), the response cache
+(RCA_RESPONSE_CACHE) and the KV and prefix caches. Each can be turned off
+with its variable. Replicas, parallel reports and the similar-incident index
+are opt-in.
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_list(name: str, default: str) -> list:
+    """Read a comma-separated setting from the environment"""
+    value = os.getenv(name) or default
+    return [item.strip().rstrip("/") for item in value.split(",") if item.strip()]
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a yes/no setting from the environment"""
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Root directory for caches written by the application
+CACHE_DIR = os.getenv("RCA_CACHE_DIR", ".rca_cache")
+
+
+# ============================================================================
+# INFERENCE EXECUTION
+# ============================================================================
+
+# Threads used to run graph nodes off the FastAPI event loop.
+# Nodes mostly wait on the per-model inference workers, so this can be larger
+# than the number of cores.
+NODE_WORKERS = _env_int("RCA_NODE_WORKERS", 8)
+
+# Threads for short store reads and writes (job records, session lookups) that
+# must not queue behind graph nodes
+IO_WORKERS = _env_int("RCA_IO_WORKERS", 4)
+
+
+# ============================================================================
+# SESSION KV CACHE
+# ============================================================================
+
+# Reuse each session's evaluated prompt between generator calls
+KV_CACHE_ENABLED = _env_bool("RCA_KV_CACHE", True)
+
+# RAM kept for session snapshots before the oldest are spilled to disk
+KV_CACHE_MEMORY_MB = _env_int("RCA_KV_CACHE_MEMORY_MB", 512)
+
+# Where spilled snapshots are written
+KV_CACHE_DIR = os.getenv("RCA_KV_CACHE_DIR", os.path.join(CACHE_DIR, "kv_states"))
+
+
+# ============================================================================
+# VALIDATOR PROMPT PREFIX CACHE
+# ============================================================================
+
+# Pre-evaluate the fixed validator instructions at load time
+PREFIX_CACHE_ENABLED = _env_bool("RCA_PREFIX_CACHE", True)
+
+# Keep evaluated prefixes on disk so restarts skip the evaluation
+PREFIX_CACHE_PERSIST = _env_bool("RCA_PREFIX_CACHE_PERSIST", True)
+
+PREFIX_CACHE_DIR = os.getenv("RCA_PREFIX_CACHE_DIR", os.path.join(CACHE_DIR, "prefixes"))
+
+
+# ============================================================================
+# ANSWER VALIDATION
+# ============================================================================
+
+# From Why 4 on, judge specificity/relevance and the systematic check with one
+# validator call instead of two
+FUSED_VALIDATION = _env_bool("RCA_FUSED_VALIDATION", True)
+
+# Generate the next why question on the generator while the validator judges
+# the answer; the result is kept only if the answer is accepted
+SPECULATIVE_NEXT_QUESTION = _env_bool("RCA_SPECULATIVE_NEXT_QUESTION", True)
+
+# Constrain validator output with a GBNF grammar to exactly the expected lines,
+# so it generates a handful of tokens and always parses
+VALIDATOR_GRAMMAR_ENABLED = _env_bool("RCA_VALIDATOR_GRAMMAR", True)
+
+# Token cap for grammar-constrained validator calls; 0 derives it from the
+# longest output the grammar allows, so the last line is never cut off
+VALIDATOR_CONSTRAINED_MAX_TOKENS = _env_int("RCA_VALIDATOR_CONSTRAINED_MAX_TOKENS", 0)
+
+# Validator contexts used to score batches (/validate_batch) in parallel.
+# Replicas share the mmapped GGUF weights; each adds its own KV cache and
+# inference worker with 2 threads, so set 2 or more only with spare cores.
+VALIDATOR_REPLICAS = _env_int("RCA_VALIDATOR_REPLICAS", 1)
+
+# Largest number of answers accepted by one /validate_batch request
+VALIDATE_BATCH_MAX_ITEMS = _env_int("RCA_VALIDATE_BATCH_MAX_ITEMS", 500)
+
+
+# ============================================================================
+# REPORT GENERATION
+# ============================================================================
+
+# Generate the four report sections at the same time on separate generator
+# contexts instead of the whole report in one sequential decode
+PARALLEL_REPORT = _env_bool("RCA_PARALLEL_REPORT", False)
+
+# Generator contexts (including the main one). Replicas map the same GGUF file;
+# each adds its own KV cache and uses n_threads=4 cores while decoding.
+GENERATOR_REPLICAS = _env_int("RCA_GENERATOR_REPLICAS", 4 if PARALLEL_REPORT else 1)
+
+
+# ============================================================================
+# PROMPT CONTEXT BUDGET
+# ============================================================================
+
+# Keep the why history in generator prompts under a token budget by
+# summarizing older whys once it grows too long
+CONTEXT_BUDGET_ENABLED = _env_bool("RCA_CONTEXT_BUDGET", True)
+
+# Tokens the why history may take in a prompt. The generator has 4096 tokens of
+# context and the report alone may generate 1400, so this leaves room for the
+# problem, the instructions and the output.
+WHYS_CONTEXT_TOKEN_BUDGET = _env_int("RCA_WHYS_CONTEXT_TOKENS", 1536)
+
+# Latest whys always kept verbatim
+WHYS_KEEP_RECENT = _env_int("RCA_WHYS_KEEP_RECENT", 2)
+
+# Length of the summary that replaces the older whys
+WHYS_SUMMARY_MAX_TOKENS = _env_int("RCA_WHYS_SUMMARY_TOKENS", 200)
+
+# Token counts remembered per distinct text
+TOKEN_COUNT_CACHE_SIZE = _env_int("RCA_TOKEN_COUNT_CACHE_SIZE", 4096)
+
+
+# ============================================================================
+# GENERATION LIMITS
+# ============================================================================
+
+# Size each node's max_tokens from the lengths it recently produced
+# (stop sequences apply either way, see output_limits.py)
+ADAPTIVE_MAX_TOKENS_ENABLED = _env_bool("RCA_ADAPTIVE_MAX_TOKENS", True)
+
+# Recent outputs remembered per node
+ADAPTIVE_MAX_TOKENS_WINDOW = _env_int("RCA_ADAPTIVE_MAX_TOKENS_WINDOW", 200)
+
+# Outputs observed before the cap starts adapting
+ADAPTIVE_MAX_TOKENS_MIN_SAMPLES = _env_int("RCA_ADAPTIVE_MAX_TOKENS_MIN_SAMPLES", 20)
+
+# Cap = this quantile of recent output lengths times the headroom
+ADAPTIVE_MAX_TOKENS_QUANTILE = float(os.getenv("RCA_ADAPTIVE_MAX_TOKENS_QUANTILE", "0.99"))
+ADAPTIVE_MAX_TOKENS_HEADROOM = float(os.getenv("RCA_ADAPTIVE_MAX_TOKENS_HEADROOM", "1.3"))
+
+
+# ============================================================================
+# SESSION STORE
+# ============================================================================
+
+# "sqlite" (durable, shared by API workers) or "memory"
+SESSION_STORE = os.getenv("RCA_SESSION_STORE", "sqlite")
+
+SESSION_DB_PATH = os.getenv("RCA_SESSION_DB", os.path.join(CACHE_DIR, "sessions.db"))
+
+# Sessions untouched for this long are deleted (0 disables expiry)
+SESSION_TTL_SECONDS = _env_int("RCA_SESSION_TTL_SECONDS", 6 * 60 * 60)
+
+# Least recently used sessions above this count are evicted (0 = unbounded)
+SESSION_MAX_SESSIONS = _env_int("RCA_SESSION_MAX", 1000)
+
+# How often the background sweeper deletes expired sessions
+SESSION_SWEEP_INTERVAL_SECONDS = _env_int("RCA_SESSION_SWEEP_INTERVAL_SECONDS", 60)
+
+
+# ============================================================================
+# BACKGROUND JOBS
+# ============================================================================
+
+# Job records (/jobs/*), in SQLite next to the sessions unless RCA_SESSION_STORE=memory
+JOB_DB_PATH = os.getenv("RCA_JOB_DB", os.path.join(CACHE_DIR, "jobs.db"))
+
+# Finished jobs are kept this long for polling
+JOB_TTL_SECONDS = _env_int("RCA_JOB_TTL_SECONDS", 60 * 60)
+
+JOB_MAX_JOBS = _env_int("RCA_JOB_MAX", 10000)
+
+# How often a running job saves its progress (generated text so far)
+JOB_PROGRESS_INTERVAL_SECONDS = float(os.getenv("RCA_JOB_PROGRESS_INTERVAL_SECONDS", "0.5"))
+
+
+# ============================================================================
+# REPORT STORE
+# ============================================================================
+
+# One JSON document per session with a generated report
+REPORT_DIR = os.getenv("RCA_REPORT_DIR", os.path.join(CACHE_DIR, "reports"))
+
+# Rendered downloads (Markdown, HTML, JSON, plain and gzipped) kept in memory
+REPORT_RENDER_CACHE_SIZE = _env_int("RCA_REPORT_RENDER_CACHE_SIZE", 256)
+
+
+# ============================================================================
+# SESSION TRACES
+# ============================================================================
+
+# Record a timeline of steps, nodes and LLM calls per session (/trace/{session_id})
+TRACING_ENABLED = _env_bool("RCA_TRACE", True)
+
+# Events kept per session; later spans are dropped
+TRACE_MAX_EVENTS = _env_int("RCA_TRACE_MAX_EVENTS", 2000)
+
+
+# ============================================================================
+# MODEL FILES
+# ============================================================================
+
+# Explicit GGUF paths; when empty the files are downloaded once into MODEL_DIR
+GENERATOR_MODEL_PATH = os.getenv("RCA_GENERATOR_MODEL", "")
+VALIDATOR_MODEL_PATH = os.getenv("RCA_VALIDATOR_MODEL", "")
+
+MODEL_DIR = os.getenv("RCA_MODEL_DIR", os.path.join(CACHE_DIR, "models"))
+
+# Never contact the Hugging Face hub; fail if a model is not cached
+MODEL_OFFLINE = _env_bool("RCA_OFFLINE", False)
+
+# Check cached files against their recorded SHA-256 (re-hashes only changed files)
+MODEL_VERIFY_CHECKSUM = _env_bool("RCA_VERIFY_CHECKSUM", True)
+
+# Map the weights instead of reading them (fast start, shared page cache)
+MODEL_USE_MMAP = _env_bool("RCA_MODEL_MMAP", True)
+
+# Pin the weights in RAM so they are never paged out (needs a high memlock limit)
+MODEL_USE_MLOCK = _env_bool("RCA_MODEL_MLOCK", False)
+
+# Load the generator and validator contexts at the same time
+MODEL_PARALLEL_LOAD = _env_bool("RCA_MODEL_PARALLEL_LOAD", True)
+
+# ============================================================================
+# MODEL SERVER
+# ============================================================================
+
+# Socket of a running model server (python -m app.model_server). When set, API
+# workers send inference there instead of loading the models themselves.
+MODEL_SERVER = os.getenv("RCA_MODEL_SERVER", "")
+
+# Socket the model server listens on
+MODEL_SERVER_SOCKET = MODEL_SERVER or "/tmp/rca-models.sock"
+
+MODEL_SERVER_AUTHKEY = os.getenv("RCA_MODEL_SERVER_AUTHKEY", "rca-model-server").encode("utf-8")
+
+
+# ============================================================================
+# INFERENCE BACKEND
+# ============================================================================
+
+# Where generate_* calls run: "llama_cpp" (models in this process),
+# "model_server", "llama_server" (OpenAI-compatible llama.cpp servers) or "mock"
+INFERENCE_BACKEND = os.getenv("RCA_BACKEND", "model_server" if MODEL_SERVER else "llama_cpp")
+
+# llama-server base URLs per role; several comma-separated URLs are replicas
+LLAMA_SERVER_GENERATOR_URLS = _env_list("RCA_LLAMA_SERVER_GENERATOR", "http://127.0.0.1:8080")
+LLAMA_SERVER_VALIDATOR_URLS = _env_list("RCA_LLAMA_SERVER_VALIDATOR", "http://127.0.0.1:8081")
+
+# Embeddings need their own server started with --embedding (only used by the incident index)
+LLAMA_SERVER_EMBEDDING_URLS = _env_list("RCA_LLAMA_SERVER_EMBEDDING", "http://127.0.0.1:8082")
+
+# Keep-alive connections kept open per server
+LLAMA_SERVER_POOL_SIZE = _env_int("RCA_LLAMA_SERVER_POOL_SIZE", 16)
+
+LLAMA_SERVER_TIMEOUT_SECONDS = float(os.getenv("RCA_LLAMA_SERVER_TIMEOUT_SECONDS", "300"))
+
+# Simulated latency of the mock backend, per uncached prompt token and per generated token
+MOCK_PROMPT_MS_PER_TOKEN = float(os.getenv("RCA_MOCK_PROMPT_MS", "0"))
+MOCK_GEN_MS_PER_TOKEN = float(os.getenv("RCA_MOCK_GEN_MS", "0"))
+
+
+# ============================================================================
+# RESPONSE CACHE
+# ============================================================================
+
+# Return stored completions for identical (model, prompt, sampling params) calls
+RESPONSE_CACHE_ENABLED = _env_bool("RCA_RESPONSE_CACHE", True)
+
+# Entries kept in the in-memory LRU
+RESPONSE_CACHE_MAX_ENTRIES = _env_int("RCA_RESPONSE_CACHE_MAX_ENTRIES", 2048)
+
+# Optional on-disk tier that survives restarts
+RESPONSE_CACHE_DISK = _env_bool("RCA_RESPONSE_CACHE_DISK", False)
+RESPONSE_CACHE_DISK_PATH = os.getenv("RCA_RESPONSE_CACHE_PATH", os.path.join(CACHE_DIR, "responses.db"))
+RESPONSE_CACHE_DISK_MAX_ENTRIES = _env_int("RCA_RESPONSE_CACHE_DISK_MAX_ENTRIES", 50000)
+
+# Deterministic mode: every call is seeded, so sampled generator output
+# (questions, reports) becomes reproducible and cacheable too
+RESPONSE_CACHE_DETERMINISTIC = _env_bool("RCA_DETERMINISTIC", False)
+RESPONSE_CACHE_SEED = _env_int("RCA_SEED", 42)
+
+# Without deterministic mode only near-greedy calls (the validator) are cached
+RESPONSE_CACHE_MAX_TEMPERATURE = float(os.getenv("RCA_RESPONSE_CACHE_MAX_TEMPERATURE", "0.2"))
+
+
+# ============================================================================
+# SIMILAR-INCIDENT INDEX
+# ============================================================================
+
+# Embed completed analyses and look up similar ones at /start.
+# Off by default: it loads and runs an embedding model as well
+INCIDENT_INDEX_ENABLED = _env_bool("RCA_INCIDENT_INDEX", False)
+
+INCIDENT_INDEX_PATH = os.getenv("RCA_INCIDENT_INDEX_PATH", os.path.join(CACHE_DIR, "incidents"))
+
+# Cosine similarity above which the first question is reused from the prior analysis
+INCIDENT_MATCH_THRESHOLD = float(os.getenv("RCA_INCIDENT_MATCH_THRESHOLD", "0.9"))
+
+# Near-matches returned with /start
+INCIDENT_MATCH_TOP_K = _env_int("RCA_INCIDENT_MATCH_TOP_K", 3)
+
+
+# ============================================================================
+# USER INTERFACE
+# ============================================================================
+
+# Mount the Gradio UI on the API server (one process, one port); the UI then
+# calls the session steps directly. 0 runs it as a separate server on port 7860
+# that talks to the API over HTTP.
+SINGLE_SERVER = _env_bool("RCA_SINGLE_SERVER", True)
+
+# Path of the UI in single-server mode
+UI_PATH = os.getenv("RCA_UI_PATH", "/ui")
+
+# API used by a separately run UI
+API_BASE = os.getenv("RCA_API_BASE", "http://localhost:8000")
@@ -0,0 +1,108 @@
+"""
+Context Budget Module
+Keeps the why history in generator prompts under a token budget
+
+format_whys_context repeats every question and answer verbatim. While that
+text fits WHYS_CONTEXT_TOKEN_BUDGET it is used unchanged. Beyond it, the oldest
+whys are replaced by a short summary and only the latest ones stay verbatim.
+The summary is stored in the state ("whys_summary") and extended rather than
+regenerated as more whys age out, so each session pays for it once per why and
+successive prompts keep an identical prefix for the KV cache.
+"""
+
+from app.config import (
+    CONTEXT_BUDGET_ENABLED,
+    WHYS_CONTEXT_TOKEN_BUDGET,
+    WHYS_KEEP_RECENT,
+    WHYS_SUMMARY_MAX_TOKENS
+)
+from app.helpers import RCAState, format_whys_context
+from app.model_loading import count_tokens, generate_response_extended
+from app.prompt_definitions import create_whys_summary_prompt
+
+
+def _format_why(number: int, why: dict) -> str:
+    """One entry exactly as format_whys_context renders it"""
+    return f"Why {number}: {why['question']}\nAnswer: {why['answer']}"
+
+
+def _summary_header(count: int) -> str:
+    return f"Summary of Whys 1-{count}:" if count > 1 else "Summary of Why 1:"
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Shorten text to roughly max_tokens, keeping its beginning"""
+    for _ in range(3):
+        tokens = count_tokens(text)
+        if tokens <= max_tokens:
+            return text
+        keep = max(1, int(len(text) * max_tokens / tokens * 0.95))
+        text = text[:keep].rstrip() + " [...]"
+    return text
+
+
+def _summarized_count(state: RCAState) -> int:
+    """How many of the oldest whys must be summarized to fit the budget"""
+    whys = state["whys"]
+    previous = (state.get("whys_summary") or {}).get("count", 0)
+    count = max(previous, len(whys) - WHYS_KEEP_RECENT, 1)
+
+    # Summarize more whys while the verbatim rest is still too long
+    summary_tokens = WHYS_SUMMARY_MAX_TOKENS + count_tokens(_summary_header(count))
+    while count < len(whys) - 1:
+        recent = "\n\n".join(_format_why(i, why) for i, why in enumerate(whys[count:], count + 1))
+        if summary_tokens + count_tokens(recent) <= WHYS_CONTEXT_TOKEN_BUDGET:
+            break
+        count += 1
+    return min(count, len(whys))
+
+
+def _summary(state: RCAState, count: int) -> str:
+    """Summary of the first count whys, extending the stored one if possible"""
+    stored = state.get("whys_summary") or {}
+    if stored.get("count") == count:
+        return stored["text"]
+
+    done = stored.get("count", 0) if stored.get("count", 0) < count else 0
+    previous = stored.get("text", "") if done else ""
+    new_whys = "\n\n".join(
+        _format_why(i, why) for i, why in enumerate(state["whys"][done:count], done + 1)
+    )
+
+    print(f"Summarizing Whys 1-{count} to fit the context budget...")
+    prompt = create_whys_summary_prompt(state["problem"], previous, new_whys)
+    text = generate_response_extended(prompt, max_tokens=WHYS_SUMMARY_MAX_TOKENS)
+
+    state["whys_summary"] = {"count": count, "text": text}
+    return text
+
+
+def bounded_whys_context(state: RCAState) -> str:
+    """
+    Why history for a generator prompt, at most WHYS_CONTEXT_TOKEN_BUDGET tokens
+    Same text as format_whys_context whenever the full history fits
+    May store a summary in the state
+    """
+    whys = state["whys"]
+    full = format_whys_context(whys)
+    if not CONTEXT_BUDGET_ENABLED or not whys or count_tokens(full) <= WHYS_CONTEXT_TOKEN_BUDGET:
+        return full
+
+    count = _summarized_count(state)
+    summary = _truncate(_summary(state, count), WHYS_SUMMARY_MAX_TOKENS)
+    parts = [f"{_summary_header(count)} {summary}"]
+    parts += [_format_why(i, why) for i, why in enumerate(whys[count:], count + 1)]
+    context = "\n\n".join(parts)
+
+    # A single very long answer can still exceed the budget: cut the answers
+    # of the verbatim whys, newest last
+    overflow = count_tokens(context) - WHYS_CONTEXT_TOKEN_BUDGET
+    if overflow > 0 and len(parts) > 1:
+        per_why = max(32, (WHYS_CONTEXT_TOKEN_BUDGET - count_tokens(parts[0])) // (len(parts) - 1))
+        parts[1:] = [
+            _format_why(i, dict(why, answer=_truncate(why["answer"], per_why)))
+            for i, why in enumerate(whys[count:], count + 1)
+        ]
+        context = "\n\n".join(parts)
+
+    return context
@@ -0,0 +1,178 @@
+"""
+Fake Model Module
+Deterministic stand-in for llama_cpp.Llama, used by the mock backend
+
+FakeLlama answers each kind of RCA prompt (why question, validation,
+systematic check, root cause, report) with well-formed text derived from a
+hash of the prompt, so parsers and routing behave as with a real model.
+Latency is simulated per prompt token that is not already in the context and
+per generated token, which keeps the effect of the KV and prefix caches visible.
+"""
+
+import hashlib
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+_WORDS = (
+    "deployment", "config", "timeout", "cache", "queue", "retry", "schema",
+    "monitoring", "alert", "review", "rollback", "capacity", "dependency",
+    "owner", "runbook", "test", "threshold", "migration", "release", "index"
+)
+
+
+class FakeState:
+    """Minimal LlamaState: the attributes kv_cache and prefix_cache read"""
+
+    def __init__(self, input_ids: np.ndarray):
+        self.input_ids = input_ids
+        self.scores = np.zeros((1, 1), dtype=np.float32)
+        self.llama_state_size = int(input_ids.nbytes)
+
+
+class FakeLlama:
+    """Drop-in for the parts of llama_cpp.Llama used by LlamaCppBackend"""
+
+    def __init__(self, model_path: str = "fake.gguf", prompt_ms_per_token: float = 0.0,
+                 gen_ms_per_token: float = 0.0, embedding_dim: int = 64, report_tokens: int = 400):
+        self.model_path = model_path
+        self.prompt_ms_per_token = prompt_ms_per_token
+        self.gen_ms_per_token = gen_ms_per_token
+        self.embedding_dim = embedding_dim
+        self.report_tokens = report_tokens
+        self.input_ids = np.zeros(0, dtype=np.intc)
+        # Simulated llama.cpp perf counters: prompt tokens, prompt s, decoded tokens, decode s
+        self._perf = [0, 0.0, 0, 0.0]
+
+    # ------------------------------------------------------------------ tokens
+
+    @staticmethod
+    def tokenize(text, add_bos: bool = False, special: bool = False) -> List[int]:
+        """Whitespace tokens hashed to ids (stable across runs)"""
+        if isinstance(text, bytes):
+            text = text.decode("utf-8")
+        return [int(hashlib.md5(word.encode("utf-8")).hexdigest()[:6], 16) for word in text.split()]
+
+    def _evaluate(self, tokens: List[int]):
+        """Simulate prompt evaluation, reusing the tokens already in the context"""
+        reused = 0
+        for old, new in zip(self.input_ids.tolist(), tokens):
+            if old != new:
+                break
+            reused += 1
+        self._sleep(self.prompt_ms_per_token * (len(tokens) - reused))
+        self._perf[0] += len(tokens) - reused
+        self._perf[1] += self.prompt_ms_per_token * (len(tokens) - reused) / 1000.0
+        self.input_ids = np.asarray(tokens, dtype=np.intc)
+
+    def _decode(self, n: int):
+        """Simulate generating n tokens"""
+        self._sleep(self.gen_ms_per_token * n)
+        self._perf[2] += n
+        self._perf[3] += self.gen_ms_per_token * n / 1000.0
+
+    def reset_perf(self):
+        self._perf = [0, 0.0, 0, 0.0]
+
+    def perf_counters(self) -> tuple:
+        """(prompt tokens, prompt seconds, decoded tokens, decode seconds) since reset_perf"""
+        return tuple(self._perf)
+
+    @staticmethod
+    def _sleep(ms: float):
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    # ---------------------------------------------------------------- answers
+
+    @staticmethod
+    def _pick(seed: bytes, n: int) -> List[str]:
+        digest = hashlib.sha256(seed).digest()
+        return [_WORDS[digest[i % len(digest)] % len(_WORDS)] for i in range(n)]
+
+    def _answer(self, prompt: str, max_tokens: int, constrained: bool = False) -> str:
+        """constrained: output as the validator grammars allow (no extra text)"""
+        seed = prompt.encode("utf-8")
+        words = self._pick(seed, 6)
+
+        if "Specificity:" in prompt:
+            score = 2 + hashlib.sha256(seed).digest()[0] % 4
+            needs_improvement = score < 3
+            text = (f"Specificity: {score}\nRelevance: {min(5, score + 1)}\n"
+                    f"Needs Improvement: {'yes' if needs_improvement else 'no'}")
+            if needs_improvement or not constrained:
+                text += f"\nSuggestion: Mention the {words[0]} and {words[1]} involved."
+            if "Systematic:" in prompt:
+                text += f"\nSystematic: {'yes' if score >= 5 else 'no'}"
+            return text
+        if "SYSTEMATIC" in prompt:
+            if constrained:
+                return "Systematic: no"
+            return f"Systematic: no\nReason: The {words[0]} issue is still a symptom."
+        if "Format your response as:" in prompt:
+            why_no = prompt.rsplit("Why ", 1)[-1].split(":", 1)[0].strip()
+            return f"Why {why_no}: Why did the {words[0]} {words[1]} fail during the {words[2]}?"
+        if prompt.rstrip().endswith("Summary:"):
+            return (f"The {words[0]} failed because the {words[1]} was changed; "
+                    f"the {words[2]} had no {words[3]}.")
+        if prompt.rstrip().endswith("Root Cause:"):
+            return (f"The {words[0]} process lacked a {words[1]} check, so "
+                    f"{words[2]} changes reached production without {words[3]}.")
+
+        # Reports and anything else: a long markdown body
+        n = min(max_tokens, self.report_tokens)
+        body = self._pick(seed + b"report", n)
+        if "without a heading" in prompt:
+            # One section of the parallel report
+            return " ".join(body)
+        text = "## Summary\n" + " ".join(body)
+        if "END OF REPORT" in prompt and n < max_tokens:
+            text += "\nEND OF REPORT"
+        return text
+
+    @staticmethod
+    def _apply_stop(text: str, stop) -> str:
+        """Cut the text before the first stop sequence, as llama-cpp does"""
+        if isinstance(stop, str):
+            stop = [stop]
+        for sequence in stop or []:
+            index = text.find(sequence)
+            if index != -1:
+                text = text[:index]
+        return text
+
+    # -------------------------------------------------------------- llama API
+
+    def create_chat_completion(self, messages: List[Dict], max_tokens: int = 256, temperature: float = 0.8,
+                               stream: bool = False, seed: Optional[int] = None, **kwargs):
+        prompt = messages[-1]["content"]
+        self._evaluate(self.tokenize(prompt))
+        text = self._answer(prompt, max_tokens, constrained=kwargs.get("grammar") is not None)
+        text = self._apply_stop(text, kwargs.get("stop"))
+
+        if stream:
+            return self._stream(text)
+
+        self._decode(len(text.split()))
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop"}]}
+
+    def _stream(self, text: str):
+        for i, word in enumerate(text.split(" ")):
+            self._decode(1)
+            yield {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word},
+                                "finish_reason": None}]}
+
+    def embed(self, text: str, truncate: bool = True) -> List[float]:
+        self._evaluate(self.tokenize(text))
+        rng = np.random.default_rng(int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16))
+        return rng.standard_normal(self.embedding_dim).astype(np.float32).tolist()
+
+    def save_state(self) -> FakeState:
+        return FakeState(self.input_ids.copy())
+
+    def load_state(self, state: FakeState):
+        self.input_ids = state.input_ids.copy()
+
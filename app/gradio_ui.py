@@ -3,12 +3,18 @@ Gradio UI Module
 Interactive web interface for RCA Analysis
 """
 
+import asyncio
+import json
+
 import gradio as gr
-import requests
-import os
+import httpx
+
+from app.config import API_BASE, REPORT_DIR, UI_PATH
 
-# API base URL
-API_BASE = "http://localhost:8000"
+# Timeouts of API requests; streamed responses send an event at least per token
+REQUEST_TIMEOUT = httpx.Timeout(120, connect=5)
+# Seconds between polls of a report job
+JOB_POLL_INTERVAL = 0.5
 
 def format_chat_history(history):
     """Helper to ensure history is list of dicts for type='messages'"""
@@ -16,15 +22,132 @@ def format_chat_history(history):
         return []
     return history
 
-def start_analysis(problem, history):
-    """Initialize session and start chat"""
+# --- Backend access ---
+
+class LocalEngine:
+    """Session steps called in this process (UI mounted on the API app)"""
+    
+    def __init__(self):
+        from app import api
+        self.api = api
+    
+    async def events(self, kind, payload):
+        """Yield (event, data) of a session step; raises if it fails"""
+        async for event, data in self.api.local_step_events(kind, payload):
+            if event == "error":
+                raise RuntimeError(data.get("detail", "Unknown error"))
+            yield event, data
+    
+    async def delete_session(self, session_id):
+        await self.api.delete_session(session_id)
+    
+    async def report_download(self, session_id, report_file):
+        """File for the download button"""
+        return await self.api.run_io(self.api.report_store.export, session_id, "md")
+
+class HTTPEngine:
+    """Session steps called over HTTP on a separately run API (one pooled async client)"""
+    
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._client = None
+    
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=REQUEST_TIMEOUT)
+        return self._client
+    
+    async def events(self, kind, payload):
+        """
+        Yield (event, data) of a session step; raises if it fails
+        Reports run as a polled job, so no request stays open for the whole report
+        """
+        if kind == "generate_report":
+            async for item in self._job_events(f"/jobs/{kind}", payload):
+                yield item
+            return
+        
+        async with self.client.stream("POST", f"/{kind}/stream", json=payload) as response:
+            response.raise_for_status()
+            event, data_lines = None, []
+            async for line in response.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data_lines.append(line[len("data:"):].strip())
+                elif line == "" and event:
+                    data = json.loads("\n".join(data_lines)) if data_lines else {}
+                    if event == "error":
+                        raise RuntimeError(data.get("detail", "Unknown error"))
+                    yield event, data
+                    event, data_lines = None, []
+    
+    async def _job_events(self, path, payload):
+        """Submit a job and poll it, yielding new progress text as token events"""
+        response = await self.client.post(path, json=payload)
+        response.raise_for_status()
+        job = response.json()
+        shown = 0
+        try:
+            while True:
+                text = job["progress"].get("text", "")
+                if len(text) > shown:
+                    yield "token", {"text": text[shown:]}
+                    shown = len(text)
+                if job["status"] == "succeeded":
+                    yield "done", job["result"]
+                    return
+                if job["status"] in ("failed", "cancelled"):
+                    raise RuntimeError((job.get("error") or {}).get("detail", f"Job {job['status']}"))
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+                response = await self.client.get(f"/jobs/{job['job_id']}")
+                response.raise_for_status()
+                job = response.json()
+        except (GeneratorExit, asyncio.CancelledError):
+            # UI event abandoned (page closed): stop the generation as well
+            try:
+                await self.client.delete(f"/jobs/{job['job_id']}", timeout=5)
+            except httpx.HTTPError:
+                pass
+            raise
+    
+    async def delete_session(self, session_id):
+        try:
+            await self.client.delete(f"/session/{session_id}", timeout=5)
+        except httpx.HTTPError:
+            pass
+    
+    async def report_download(self, session_id, report_file):
+        """Gradio fetches the download from the API itself"""
+        return f"{self.base_url}{report_file}?format=md"
+
+# Set to a LocalEngine by mount_gradio()
+engine = HTTPEngine(API_BASE)
+
+def question_text(partial):
+    """Strip the 'Why N:' prefix from a partially generated question"""
+    return partial.split(":", 1)[1].strip() if ":" in partial else ""
+
+async def start_analysis(problem, history):
+    """Initialize session and start chat (question streams in as it is generated)"""
     if not problem.strip():
         raise gr.Error("Please describe the problem first.")
     
     try:
-        response = requests.post(f"{API_BASE}/start", json={"problem": problem})
-        response.raise_for_status()
-        data = response.json()
+        history = format_chat_history(history)
+        history.append({"role": "user", "content": problem})
+        history.append({"role": "assistant", "content": "**Why 1:** "})
+        
+        partial = ""
+        data = None
+        async for event, payload in engine.events("start", {"problem": problem}):
+            if event == "token":
+                partial += payload["text"]
+                history[-1]["content"] = f"**Why 1:** {question_text(partial)}"
+                yield {}, history, gr.update(value=""), gr.update(visible=True)
+            elif event == "done":
+                data = payload
         
         # Update session state with new tracking fields
         session_state = {
@@ -36,17 +159,15 @@ def start_analysis(problem, history):
             "root_cause_found": False 
         }
         
-        # Add bot welcome and first question
-        history = format_chat_history(history)
-        history.append({"role": "user", "content": problem})
-        history.append({"role": "assistant", "content": f"**Why 1:** {data['current_question']}"})
+        # Replace the streamed text with the final first question
+        history[-1]["content"] = f"**Why 1:** {data['current_question']}"
         
-        return session_state, history, gr.update(value=""), gr.update(visible=True)
+        yield session_state, history, gr.update(value=""), gr.update(visible=True)
         
     except Exception as e:
         raise gr.Error(f"Connection failed: {str(e)}")
 
-def process_user_input(user_msg, history, session):
+async def process_user_input(user_msg, history, session):
     """Handle user answer submission"""
     
     # 1. Check if session is active
@@ -55,7 +176,8 @@ def process_user_input(user_msg, history, session):
 
     # 2. STOP if analysis is already done
     if session.get("completed", False):
-        return history, session, gr.update()
+        yield history, session, gr.update()
+        return
 
     is_improving = session.get("awaiting_improvement", False)
 
@@ -63,7 +185,8 @@ def process_user_input(user_msg, history, session):
     if not user_msg.strip():
         if not is_improving:
             gr.Warning("Please provide an answer.")
-            return history, session, gr.update()
+            yield history, session, gr.update()
+            return
         else:
             # IMPROVEMENT SKIP: treating empty input as "keep old answer"
             pass 
@@ -91,11 +214,25 @@ def process_user_input(user_msg, history, session):
         session["last_answer"] = user_msg
         history.append({"role": "user", "content": user_msg})
 
-    # 5. Submit to API
+    # 5. Submit to API (next question / root cause streams into a placeholder)
     try:
-        response = requests.post(f"{API_BASE}/answer", json=payload)
-        response.raise_for_status()
-        data = response.json()
+        partial = ""
+        streaming = False
+        data = None
+        async for event, event_data in engine.events("answer", payload):
+            if event == "token":
+                if not streaming:
+                    history.append({"role": "assistant", "content": ""})
+                    streaming = True
+                partial += event_data["text"]
+                history[-1]["content"] = partial
+                yield history, session, gr.update(value="")
+            elif event == "done":
+                data = event_data
+        
+        # Final messages below replace the streamed placeholder
+        if streaming:
+            history.pop()
         
         # Case A: Needs Improvement
         if data.get("needs_improvement"):
@@ -104,11 +241,12 @@ def process_user_input(user_msg, history, session):
             history.append({"role": "assistant", "content": warning_msg})
             session["awaiting_improvement"] = True
             
-            return (
+            yield (
                 history, 
                 session, 
                 gr.update(value="", placeholder="Enter improved answer (or press Enter to skip)...")
             )
+            return
 
         # Valid answer accepted
         session["awaiting_improvement"] = False
@@ -119,11 +257,12 @@ def process_user_input(user_msg, history, session):
             history.append({"role": "assistant", "content": next_q})
             session["why_no"] = data["why_no"]
             
-            return (
+            yield (
                 history, 
                 session, 
                 gr.update(value="", placeholder="Type your answer here...")
             )
+            return
 
         # Case C: Root Cause Extracted (Analysis Complete)
         if data.get("root_cause_extracted"):
@@ -139,7 +278,7 @@ def process_user_input(user_msg, history, session):
             # Set flag to True so the next event knows to generate report
             session["root_cause_found"] = True
             
-            return (
+            yield (
                 history,
                 session,
                 gr.update(value="", placeholder="Analysis complete.")
@@ -147,28 +286,39 @@ def process_user_input(user_msg, history, session):
 
     except Exception as e:
         history.append({"role": "assistant", "content": f"❌ Error: {str(e)}"})
-        return history, session, gr.update()
+        yield history, session, gr.update()
 
-def generate_final_report(session, history):
-    """Trigger final report generation and switch to report view"""
+async def generate_final_report(session, history):
+    """Trigger final report generation and switch to report view (report streams in)"""
     
     # STRICT CHECK: Only generate if the flag is set
     if not session or not session.get("root_cause_found", False):
-        return gr.update(), gr.update(), gr.update(), gr.update(), gr.update(), "chat", session
+        yield gr.update(), gr.update(), gr.update(), gr.update(), history, "chat", session
+        return
         
     try:
-        response = requests.post(f"{API_BASE}/generate_report", json={"session_id": session["id"]})
-        response.raise_for_status()
-        data = response.json()
+        partial = ""
+        data = None
+        async for event, payload in engine.events("generate_report", {"session_id": session["id"]}):
+            if event == "token":
+                partial += payload["text"]
+                # Switch to the report view as soon as text arrives
+                yield (
+                    gr.update(visible=False),
+                    gr.update(visible=True),
+                    gr.update(value=partial),
+                    gr.update(visible=False),
+                    history,
+                    "report",
+                    session
+                )
+            elif event == "done":
+                data = payload
         
         report_content = data["report"]
         
-        # Create an absolute path for the file to ensure Gradio can serve it
-        filename = f"RCA_Report_{data['session_id'][:8]}.md"
-        abs_path = os.path.abspath(filename)
-        
-        with open(abs_path, "w", encoding="utf-8") as f:
-            f.write(report_content)
+        # The report store keeps one copy per session
+        download = await engine.report_download(data["session_id"], data["report_file"])
         
         # Mark session as fully completed to lock UI
         session["completed"] = True
@@ -176,11 +326,11 @@ def generate_final_report(session, history):
         # Add final message to chat
         history.append({"role": "assistant", "content": "✅ **Report Generated Successfully!** View the complete analysis report."})
             
-        return (
+        yield (
             gr.update(visible=False),  # chat_view - Hide chat
             gr.update(visible=True),   # report_view - Show report
             gr.update(value=report_content),  # report_display
-            gr.update(visible=True, value=abs_path),  # download_btn
+            gr.update(visible=True, value=download),  # download_btn
             history,  # Updated chat history
             "report",  # view_state
             session
@@ -188,9 +338,9 @@ def generate_final_report(session, history):
         
     except Exception as e:
         history.append({"role": "assistant", "content": f"❌ Error generating report: {e}"})
-        return (
-            gr.update(),  # chat_view
-            gr.update(),  # report_view
+        yield (
+            gr.update(visible=True),  # chat_view
+            gr.update(visible=False),  # report_view
             gr.update(),  # report_display
             gr.update(),  # download_btn
             history,
@@ -203,8 +353,12 @@ def toggle_chat_drawer(current_visibility, history):
     new_visibility = not current_visibility
     return gr.update(visible=new_visibility), history
 
-def reset_to_new_analysis():
+async def reset_to_new_analysis(session):
     """Reset everything for a new analysis"""
+    # Free the finished session on the backend (the sweeper catches it otherwise)
+    if session and session.get("id"):
+        await engine.delete_session(session["id"])
+    
     return (
         {},  # Reset session
         [],  # Clear chat history
@@ -294,11 +448,19 @@ def create_gradio_interface():
 
         # --- Event Wiring ---
         
-        def handle_submit(user_input, history, session):
+        async def handle_submit(user_input, history, session):
             if not session or not session.get("id"):
-                return start_analysis(user_input, history)
+                async for update in start_analysis(user_input, history):
+                    yield update
+            else:
+                yield session, history, gr.update(), gr.update()
+
+        async def maybe_generate_report(session, history):
+            if session.get("root_cause_found"):
+                async for update in generate_final_report(session, history):
+                    yield update
             else:
-                return session, history, gr.update(), gr.update()
+                yield gr.update(), gr.update(), gr.update(), gr.update(), history, "chat", session
 
         # Chain: User submits input (Enter or Button)
         submit_event = msg_input.submit(
@@ -310,9 +472,7 @@ def create_gradio_interface():
             inputs=[msg_input, chatbot, session_state],
             outputs=[chatbot, session_state, msg_input]
         ).then(
-            fn=lambda s, h: generate_final_report(s, h) if s.get("root_cause_found") else (
-                gr.update(), gr.update(), gr.update(), gr.update(), h, "chat", s
-            ),
+            fn=maybe_generate_report,
             inputs=[session_state, chatbot],
             outputs=[chat_view, report_view, report_display, download_btn, chatbot, view_state, session_state]
         )
@@ -327,9 +487,7 @@ def create_gradio_interface():
             inputs=[msg_input, chatbot, session_state],
             outputs=[chatbot, session_state, msg_input]
         ).then(
-            fn=lambda s, h: generate_final_report(s, h) if s.get("root_cause_found") else (
-                gr.update(), gr.update(), gr.update(), gr.update(), h, "chat", s
-            ),
+            fn=maybe_generate_report,
             inputs=[session_state, chatbot],
             outputs=[chat_view, report_view, report_display, download_btn, chatbot, view_state, session_state]
         )
@@ -351,6 +509,7 @@ def create_gradio_interface():
         # New analysis button
         new_analysis_btn.click(
             fn=reset_to_new_analysis,
+            inputs=[session_state],
             outputs=[
                 session_state,
                 chatbot,
@@ -366,8 +525,15 @@ def create_gradio_interface():
     return demo
 
 def launch_gradio():
+    """Run the UI as its own server, calling the API at RCA_API_BASE"""
     demo = create_gradio_interface()
-    demo.launch(server_name="0.0.0.0", server_port=7860, share=False)
+    demo.launch(server_name="0.0.0.0", server_port=7860, share=False, allowed_paths=[REPORT_DIR])
+
+def mount_gradio(app, path=UI_PATH):
+    """Serve the UI from the API app itself; UI actions call the session steps directly"""
+    global engine
+    engine = LocalEngine()
+    return gr.mount_gradio_app(app, create_gradio_interface(), path=path, allowed_paths=[REPORT_DIR])
 
 if __name__ == "__main__":
     launch_gradio()
\ No newline at end of file
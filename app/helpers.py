@@ -4,8 +4,9 @@ Exact copy from notebook: HELPER FUNCTIONS section
 No modifications to logic or behavior
 """
 
+import re
 from datetime import datetime
-from typing import TypedDict
+from typing import Optional, TypedDict
 
 
 class RCAState(TypedDict):
@@ -20,6 +21,8 @@ class RCAState(TypedDict):
     needs_validation: bool  # Flag for answer validation
     retry_count: int  # Number of validation retries
     early_root_cause_found: bool  # NEW: Flag for systematic root cause detection at Why 4+
+    session_id: str  # API session owning this state (keys the generator KV cache)
+    whys_summary: dict  # {"count", "text"}: summary of the oldest whys once the history exceeds its token budget
 
 
 def format_whys_context(whys: list[dict]) -> str:
@@ -33,6 +36,89 @@ def format_whys_context(whys: list[dict]) -> str:
     return context.strip()
 
 
+class ValidationResult(TypedDict):
+    """Parsed validator output"""
+    specificity: float  # 1-5
+    relevance: float  # 1-5
+    needs_improvement: bool
+    suggestion: str
+    systematic: Optional[bool]  # None unless the combined format was used
+
+
+# Output of the grammar-constrained validator (see VALIDATION_GRAMMAR)
+_CONSTRAINED_VALIDATION = re.compile(
+    r"Specificity: ([1-5])\nRelevance: ([1-5])\nNeeds Improvement: (yes|no)"
+    r"(?:\nSuggestion: ([^\n]+))?(?:\nSystematic: (yes|no))?"
+)
+
+
+def parse_constrained_validation(response: str) -> Optional[ValidationResult]:
+    """Parse grammar-constrained validator output, None if it does not match exactly"""
+    match = _CONSTRAINED_VALIDATION.fullmatch(response.strip())
+    if match is None:
+        return None
+    specificity, relevance, improvement, suggestion, systematic = match.groups()
+    return ValidationResult(
+        specificity=float(specificity),
+        relevance=float(relevance),
+        needs_improvement=improvement == "yes",
+        suggestion=suggestion.strip() if suggestion else "Please provide more details.",
+        systematic=None if systematic is None else systematic == "yes"
+    )
+
+
+def parse_validation_response(response: str) -> ValidationResult:
+    """
+    Parse validator output (plain or combined format)
+    Missing scores default to 3.0; "systematic" is None unless the output has a Systematic line
+    """
+    constrained = parse_constrained_validation(response)
+    if constrained is not None:
+        return constrained
+    
+    # Free-form output (grammar disabled or a backend without grammar support)
+    result = {
+        "specificity": 3.0,  # Default
+        "relevance": 3.0,    # Default
+        "needs_improvement": False,
+        "suggestion": "Please provide more details.",
+        "systematic": None
+    }
+    
+    for line in response.split('\n'):
+        if 'Specificity:' in line:
+            try:
+                result["specificity"] = float(line.split(':')[1].strip().split()[0])
+            except:
+                pass
+        elif 'Relevance:' in line:
+            try:
+                result["relevance"] = float(line.split(':')[1].strip().split()[0])
+            except:
+                pass
+        elif 'Needs Improvement:' in line:
+            result["needs_improvement"] = 'yes' in line.lower()
+        elif 'Systematic:' in line:
+            result["systematic"] = 'yes' in line.lower()
+    
+    if 'Suggestion:' in response:
+        suggestion = response.split('Suggestion:')[-1]
+        # In the combined format the Systematic line follows the suggestion
+        suggestion = suggestion.split('Systematic:')[0].strip()
+        if suggestion:
+            result["suggestion"] = suggestion
+    
+    return result
+
+
+def parse_systematic_response(response: str) -> bool:
+    """Parse the systematic root cause check output"""
+    for line in response.split('\n'):
+        if 'Systematic:' in line:
+            return 'yes' in line.lower()
+    return False
+
+
 def calculate_answer_quality_score(whys: list[dict]) -> float:
     """Calculate average quality score of all answers - exact copy from notebook"""
     if not whys:
@@ -42,10 +128,11 @@ def calculate_answer_quality_score(whys: list[dict]) -> float:
     return (total_score / len(whys)) / 5.0 * 100  # Convert to percentage
 
 
-def export_report_to_markdown(state: RCAState, filename: str = "rca_report.md") -> str:
-    """Export report to markdown file - exact copy from notebook"""
-    markdown_content = f"""# Root Cause Analysis Report
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+def format_report_markdown(state: RCAState, generated: Optional[datetime] = None) -> str:
+    """Markdown document of a finished analysis - exact format from notebook"""
+    generated = generated or datetime.now()
+    return f"""# Root Cause Analysis Report
+**Generated:** {generated.strftime('%Y-%m-%d %H:%M:%S')}
 
 ## Problem Statement
 {state['problem']}
@@ -58,6 +145,11 @@ def export_report_to_markdown(state: RCAState, filename: str = "rca_report.md")
 
 **Overall Confidence Score:** {state['confidence_score']:.1f}%
 """
+
+
+def export_report_to_markdown(state: RCAState, filename: str = "rca_report.md") -> str:
+    """Export report to markdown file - exact copy from notebook"""
+    markdown_content = format_report_markdown(state)
     
     with open(filename, 'w') as f:
         f.write(markdown_content)
@@ -0,0 +1,127 @@
+"""
+Incident Index Module
+Embedding index over completed analyses, used to find similar prior incidents
+
+Each completed session's problem statement is embedded, the same text a new
+session is looked up with, and appended as a unit-length row of a float32
+NumPy matrix; the whole analysis (problem, whys and root cause) is kept in its
+record. A lookup is one matrix-vector product plus a partial sort -
+milliseconds even at tens of thousands of rows.
+
+Rows and their metadata are persisted append-only next to each other:
+    <path>.f32    raw float32 vectors, one row per incident
+    <path>.jsonl  one JSON record per incident, same order
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def incident_document(problem: str, whys: List[Dict], root_cause: str) -> str:
+    """Text of a completed analysis, stored with its index record"""
+    lines = [f"Problem: {problem}"]
+    for i, why in enumerate(whys, 1):
+        lines.append(f"Why {i}: {why['question']} {why['answer']}")
+    lines.append(f"Root cause: {root_cause}")
+    return "\n".join(lines)
+
+
+class IncidentIndex:
+    """Cosine-similarity index with incremental append"""
+
+    def __init__(self, path: Optional[str] = None, initial_capacity: int = 1024):
+        self.path = path
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._records: List[Dict] = []
+        self._lock = threading.Lock()
+
+        if path:
+            self._load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _load(self):
+        vectors_path, records_path = f"{self.path}.f32", f"{self.path}.jsonl"
+        if not (os.path.exists(vectors_path) and os.path.exists(records_path)):
+            return
+
+        with open(records_path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        if not records:
+            return
+
+        dim = records[0]["dim"]
+        vectors = np.fromfile(vectors_path, dtype=np.float32)
+        # An interrupted append can leave one side longer than the other
+        n = min(len(records), vectors.size // dim)
+        vectors = vectors[: n * dim].reshape(n, dim)
+
+        self._matrix = np.empty((max(n * 2, self._initial_capacity), dim), dtype=np.float32)
+        self._matrix[:n] = vectors
+        self._size = n
+        self._records = records[:n]
+        print(f"Loaded incident index with {n} incidents")
+
+    def _append_to_disk(self, vector: np.ndarray, record: Dict):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.f32", "ab") as f:
+            f.write(vector.astype(np.float32).tobytes())
+        with open(f"{self.path}.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def add(self, vector, record: Dict):
+        """Append one incident (vector is normalized here)"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        vector = vector / norm
+        record = dict(record, dim=int(vector.shape[0]))
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.empty((self._initial_capacity, vector.shape[0]), dtype=np.float32)
+            elif vector.shape[0] != self._matrix.shape[1]:
+                raise ValueError(f"Embedding size {vector.shape[0]} does not match index size {self._matrix.shape[1]}")
+            elif self._size == self._matrix.shape[0]:
+                # Amortized O(1) append: double the capacity
+                grown = np.empty((self._matrix.shape[0] * 2, self._matrix.shape[1]), dtype=np.float32)
+                grown[: self._size] = self._matrix[: self._size]
+                self._matrix = grown
+
+            self._matrix[self._size] = vector
+            self._size += 1
+            self._records.append(record)
+
+            if self.path:
+                self._append_to_disk(vector, record)
+
+    def search(self, vector, k: int = 3) -> List[Tuple[float, Dict]]:
+        """Top-k incidents by cosine similarity, best first"""
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+
+        with self._lock:
+            if self._size == 0 or query.shape[0] != self._matrix.shape[1]:
+                return []
+            scores = self._matrix[: self._size] @ query
+            records = self._records
+
+        k = min(k, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), records[i]) for i in top]
@@ -0,0 +1,183 @@
+"""
+Inference Executor Module
+Runs every llama-cpp call on a dedicated worker thread per model
+
+llama_cpp.Llama objects are not thread-safe, so each model gets exactly one
+worker thread that owns it and a FIFO job queue in front of it. Jobs return
+concurrent.futures.Future objects, and async API handlers await graph nodes
+through a separate node pool so the event loop is never blocked by inference.
+"""
+
+import asyncio
+import functools
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator
+
+from app.config import IO_WORKERS, NODE_WORKERS
+
+
+# Markers passed from a streaming job to its consumer
+_STREAM_ITEM = object()
+_STREAM_ERROR = object()
+_STREAM_END = object()
+
+
+class InferenceExecutor:
+    """Single worker thread with a job queue that serializes access to one model"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._worker_loop,
+            name=f"inference-{name}",
+            daemon=True
+        )
+        self._thread.start()
+
+    def _worker_loop(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+
+            future, fn, args, kwargs = job
+            # Skip jobs that were cancelled while still queued
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue a job for the worker thread and return its future"""
+        future: Future = Future()
+
+        # A job that submits to its own executor would deadlock waiting on itself
+        if threading.current_thread() is self._thread:
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        self._jobs.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a job on the worker thread and block until it finishes"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stream(self, fn: Callable, *args, **kwargs) -> Iterator:
+        """
+        Run a generator job on the worker thread and iterate its items here
+        Closing the returned iterator stops the job at its next item
+        """
+        items: "queue.Queue" = queue.Queue()
+        cancelled = threading.Event()
+
+        def produce():
+            iterator = None
+            try:
+                iterator = iter(fn(*args, **kwargs))
+                for item in iterator:
+                    if cancelled.is_set():
+                        break
+                    items.put((_STREAM_ITEM, item))
+            except BaseException as e:
+                items.put((_STREAM_ERROR, e))
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+                items.put((_STREAM_END, None))
+
+        def consume():
+            try:
+                while True:
+                    kind, item = items.get()
+                    if kind is _STREAM_END:
+                        return
+                    if kind is _STREAM_ERROR:
+                        raise item
+                    yield item
+            finally:
+                cancelled.set()
+
+        self.submit(produce)
+        return consume()
+
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for the worker"""
+        return self._jobs.qsize()
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker after the jobs already queued"""
+        self._jobs.put(None)
+        if wait:
+            self._thread.join()
+
+
+# One executor per model name ("generator", "validator")
+_executors: Dict[str, InferenceExecutor] = {}
+_executors_lock = threading.Lock()
+
+# Threads that run whole graph nodes on behalf of async handlers
+node_pool = ThreadPoolExecutor(max_workers=NODE_WORKERS, thread_name_prefix="rca-node")
+
+# Threads for speculative nodes started from inside a node. Kept apart from
+# node_pool so a busy node pool can never deadlock waiting on its own queue.
+speculation_pool = ThreadPoolExecutor(max_workers=NODE_WORKERS, thread_name_prefix="rca-speculative")
+
+# Threads for quick blocking store I/O from async handlers, so it never waits
+# behind LLM steps queued on node_pool
+io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="rca-io")
+
+
+def get_executor(name: str) -> InferenceExecutor:
+    """Return the executor for a model, starting its worker on first use"""
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = InferenceExecutor(name)
+            _executors[name] = executor
+        return executor
+
+
+def queue_depths() -> Dict[str, int]:
+    """Jobs waiting per model worker"""
+    with _executors_lock:
+        executors = dict(_executors)
+    return {name: executor.queue_depth() for name, executor in executors.items()}
+
+
+def shutdown_executors(wait: bool = True):
+    """Stop all model workers and the node pools"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+
+    for executor in executors:
+        executor.shutdown(wait=wait)
+    node_pool.shutdown(wait=wait)
+    speculation_pool.shutdown(wait=wait)
+    io_pool.shutdown(wait=wait)
+
+
+async def run_node(fn: Callable, *args, **kwargs) -> Any:
+    """Await a blocking graph node without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(node_pool, functools.partial(fn, *args, **kwargs))
+
+
+async def run_io(fn: Callable, *args, **kwargs) -> Any:
+    """Await quick blocking store I/O without blocking the event loop or waiting on nodes"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_pool, functools.partial(fn, *args, **kwargs))
@@ -0,0 +1,177 @@
+"""
+Jobs Module
+Session steps run in the background and polled, instead of held open over HTTP
+
+Submitting a step returns a job id at once; the step runs on the node pool and
+its record (status, progress, result) is kept in a job store built from the
+session store classes, so any API worker can answer a poll when the store is
+SQLite. Cancelling a job stops it at the next generated token; a cancelled
+or failed step leaves its session as it was before the step.
+
+Job states: queued -> running -> succeeded | failed | cancelled
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future
+from typing import Callable, Dict, Optional
+
+from fastapi import HTTPException
+
+from app.config import (
+    SESSION_STORE,
+    JOB_DB_PATH,
+    JOB_TTL_SECONDS,
+    JOB_MAX_JOBS,
+    JOB_PROGRESS_INTERVAL_SECONDS
+)
+from app.session_store import MemorySessionStore, SQLiteSessionStore, SessionStore
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a running step once its job has been cancelled"""
+
+
+def create_job_store() -> SessionStore:
+    """Job records live in a store of their own, of the same kind as the sessions"""
+    if SESSION_STORE == "memory":
+        return MemorySessionStore(JOB_TTL_SECONDS, JOB_MAX_JOBS)
+    return SQLiteSessionStore(JOB_DB_PATH, JOB_TTL_SECONDS, JOB_MAX_JOBS)
+
+
+class _Progress:
+    """on_token callback of a running job: collects text, saves progress, checks for cancellation"""
+
+    def __init__(self, runner: "JobRunner", job_id: str):
+        self.runner = runner
+        self.job_id = job_id
+        self.text = []
+        self.chars = 0
+        self._last_flush = time.monotonic()
+
+    def __call__(self, text: str):
+        self.text.append(text)
+        self.chars += len(text)
+        if self.runner._cancel_requested(self.job_id):
+            raise JobCancelled(self.job_id)
+        if time.monotonic() - self._last_flush >= JOB_PROGRESS_INTERVAL_SECONDS:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        record = self.runner.update(self.job_id, progress={
+            "generated_chars": self.chars,
+            "text": "".join(self.text)
+        })
+        # Cancelled from another API worker
+        if record is not None and record["status"] == "cancelled":
+            raise JobCancelled(self.job_id)
+
+
+class JobRunner:
+    """Runs session steps as jobs on an executor and records their outcome"""
+
+    def __init__(self, store: SessionStore, executor: Executor):
+        self.store = store
+        self.executor = executor
+        self._futures: Dict[str, Future] = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, step: Callable, *args, session_id: Optional[str] = None) -> Dict:
+        """
+        Queue step(*args, on_token=...) and return the new job record
+        step returns a pydantic model, stored as the job's result
+        """
+        job_id = str(uuid.uuid4())
+        record = {
+            "job_id": job_id,
+            "kind": kind,
+            "session_id": session_id,
+            "status": "queued",
+            "progress": {"generated_chars": 0, "text": ""},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        self.store.put(job_id, record)
+
+        future = self.executor.submit(self._run, job_id, step, args)
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return record
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def update(self, job_id: str, **fields) -> Optional[Dict]:
+        """Change fields of a job record; a cancelled job keeps its status"""
+        with self.store.lock(job_id):
+            record = self.store.get(job_id)
+            if record is None:
+                return None
+            if record["status"] == "cancelled":
+                fields.pop("status", None)
+            record.update(fields)
+            self.store.put(job_id, record)
+            return record
+
+    def cancel(self, job_id: str) -> Optional[Dict]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        with self.store.lock(job_id):
+            record = self.store.get(job_id)
+            if record is None or record["status"] in FINISHED_STATES:
+                return record
+            record.update(status="cancelled", finished_at=time.time())
+            self.store.put(job_id, record)
+
+        with self._lock:
+            self._cancelled.add(job_id)
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.cancel()  # Only succeeds while still queued
+        return record
+
+    def _cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._cancelled
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    def _run(self, job_id: str, step: Callable, args: tuple):
+        record = self.update(job_id, status="running", started_at=time.time())
+        if record is None or record["status"] == "cancelled":
+            return
+
+        progress = _Progress(self, job_id)
+        try:
+            result = step(*args, on_token=progress)
+        except JobCancelled:
+            print(f"Job {job_id} cancelled")
+            return
+        except HTTPException as e:
+            self.update(job_id, status="failed", error={"status_code": e.status_code, "detail": e.detail},
+                        finished_at=time.time())
+            return
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            self.update(job_id, status="failed", error={"status_code": 500, "detail": str(e)},
+                        finished_at=time.time())
+            return
+
+        self.update(
+            job_id,
+            status="succeeded",
+            result=result.model_dump(),
+            progress={"generated_chars": progress.chars, "text": "".join(progress.text)},
+            finished_at=time.time()
+        )
@@ -0,0 +1,189 @@
+"""
+KV Cache Module
+Per-session llama state snapshots for the generator model
+
+Each 5-Whys session re-sends a prompt that starts with the same problem and
+history as its previous call. Restoring the session's last llama state before
+generating lets llama-cpp's prefix matching skip everything that was already
+evaluated, so only the new answer and the instruction tail are prompt-evaluated.
+
+Snapshots live in RAM up to a byte budget; the least recently used ones are
+spilled to disk and loaded back on their session's next call.
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def _snapshot_size(state) -> int:
+    """Approximate bytes held by a LlamaState"""
+    return int(state.llama_state_size) + state.input_ids.nbytes + state.scores.nbytes
+
+
+def compact_state(state):
+    """
+    Drop the stored logits from a LlamaState, keeping a single row
+    llama-cpp always re-evaluates the last prompt token, so stored logits are
+    never read back, while the full (n_batch x n_vocab) matrix would dominate
+    the snapshot size
+    """
+    state.scores = state.scores[:1].copy()
+    return state
+
+
+def save_state_file(path: str, state):
+    """Write a LlamaState to disk atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_state_file(path: str):
+    """Read a LlamaState written by save_state_file"""
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+class SessionStateCache:
+    """LRU store of per-session llama states with a RAM budget and disk spill"""
+
+    def __init__(self, name: str, memory_budget_bytes: int, spill_dir: str):
+        self.name = name
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_dir = spill_dir
+
+        self._memory: "OrderedDict[str, object]" = OrderedDict()
+        self._memory_bytes = 0
+        self._on_disk = set()
+        self._lock = threading.Lock()
+
+        # Session whose tokens are currently in each model's context
+        self._resident = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.spills = 0
+
+    def _spill_path(self, session_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{self.name}-{session_id}.state")
+
+    def _get(self, session_id: str):
+        with self._lock:
+            state = self._memory.get(session_id)
+            if state is not None:
+                self._memory.move_to_end(session_id)
+                return state
+            on_disk = session_id in self._on_disk
+
+        if not on_disk:
+            return None
+
+        state = load_state_file(self._spill_path(session_id))
+        self._put(session_id, state)
+        return state
+
+    def _put(self, session_id: str, state):
+        spilled = []
+        with self._lock:
+            previous = self._memory.pop(session_id, None)
+            if previous is not None:
+                self._memory_bytes -= _snapshot_size(previous)
+            self._memory[session_id] = state
+            self._memory_bytes += _snapshot_size(state)
+            self._on_disk.discard(session_id)
+
+            # Keep the newest snapshot in RAM even if it alone exceeds the budget
+            while self._memory_bytes > self.memory_budget_bytes and len(self._memory) > 1:
+                old_id, old_state = self._memory.popitem(last=False)
+                self._memory_bytes -= _snapshot_size(old_state)
+                spilled.append((old_id, old_state))
+
+        for old_id, old_state in spilled:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            save_state_file(self._spill_path(old_id), old_state)
+            with self._lock:
+                self._on_disk.add(old_id)
+                self.spills += 1
+
+    def restore(self, model, session_id: str) -> bool:
+        """
+        Load a session's last state into the model before generating
+        Must run on the model's inference worker
+        Returns False if the session has no snapshot yet
+        """
+        if self._resident.get(id(model)) == session_id:
+            self.hits += 1
+            return True
+
+        # Another session (or a session-less call) owns the context now
+        self._resident.pop(id(model), None)
+        state = self._get(session_id)
+        if state is None:
+            self.misses += 1
+            return False
+
+        model.load_state(state)
+        self._resident[id(model)] = session_id
+        self.hits += 1
+        return True
+
+    def snapshot(self, model, session_id: str):
+        """
+        Save the model's state for a session after generating
+        Must run on the model's inference worker
+        """
+        self._put(session_id, compact_state(model.save_state()))
+        self._resident[id(model)] = session_id
+
+    def promote(self, snapshot_id: str, session_id: str) -> bool:
+        """
+        Make a snapshot saved under another id (a speculative run's) the
+        session's snapshot
+        Returns False if there is no such snapshot
+        """
+        state = self._get(snapshot_id)
+        if state is None:
+            return False
+        self.discard(snapshot_id)
+        self._put(session_id, state)
+        for model_key, resident in list(self._resident.items()):
+            if resident == snapshot_id:
+                self._resident[model_key] = session_id
+            elif resident == session_id:
+                # Holds the session's previous state, which is now behind
+                self._resident.pop(model_key, None)
+        return True
+
+    def release(self, model):
+        """Mark a model's context as no longer holding any session's tokens"""
+        self._resident.pop(id(model), None)
+
+    def discard(self, session_id: str):
+        """Forget a session's snapshot (RAM and disk)"""
+        with self._lock:
+            state = self._memory.pop(session_id, None)
+            if state is not None:
+                self._memory_bytes -= _snapshot_size(state)
+            on_disk = session_id in self._on_disk
+            self._on_disk.discard(session_id)
+
+        if on_disk:
+            try:
+                os.remove(self._spill_path(session_id))
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        """Counters for monitoring"""
+        with self._lock:
+            return {
+                "sessions_in_memory": len(self._memory),
+                "sessions_on_disk": len(self._on_disk),
+                "memory_bytes": self._memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "spills": self.spills
+            }
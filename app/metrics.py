@@ -0,0 +1,237 @@
+"""
+Metrics Module
+Process-local counters, gauges and histograms in the Prometheus text format
+
+Served by the API at /metrics. Node and request latencies are recorded where
+the graph runs; token counts and speeds are recorded where the models run
+(the model server process, with RCA_BACKEND=model_server) and fetched from
+there through inference_metrics().
+"""
+
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from app.tracing import span
+
+
+# Latency buckets (seconds) sized for CPU inference: tens of ms to minutes
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing value per label set
+    With a callback, values are read at scrape time instead of incremented
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), callback: Callable[[], Dict[Tuple, float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if self.callback is not None:
+            return _callback_samples(self)
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """Value computed at scrape time by a callback returning {label values: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback: Callable[[], Dict[Tuple, float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self) -> List[str]:
+        return _callback_samples(self)
+
+
+def _callback_samples(metric) -> List[str]:
+    try:
+        values = metric.callback() if metric.callback else {}
+    except Exception as e:
+        print(f"Metric {metric.name} failed: {e}")
+        return []
+    return [f"{metric.name}{_format_labels(metric.labelnames, key)} {_format_value(value)}"
+            for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = {key: ([*counts], total, count) for key, (counts, total, count) in self._series.items()}
+
+        lines = []
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """All metrics of this process, rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), callback=None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name, documentation, labelnames=(), callback=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ============================================================================
+# RCA METRICS
+# ============================================================================
+
+NODE_DURATION = registry.histogram(
+    "rca_node_duration_seconds", "Wall time of graph nodes", ["node"]
+)
+LLM_REQUEST_DURATION = registry.histogram(
+    "rca_llm_request_duration_seconds", "Wall time of LLM completions, including queueing", ["role"]
+)
+
+# role -> [prompt tokens, prompt eval seconds, completion tokens, decode seconds]
+_inference: Dict[str, List[float]] = {}
+_inference_lock = threading.Lock()
+
+
+def record_inference(role: str, prompt_tokens: int, prompt_seconds: float,
+                     completion_tokens: int, decode_seconds: float):
+    """Add one completion's token counts and timings"""
+    with _inference_lock:
+        totals = _inference.setdefault(role, [0, 0.0, 0, 0.0])
+        totals[0] += prompt_tokens
+        totals[1] += prompt_seconds
+        totals[2] += completion_tokens
+        totals[3] += decode_seconds
+
+
+def inference_snapshot() -> dict:
+    """Token totals per role and model worker queue depths of this process"""
+    from app.inference_executor import queue_depths
+
+    with _inference_lock:
+        tokens = {role: {
+            "prompt_tokens": totals[0],
+            "prompt_eval_seconds": totals[1],
+            "completion_tokens": totals[2],
+            "decode_seconds": totals[3]
+        } for role, totals in _inference.items()}
+    return {"tokens": tokens, "queue_depth": queue_depths()}
+
+
+def observe_node(name: str):
+    """
+    Decorator recording a node's latency in rca_node_duration_seconds
+    and as a span on the session trace
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with span(name, "node"):
+                    return fn(*args, **kwargs)
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - started, node=name)
+        return wrapper
+    return decorator
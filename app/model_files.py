@@ -0,0 +1,146 @@
+"""
+Model Files Module
+Locates GGUF files on disk, downloading and checksumming them only when needed
+
+Llama.from_pretrained asks the Hugging Face hub about the file on every start.
+Instead, each GGUF is kept under RCA_MODEL_DIR with a small sidecar file
+recording its SHA-256, size and mtime:
+
+- sidecar matches the file's size and mtime: used as is, no hashing, no network
+- no sidecar (file copied in by hand): hashed once and trusted
+- file changed on disk: re-hashed and compared with the recorded SHA-256
+- file missing: downloaded once (unless RCA_OFFLINE is set) and verified
+  against the hub's LFS SHA-256
+
+An explicit path (RCA_GENERATOR_MODEL / RCA_VALIDATOR_MODEL) is used directly.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Optional
+
+from app.config import MODEL_DIR, MODEL_OFFLINE, MODEL_VERIFY_CHECKSUM
+
+
+class ModelFileError(RuntimeError):
+    """A GGUF file is missing, corrupt, or cannot be downloaded"""
+
+
+_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+# Replicas and the embedder resolve the same file concurrently
+_path_locks = {}
+_path_locks_guard = threading.Lock()
+
+
+def _path_lock(path: str) -> threading.Lock:
+    with _path_locks_guard:
+        return _path_locks.setdefault(path, threading.Lock())
+
+
+def sha256_file(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
+    """SHA-256 of a file, read in large chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sidecar_path(path: str) -> str:
+    return f"{path}.sha256.json"
+
+
+def _read_sidecar(path: str) -> Optional[dict]:
+    try:
+        with open(_sidecar_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(path: str, sha256: str):
+    stat = os.stat(path)
+    record = {"sha256": sha256, "size": stat.st_size, "mtime": stat.st_mtime}
+    tmp_path = f"{_sidecar_path(path)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, _sidecar_path(path))
+
+
+def verify_file(path: str) -> bool:
+    """
+    Check a cached file against its sidecar
+    Only re-hashes when size or mtime changed since the sidecar was written
+    """
+    record = _read_sidecar(path)
+    if record is None:
+        # A file placed here by hand: trust it and remember its hash
+        _write_sidecar(path, sha256_file(path))
+        return True
+
+    stat = os.stat(path)
+    if stat.st_size == record["size"] and stat.st_mtime == record["mtime"]:
+        return True
+    if stat.st_size != record["size"]:
+        return False
+
+    if sha256_file(path) != record["sha256"]:
+        return False
+    # Same content, only touched: refresh the fast-path fields
+    _write_sidecar(path, record["sha256"])
+    return True
+
+
+def _hub_sha256(repo_id: str, filename: str) -> Optional[str]:
+    """SHA-256 the hub reports for an LFS file (its ETag), if available"""
+    from huggingface_hub import get_hf_file_metadata, hf_hub_url
+
+    etag = (get_hf_file_metadata(hf_hub_url(repo_id, filename)).etag or "").strip('"')
+    return etag if _SHA256.match(etag) else None
+
+
+def _download(repo_id: str, filename: str, local_dir: str) -> str:
+    from huggingface_hub import hf_hub_download
+
+    print(f"   Downloading {repo_id}/{filename}...")
+    path = hf_hub_download(repo_id=repo_id, filename=filename, local_dir=local_dir)
+
+    actual = sha256_file(path)
+    expected = _hub_sha256(repo_id, filename)
+    if expected is not None and actual != expected:
+        os.remove(path)
+        raise ModelFileError(f"Checksum mismatch for {filename}: expected {expected}, got {actual}")
+
+    _write_sidecar(path, actual)
+    return path
+
+
+def resolve_gguf(repo_id: str, filename: str, local_path: str = "") -> str:
+    """
+    Path of a verified local copy of a GGUF file
+    local_path, when given, wins over the cache and is not checksummed
+    """
+    if local_path:
+        if not os.path.isfile(local_path):
+            raise ModelFileError(f"Model file not found: {local_path}")
+        return local_path
+
+    local_dir = os.path.join(MODEL_DIR, repo_id.replace("/", "--"))
+    path = os.path.join(local_dir, filename)
+
+    with _path_lock(path):
+        if os.path.isfile(path):
+            if not MODEL_VERIFY_CHECKSUM or verify_file(path):
+                return path
+            if MODEL_OFFLINE:
+                raise ModelFileError(f"Cached model {path} failed verification and RCA_OFFLINE is set")
+            print(f"   Cached {filename} failed verification, downloading again")
+        elif MODEL_OFFLINE:
+            raise ModelFileError(f"Model {filename} is not cached in {local_dir} and RCA_OFFLINE is set")
+
+        os.makedirs(local_dir, exist_ok=True)
+        return _download(repo_id, filename, local_dir)
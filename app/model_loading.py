@@ -4,84 +4,264 @@ Optimized for i5-8th Gen CPU using llama-cpp-python
 Loads two separate models:
 1. Generator: Qwen 2.5 3B (for asking questions and reporting)
 2. Validator: Qwen 2.5 1.5B (for judging answers)
-"""
 
-from llama_cpp import Llama
-import os
+The models run on the backend selected by RCA_BACKEND (see backends.py);
+this module picks sampling parameters and applies the response cache.
+"""
 
-# Global variables to store model components
-gen_model = None
-val_model = None
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+import contextvars
+import functools
+import time
+
+from app.backends import create_backend
+from app.config import (
+    RESPONSE_CACHE_ENABLED, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_DISK,
+    RESPONSE_CACHE_DISK_PATH, RESPONSE_CACHE_DISK_MAX_ENTRIES,
+    RESPONSE_CACHE_DETERMINISTIC, RESPONSE_CACHE_SEED, RESPONSE_CACHE_MAX_TEMPERATURE,
+    TOKEN_COUNT_CACHE_SIZE,
+    VALIDATOR_CONSTRAINED_MAX_TOKENS
+)
+from app.metrics import LLM_REQUEST_DURATION
+from app.prompt_definitions import GRAMMAR_MAX_CHARS
+from app.response_cache import ResponseCache, make_cache_key
+from app.tracing import span
+
+# Where completions run (in-process llama-cpp unless configured otherwise)
+backend = create_backend()
+
+# Completed responses keyed by model, prompt and sampling parameters
+response_cache = ResponseCache(
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_DISK_PATH if RESPONSE_CACHE_DISK else None,
+    RESPONSE_CACHE_DISK_MAX_ENTRIES
+)
+
+# Id session calls save their KV snapshot under, see speculative_snapshot
+_snapshot_as: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("rca_snapshot_as", default=None)
+
+# Progress of load_model(), reported by the API's /ready endpoint
+load_status = {"state": "not_started", "error": None, "timings": {}}
 
 def load_model():
     """
-    Load GGUF models optimized for CPU
+    Load GGUF models optimized for CPU (or connect to the configured backend)
+    and run a short warm-up decode
     """
-    global gen_model, val_model
+    load_status.update(state="loading", error=None)
+    started = time.perf_counter()
+    try:
+        backend.load()
+        loaded = time.perf_counter()
+        warmup = backend.warmup()
+    except Exception as e:
+        load_status.update(state="failed", error=f"{type(e).__name__}: {e}")
+        raise
     
-    print("\n" + "="*50)
-    print("LOADING LOCAL GGUF MODELS (CPU OPTIMIZED)")
-    print("="*50)
-
-    # 1. Load Generator Model (Qwen 2.5 3B)
-    print("\n[1/2] Loading Generator (Qwen 2.5 3B)...")
-    gen_model = Llama.from_pretrained(
-        repo_id="bartowski/Qwen2.5-3B-Instruct-GGUF",
-        filename="Qwen2.5-3B-Instruct-Q4_K_M.gguf",
-        verbose=False,
-        n_ctx=4096,      # Context for 5-Whys history
-        n_threads=4,     # Use 4 physical cores
-        n_batch=512
-    )
-
-    # 2. Load Validator Model (Qwen 2.5 1.5B)
-    print("[2/2] Loading Validator (Qwen 2.5 1.5B)...")
-    val_model = Llama.from_pretrained(
-        repo_id="bartowski/Qwen2.5-1.5B-Instruct-GGUF",
-        filename="Qwen2.5-1.5B-Instruct-Q4_K_M.gguf",
-        verbose=False,
-        n_ctx=1024,      # Short context for validation
-        n_threads=2,     # Lightweight background thread
-        n_batch=512
-    )
-    
-    print("\n✅ Both models loaded successfully on CPU!")
-
-def generate_response(prompt: str) -> str:
+    load_status["timings"] = {
+        "backend": backend.name,
+        "models": backend.load_timings,
+        "load_seconds": round(loaded - started, 3),
+        "warmup_seconds": warmup,
+        "total_seconds": round(time.perf_counter() - started, 3)
+    }
+    load_status["state"] = "ready"
+    print(f"Models ready in {load_status['timings']['total_seconds']:.1f}s")
+
+def models_ready() -> bool:
+    """True once load_model() has finished successfully"""
+    return load_status["state"] == "ready"
+
+def _response_cache_key(role: str, prompt: str, params: dict) -> Optional[str]:
+    """
+    Cache key for a call, or None if its output should not be cached
+    Sampled calls are only cached in deterministic (seeded) mode
+    """
+    if not RESPONSE_CACHE_ENABLED:
+        return None
+    if "seed" not in params and params["temperature"] > RESPONSE_CACHE_MAX_TEMPERATURE:
+        return None
+    return make_cache_key(backend.model_id(role), prompt, params)
+
+def _sampling_params(max_tokens: int, temperature: float) -> dict:
+    params = {"max_tokens": max_tokens, "temperature": temperature}
+    if RESPONSE_CACHE_DETERMINISTIC:
+        params["seed"] = RESPONSE_CACHE_SEED
+    return params
+
+def _validation_params(grammar: Optional[str]) -> dict:
+    """Validator sampling; a GBNF grammar pins the output format and needs few tokens"""
+    if grammar is None:
+        # Lower temp for strict judging
+        return _sampling_params(200, 0.1)
+    return {**_sampling_params(constrained_max_tokens(grammar), 0.1), "grammar": grammar}
+
+def constrained_max_tokens(grammar: str) -> int:
+    """Token cap of a grammar-constrained call: room for the longest allowed output"""
+    if VALIDATOR_CONSTRAINED_MAX_TOKENS > 0:
+        return VALIDATOR_CONSTRAINED_MAX_TOKENS
+    # +1 for the end-of-generation token
+    return GRAMMAR_MAX_CHARS.get(grammar, 256) + 1
+
+def complete(role: str, prompt: str, params: dict,
+             on_token: Optional[Callable[[str], None]] = None,
+             session_id: Optional[str] = None,
+             snapshot_as: Optional[str] = None) -> str:
+    """
+    Run a completion for a role ("generator" or "validator") on the backend
+    If on_token is given, tokens are streamed to it as they are generated
+    If session_id is given, the session's evaluated prompt is reused
+    If snapshot_as is given (or set with speculative_snapshot), the new
+    state is saved under that id and the session's snapshot is left as it was
+    Identical cacheable calls are answered from the response cache
+    """
+    with span(f"llm:{role}", "llm", max_tokens=params["max_tokens"], prompt_chars=len(prompt)) as args:
+        cache_key = _response_cache_key(role, prompt, params)
+        if cache_key is not None:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                args["response_cache"] = "hit"
+                if on_token is not None:
+                    on_token(cached)
+                return cached
+        
+        started = time.perf_counter()
+        result = backend.complete(role, prompt, params, on_token=on_token, session_id=session_id,
+                                  snapshot_as=snapshot_as or _snapshot_as.get())
+        LLM_REQUEST_DURATION.observe(time.perf_counter() - started, role=role)
+        args["output_chars"] = len(result)
+        
+        if cache_key is not None:
+            response_cache.put(cache_key, result)
+        return result
+
+def complete_batch(role: str, prompts: List[str], params: dict,
+                   on_result: Optional[Callable[[int, str], None]] = None,
+                   session_id: Optional[str] = None) -> List[str]:
+    """
+    Run many independent completions for a role, in prompt order
+    Only the prompts missing from the response cache reach the backend
+    on_result(index, text) is called as each one finishes; session_id starts
+    every prompt from the session's evaluated prefix (the snapshot is not updated)
+    """
+    with span(f"llm_batch:{role}", "llm", prompts=len(prompts), max_tokens=params["max_tokens"]) as args:
+        results: List[Optional[str]] = [None] * len(prompts)
+        misses = []
+        for i, prompt in enumerate(prompts):
+            cache_key = _response_cache_key(role, prompt, params)
+            cached = response_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                results[i] = cached
+                if on_result is not None:
+                    on_result(i, cached)
+            else:
+                misses.append((i, cache_key))
+        args["response_cache_misses"] = len(misses)
+        
+        if misses:
+            forward = None if on_result is None else (lambda j, text: on_result(misses[j][0], text))
+            outputs = backend.complete_batch(role, [prompts[i] for i, _ in misses], params,
+                                             on_result=forward, session_id=session_id)
+            for (i, cache_key), output in zip(misses, outputs):
+                results[i] = output
+                if cache_key is not None:
+                    response_cache.put(cache_key, output)
+        return results
+
+def generate_response(prompt: str, on_token: Optional[Callable[[str], None]] = None,
+                      session_id: Optional[str] = None) -> str:
     """
     Generate response using the main GENERATOR model (3B)
     USES CHAT COMPLETION to prevent hallucinations
     """
-    # We wrap the prompt in a user message. 
-    # The model handles strict stop tokens (<|im_end|>) automatically in this mode.
-    response = gen_model.create_chat_completion(
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=300,
-        temperature=0.7
-    )
-    return response["choices"][0]["message"]["content"].strip()
+    return complete("generator", prompt, _sampling_params(300, 0.7), on_token, session_id)
 
-def generate_validation_response(prompt: str) -> str:
+def generate_validation_response(prompt: str, grammar: Optional[str] = None) -> str:
     """
     Generate response using the VALIDATOR model (1.5B)
+    grammar: optional GBNF grammar the output must follow
+    """
+    return complete("validator", prompt, _validation_params(grammar))
+
+def generate_validation_batch(prompts: List[str], grammar: Optional[str] = None) -> List[str]:
+    """
+    Run many prompts through the VALIDATOR, spread over the validator replicas
+    Results are in the same order as the prompts
     """
-    response = val_model.create_chat_completion(
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=200,   
-        temperature=0.1   # Lower temp for strict judging
-    )
-    return response["choices"][0]["message"]["content"].strip()
+    return complete_batch("validator", prompts, _validation_params(grammar))
 
-def generate_response_extended(prompt: str, max_tokens: int = 300) -> str:
+def generate_response_extended(prompt: str, max_tokens: int = 300,
+                               on_token: Optional[Callable[[str], None]] = None,
+                               session_id: Optional[str] = None,
+                               stop: Optional[List[str]] = None) -> str:
     """
     Generate response using GENERATOR model with custom token limit
+    stop: sequences that end generation (not included in the output)
+    """
+    params = _sampling_params(max_tokens, 0.7)
+    if stop:
+        params["stop"] = stop
+    return complete("generator", prompt, params, on_token, session_id)
+
+def generate_response_batch(prompts: List[str], max_tokens: int = 300,
+                            on_result: Optional[Callable[[int, str], None]] = None,
+                            session_id: Optional[str] = None,
+                            stop: Optional[List[str]] = None) -> List[str]:
+    """
+    Run independent GENERATOR prompts at once, spread over the generator replicas
+    on_result(index, text) is called as each one finishes
+    """
+    params = _sampling_params(max_tokens, 0.7)
+    if stop:
+        params["stop"] = stop
+    return complete_batch("generator", prompts, params, on_result, session_id)
+
+def generate_embedding(text: str) -> list:
+    """
+    Embed text for the similar-incident index
+    """
+    with span("llm:embedder", "llm", prompt_chars=len(text)):
+        return backend.embed(text)
+
+@functools.lru_cache(maxsize=TOKEN_COUNT_CACHE_SIZE)
+def _count_tokens_cached(role: str, text: str) -> int:
+    return backend.count_tokens(role, text)
+
+def count_tokens(text: str, role: str = "generator") -> int:
+    """
+    Number of prompt tokens a text takes for a model (counts are cached)
+    """
+    return _count_tokens_cached(role, text)
+
+def discard_session_state(session_id: str):
+    """Drop a finished session's KV snapshot"""
+    backend.discard_session(session_id)
+
+@contextmanager
+def speculative_snapshot(snapshot_id: str):
+    """
+    Save the KV snapshots of session calls inside under snapshot_id
+    For speculative runs: the session's own snapshot is only replaced by
+    promote_session_state, and discard_session_state(snapshot_id) drops theirs
     """
-    response = gen_model.create_chat_completion(
-        messages=[{"role": "user", "content": prompt}],
-        max_tokens=max_tokens,
-        temperature=0.7
-    )
-    return response["choices"][0]["message"]["content"].strip()
+    token = _snapshot_as.set(snapshot_id)
+    try:
+        yield
+    finally:
+        _snapshot_as.reset(token)
+
+def promote_session_state(snapshot_id: str, session_id: str):
+    """Make a snapshot saved under snapshot_id the session's KV snapshot"""
+    backend.promote_session(snapshot_id, session_id)
+
+def cache_stats() -> dict:
+    """Hit/miss counters of the inference caches in this process"""
+    return {"response_cache": response_cache.stats(), **backend.stats()}
+
+def inference_metrics() -> dict:
+    """Token totals per role and worker queue depths, from where the models run"""
+    return backend.inference_metrics()
 
 # Only run if executed directly
 if __name__ == "__main__":
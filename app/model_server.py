@@ -0,0 +1,192 @@
+"""
+Model Server Module
+Separate inference process that owns the GGUF models
+
+Run it once per host:
+    python -m app.model_server --socket /tmp/rca-models.sock
+
+and point the API workers at it with RCA_MODEL_SERVER=/tmp/rca-models.sock.
+The workers then use the model_server backend and send every completion over a
+Unix socket, so any number of HTTP workers share one copy of the weights and
+the core budget the models were sized for (n_threads=4 / n_threads=2).
+
+Protocol (multiprocessing.connection, pickled tuples):
+    request:  ("call", function_name, args, kwargs, stream)
+    replies:  ("token", callback_args)* then ("result", value) or ("error", message)
+
+stream names the callback argument the server fills in ("on_token" for
+streamed text, "on_result" for batch results), or is False.
+"""
+
+import argparse
+import os
+import threading
+from multiprocessing.connection import Client, Listener
+from typing import Callable, Optional
+
+from app.config import MODEL_SERVER_SOCKET, MODEL_SERVER_AUTHKEY
+
+
+# Functions of model_loading that clients may call
+EXPOSED_FUNCTIONS = (
+    "complete",
+    "complete_batch",
+    "generate_response",
+    "generate_validation_response",
+    "generate_validation_batch",
+    "generate_response_extended",
+    "generate_response_batch",
+    "generate_embedding",
+    "count_tokens",
+    "discard_session_state",
+    "promote_session_state",
+    "cache_stats",
+    "inference_metrics",
+    "ping"
+)
+
+
+class ModelServerError(RuntimeError):
+    """Raised on the client when the model server reports a failure"""
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+def _handle_connection(conn):
+    """Serve requests from one client connection until it closes"""
+    from app import model_loading
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+
+            # stream: name of the callback argument to forward, or False
+            _, name, args, kwargs, stream = message
+            if name not in EXPOSED_FUNCTIONS:
+                conn.send(("error", f"Unknown function: {name}"))
+                continue
+
+            try:
+                if name == "ping":
+                    result = "pong"
+                else:
+                    if stream:
+                        kwargs[stream] = lambda *values: conn.send(("token", values))
+                    result = getattr(model_loading, name)(*args, **kwargs)
+            except (BrokenPipeError, ConnectionResetError):
+                # Client went away mid-stream; generation stopped with it
+                break
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+            else:
+                conn.send(("result", result))
+    finally:
+        conn.close()
+
+
+def serve(socket_path: str = MODEL_SERVER_SOCKET):
+    """Load the models and serve clients on a Unix socket (blocks forever)"""
+    from app import model_loading
+    from app.backends import create_backend
+
+    # This process is the model owner, never a client of another server
+    if model_loading.backend.name == "model_server":
+        model_loading.backend = create_backend("llama_cpp")
+    model_loading.load_model()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    listener = Listener(address=socket_path, family="AF_UNIX", authkey=MODEL_SERVER_AUTHKEY)
+    # Only the owning user may connect
+    os.chmod(socket_path, 0o600)
+
+    print(f"\n✅ Model server listening on {socket_path}")
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"Rejected model server connection: {e}")
+                continue
+            threading.Thread(target=_handle_connection, args=(conn,), daemon=True).start()
+    finally:
+        listener.close()
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class ModelServerClient:
+    """Calls model_loading functions in the model server, one connection per thread"""
+
+    def __init__(self, socket_path: str, authkey: bytes = MODEL_SERVER_AUTHKEY):
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(address=self.socket_path, family="AF_UNIX", authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _reset_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, name: str, *args, on_token: Optional[Callable] = None, callback: str = "on_token",
+             **kwargs):
+        """
+        Run a model_loading function remotely; tokens are forwarded to on_token
+        callback names the function's argument on_token stands in for
+        (e.g. complete_batch's on_result)
+        """
+        try:
+            conn = self._connection()
+            conn.send(("call", name, args, kwargs, callback if on_token is not None else False))
+            while True:
+                kind, value = conn.recv()
+                if kind == "token":
+                    on_token(*value)
+                elif kind == "result":
+                    return value
+                else:
+                    raise ModelServerError(value)
+        except ModelServerError:
+            raise
+        except (EOFError, OSError):
+            # Drop the broken connection so the next call reconnects
+            self._reset_connection()
+            raise
+        except BaseException:
+            # A failing on_token leaves unread replies on the connection
+            self._reset_connection()
+            raise
+
+    def ping(self):
+        """Check that the server is reachable"""
+        return self.call("ping")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RCA model server")
+    parser.add_argument("--socket", default=MODEL_SERVER_SOCKET, help="Unix socket path")
+    args = parser.parse_args()
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,19 +7,46 @@ NOTE: Interactive input() calls are replaced with callback mechanism
 for production use (API/UI will provide answers via state)
 """
 
-from app.helpers import RCAState, format_whys_context, calculate_answer_quality_score, export_report_to_markdown
+from app.config import FUSED_VALIDATION, PARALLEL_REPORT, VALIDATOR_GRAMMAR_ENABLED
+from app.context_budget import bounded_whys_context
+from app.helpers import (
+    RCAState,
+    calculate_answer_quality_score,
+    parse_validation_response,
+    parse_systematic_response
+)
 from app.prompt_definitions import (
     create_why_prompt,
     create_root_cause_prompt,
     create_validation_prompt,
+    create_combined_validation_prompt,
     create_full_report_prompt,
-    create_systematic_root_cause_check_prompt  # NEW IMPORT
+    create_report_section_prompt,
+    REPORT_SECTIONS,
+    create_systematic_root_cause_check_prompt,  # NEW IMPORT
+    VALIDATION_GRAMMAR,
+    COMBINED_VALIDATION_GRAMMAR,
+    SYSTEMATIC_CHECK_GRAMMAR
+)
+from app.model_loading import (
+    generate_validation_response,
+    generate_validation_batch
 )
-from app.model_loading import generate_response, generate_response_extended, generate_validation_response
+from app.metrics import observe_node
+from app.output_limits import generate_batch_for_node, generate_for_node
+
 
+def _grammar(grammar: str):
+    """Output grammar for a validator call, unless constrained output is disabled"""
+    return grammar if VALIDATOR_GRAMMAR_ENABLED else None
 
-def why_asker(state: RCAState) -> RCAState:
-    """Node that generates why questions - exact copy from notebook"""
+
+@observe_node("why_asker")
+def why_asker(state: RCAState, on_token=None) -> RCAState:
+    """
+    Node that generates why questions - exact copy from notebook
+    on_token: optional callback receiving generated text as it streams
+    """
     print(f"\n{'='*60}")
     print(f"WHY ASKER NODE - Iteration {state['why_no'] + 1}")
     print(f"{'='*60}")
@@ -28,9 +55,10 @@ def why_asker(state: RCAState) -> RCAState:
     state["why_no"] += 1
     
     # Generate why question
-    previous_whys = format_whys_context(state["whys"])
+    previous_whys = bounded_whys_context(state)
     prompt = create_why_prompt(state["problem"], state["why_no"], previous_whys)
-    why_question = generate_response(prompt)
+    # Stops after the question line
+    why_question = generate_for_node("why_asker", prompt, on_token=on_token, session_id=state.get("session_id"))
     
     # Extract just the question part
     if ":" in why_question:
@@ -50,6 +78,7 @@ def why_asker(state: RCAState) -> RCAState:
     return state
 
 
+@observe_node("answer_validator")
 def answer_validator(state: RCAState) -> RCAState:
     """Node that validates user answers for quality - WITH EARLY STOPPING CHECK"""
     print(f"\n{'='*60}")
@@ -61,30 +90,25 @@ def answer_validator(state: RCAState) -> RCAState:
     # FIXED: Use improved_input if available, otherwise use user_input
     answer = state.get("improved_input", "") or state.get("user_input", "")
     
+    # From Why 4 on, the systematic check can ride along in the same call
+    fused = FUSED_VALIDATION and state["why_no"] >= 4
+    
     # Generate validation
-    validation_prompt = create_validation_prompt(question, answer)
-    validation_response = generate_validation_response(validation_prompt)
+    if fused:
+        validation_prompt = create_combined_validation_prompt(question, answer)
+        grammar = _grammar(COMBINED_VALIDATION_GRAMMAR)
+    else:
+        validation_prompt = create_validation_prompt(question, answer)
+        grammar = _grammar(VALIDATION_GRAMMAR)
+    validation_response = generate_validation_response(validation_prompt, grammar)
     
     print(f"\nValidating answer...")
     
     # Parse validation response
-    specificity = 3.0  # Default
-    relevance = 3.0    # Default
-    needs_improvement = False
-    
-    for line in validation_response.split('\n'):
-        if 'Specificity:' in line:
-            try:
-                specificity = float(line.split(':')[1].strip().split()[0])
-            except:
-                pass
-        elif 'Relevance:' in line:
-            try:
-                relevance = float(line.split(':')[1].strip().split()[0])
-            except:
-                pass
-        elif 'Needs Improvement:' in line:
-            needs_improvement = 'yes' in line.lower()
+    validation = parse_validation_response(validation_response)
+    specificity = validation["specificity"]
+    relevance = validation["relevance"]
+    needs_improvement = validation["needs_improvement"]
     
     # Calculate quality score
     quality_score = (specificity + relevance) / 2
@@ -96,7 +120,7 @@ def answer_validator(state: RCAState) -> RCAState:
     # Check if answer needs improvement
     if needs_improvement and quality_score < 3.0 and state.get("retry_count", 0) < 1:
         print(f"\n⚠️  Answer could be more specific or relevant.")
-        suggestion = validation_response.split('Suggestion:')[-1].strip() if 'Suggestion:' in validation_response else "Please provide more details."
+        suggestion = validation["suggestion"]
         print(f"Suggestion: {suggestion}")
         
         # In production: improved_answer comes from API/UI via state
@@ -137,14 +161,15 @@ def answer_validator(state: RCAState) -> RCAState:
     if state["why_no"] >= 4:
         print(f"\n[Early Stop Check] Evaluating if systematic root cause reached...")
         
-        systematic_check_prompt = create_systematic_root_cause_check_prompt(final_answer)
-        systematic_response = generate_validation_response(systematic_check_prompt)
-        
-        is_systematic = False
-        for line in systematic_response.split('\n'):
-            if 'Systematic:' in line:
-                is_systematic = 'yes' in line.lower()
-                break
+        if validation["systematic"] is not None:
+            # Already judged by the combined validation call
+            is_systematic = validation["systematic"]
+        else:
+            systematic_check_prompt = create_systematic_root_cause_check_prompt(final_answer)
+            systematic_response = generate_validation_response(
+                systematic_check_prompt, _grammar(SYSTEMATIC_CHECK_GRAMMAR)
+            )
+            is_systematic = parse_systematic_response(systematic_response)
         
         if is_systematic:
             print(f"✓ SYSTEMATIC ROOT CAUSE DETECTED at Why {state['why_no']}!")
@@ -160,16 +185,36 @@ def answer_validator(state: RCAState) -> RCAState:
     return state
 
 
-def root_cause_extractor(state: RCAState) -> RCAState:
-    """Node that extracts root cause - exact copy from notebook"""
+def validate_answers(pairs: list[tuple[str, str]]) -> list[dict]:
+    """
+    Score many (question, answer) pairs with the validator in one batch
+    Same prompt and parsing as answer_validator, but no session state is touched
+    """
+    prompts = [create_validation_prompt(question, answer) for question, answer in pairs]
+    
+    results = []
+    for response in generate_validation_batch(prompts, _grammar(VALIDATION_GRAMMAR)):
+        validation = parse_validation_response(response)
+        validation["quality_score"] = (validation["specificity"] + validation["relevance"]) / 2
+        results.append(validation)
+    return results
+
+
+@observe_node("root_cause_extractor")
+def root_cause_extractor(state: RCAState, on_token=None) -> RCAState:
+    """
+    Node that extracts root cause - exact copy from notebook
+    on_token: optional callback receiving generated text as it streams
+    """
     print(f"\n{'='*60}")
     print("ROOT CAUSE EXTRACTOR NODE")
     print(f"{'='*60}")
     
-    whys_context = format_whys_context(state["whys"])
+    whys_context = bounded_whys_context(state)
     prompt = create_root_cause_prompt(state["problem"], whys_context)
     
-    root_cause = generate_response(prompt)
+    root_cause = generate_for_node("root_cause_extractor", prompt, on_token=on_token,
+                                   session_id=state.get("session_id"))
     state["root_cause"] = root_cause
 
     # Calculate confidence score
@@ -197,23 +242,67 @@ def root_cause_extractor(state: RCAState) -> RCAState:
     return state
 
 
-def report_generator(state: RCAState) -> RCAState:
-    print("\nGenerating full RCA report (single-pass)...")
+def _generate_report_sections(state: RCAState, on_token=None) -> str:
+    """
+    Generate the report sections at the same time on the generator contexts
+    A section is streamed once it and every section before it are done
+    """
+    print(f"\nGenerating RCA report ({len(REPORT_SECTIONS)} sections in parallel)...")
+
+    whys_context = bounded_whys_context(state)
+    prompts = [
+        create_report_section_prompt(
+            state["problem"],
+            whys_context,
+            state["root_cause"],
+            state["confidence_score"],
+            instructions
+        )
+        for _, _, instructions in REPORT_SECTIONS
+    ]
+
+    sections = [None] * len(REPORT_SECTIONS)
+    streamed = 0
+
+    def on_result(i: int, text: str):
+        nonlocal streamed
+        sections[i] = f"{REPORT_SECTIONS[i][1]}\n{text.strip()}"
+        print(f"   Section done: {REPORT_SECTIONS[i][1]}")
+        while streamed < len(sections) and sections[streamed] is not None:
+            if on_token is not None:
+                on_token(("\n\n" if streamed else "") + sections[streamed])
+            streamed += 1
+
+    generate_batch_for_node("report_section", prompts, on_result, session_id=state.get("session_id"))
+    return "\n\n".join(sections)
+
+
+@observe_node("report_generator")
+def report_generator(state: RCAState, on_token=None) -> RCAState:
+    """
+    Node that generates the full RCA report in one pass, or section by
+    section in parallel when RCA_PARALLEL_REPORT is set
+    on_token: optional callback receiving generated text as it streams
+    """
+    if PARALLEL_REPORT:
+        report = _generate_report_sections(state, on_token)
+    else:
+        print("\nGenerating full RCA report (single-pass)...")
 
-    prompt = create_full_report_prompt(
-        state["problem"],
-        format_whys_context(state["whys"]),
-        state["root_cause"],
-        state["confidence_score"]
-    )
+        prompt = create_full_report_prompt(
+            state["problem"],
+            bounded_whys_context(state),
+            state["root_cause"],
+            state["confidence_score"]
+        )
 
-    report = generate_response_extended(
-        prompt,
-        max_tokens=1400   # more than sum of parts
-    )
+        # Up to 1400 tokens (more than sum of parts), less once typical report
+        # lengths are known; stops at the end-of-report marker
+        report = generate_for_node("report_generator", prompt, on_token=on_token,
+                                   session_id=state.get("session_id"))
 
+    # Saved per session by the API's report store, off the request path
     state["report"] = report
-    export_report_to_markdown(state)
     return state
 
 
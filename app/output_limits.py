@@ -0,0 +1,171 @@
+"""
+Output Limits Module
+Stop sequences and adaptive max_tokens per generator node
+
+Each node stops on a sequence that marks its useful output as complete (the
+newline after a why question, the end-of-report marker), and its token cap
+follows the lengths it actually produced: a high quantile of the recent
+outputs plus headroom, kept between a floor and the node's original cap.
+Caps are rounded up to a multiple of 32 so response-cache keys stay stable.
+Lengths of a speculative run are held back and only recorded if it is used.
+"""
+
+import contextvars
+import math
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    ADAPTIVE_MAX_TOKENS_ENABLED,
+    ADAPTIVE_MAX_TOKENS_WINDOW,
+    ADAPTIVE_MAX_TOKENS_MIN_SAMPLES,
+    ADAPTIVE_MAX_TOKENS_QUANTILE,
+    ADAPTIVE_MAX_TOKENS_HEADROOM
+)
+from app.metrics import registry
+from app.model_loading import count_tokens, generate_response_batch, generate_response_extended
+from app.prompt_definitions import REPORT_END_MARKER
+
+
+# ceiling: the node's original cap, never exceeded; floor: smallest adaptive cap
+NODE_LIMITS: Dict[str, dict] = {
+    # One line: "Why N: <question>"
+    "why_asker": {"ceiling": 300, "floor": 48, "stop": ["\n"]},
+    # "1-2 clear sentences", one paragraph
+    "root_cause_extractor": {"ceiling": 300, "floor": 64, "stop": ["\n\n"]},
+    # Four sections, then the end marker (or a fifth section the prompt did not ask for)
+    "report_generator": {"ceiling": 1400, "floor": 640, "stop": [REPORT_END_MARKER, "\n## 5."]},
+    # One section of the parallel report; stops if the model starts another section
+    "report_section": {"ceiling": 500, "floor": 192, "stop": ["\n## ", REPORT_END_MARKER]}
+}
+
+
+class OutputLengthStats:
+    """Recent output lengths (tokens) per node and the caps derived from them"""
+
+    def __init__(self, limits: Dict[str, dict]):
+        self.limits = limits
+        self._lengths = {node: deque(maxlen=ADAPTIVE_MAX_TOKENS_WINDOW) for node in limits}
+        self._lock = threading.Lock()
+        self.capped = 0  # Outputs that ran into their cap
+
+    def max_tokens(self, node: str) -> int:
+        """Token cap for the node's next call"""
+        limits = self.limits[node]
+        with self._lock:
+            lengths = sorted(self._lengths[node])
+        if not ADAPTIVE_MAX_TOKENS_ENABLED or len(lengths) < ADAPTIVE_MAX_TOKENS_MIN_SAMPLES:
+            return limits["ceiling"]
+
+        quantile = lengths[min(len(lengths) - 1, int(ADAPTIVE_MAX_TOKENS_QUANTILE * len(lengths)))]
+        cap = math.ceil(quantile * ADAPTIVE_MAX_TOKENS_HEADROOM / 32) * 32
+        return max(limits["floor"], min(limits["ceiling"], cap))
+
+    def record(self, node: str, text: str, max_tokens: int):
+        """Remember an output's length; one that hit its cap counts as longer"""
+        tokens = count_tokens(text)
+        if tokens >= max_tokens - 1:
+            # Truncated: the real length is unknown, so push the cap up
+            tokens = int(max_tokens * 1.5)
+        with self._lock:
+            self._lengths[node].append(tokens)
+            if tokens > max_tokens:
+                self.capped += 1
+
+    def stats(self) -> dict:
+        return {node: {"max_tokens": self.max_tokens(node), "samples": len(self._lengths[node])}
+                for node in self.limits}
+
+
+output_lengths = OutputLengthStats(NODE_LIMITS)
+
+# (node, text, max_tokens) of outputs whose lengths are held back, see deferred_lengths
+_deferred: contextvars.ContextVar[Optional[List[Tuple[str, str, int]]]] = contextvars.ContextVar(
+    "rca_deferred_lengths", default=None
+)
+
+
+@contextmanager
+def deferred_lengths():
+    """
+    Collect the output lengths of the calls inside instead of recording them
+    Yields the list to pass to record_lengths once the outputs are used
+    """
+    pending = []
+    token = _deferred.set(pending)
+    try:
+        yield pending
+    finally:
+        _deferred.reset(token)
+
+
+def record_lengths(pending: List[Tuple[str, str, int]]):
+    """Record output lengths collected by deferred_lengths"""
+    for node, text, max_tokens in pending:
+        output_lengths.record(node, text, max_tokens)
+
+
+def _record(node: str, text: str, max_tokens: int):
+    pending = _deferred.get()
+    if pending is not None:
+        pending.append((node, text, max_tokens))
+    else:
+        output_lengths.record(node, text, max_tokens)
+
+registry.gauge(
+    "rca_node_max_tokens", "Current adaptive token cap per node", ["node"],
+    lambda: {(node,): stats["max_tokens"] for node, stats in output_lengths.stats().items()}
+)
+
+
+def cut_at_stop(text: str, stop: List[str]) -> str:
+    """Text before the first of the stop sequences"""
+    for sequence in stop:
+        index = text.find(sequence)
+        if index != -1:
+            text = text[:index]
+    return text
+
+
+def generate_for_node(node: str, prompt: str, on_token: Optional[Callable[[str], None]] = None,
+                      session_id: Optional[str] = None) -> str:
+    """Generator call with the node's stop sequences and current token cap"""
+    max_tokens = output_lengths.max_tokens(node)
+    stop = NODE_LIMITS[node]["stop"]
+    text = generate_response_extended(
+        prompt,
+        max_tokens=max_tokens,
+        on_token=on_token,
+        session_id=session_id,
+        stop=stop
+    )
+
+    if not text.strip():
+        # The output opened with a stop sequence (chat models often start with
+        # a newline): generate again without stops at the ceiling and apply
+        # them after the leading whitespace
+        max_tokens = NODE_LIMITS[node]["ceiling"]
+        text = generate_response_extended(prompt, max_tokens=max_tokens, on_token=on_token, session_id=session_id)
+        text = cut_at_stop(text.lstrip(), stop)
+
+    _record(node, text, max_tokens)
+    return text
+
+
+def generate_batch_for_node(node: str, prompts: List[str],
+                            on_result: Optional[Callable[[int, str], None]] = None,
+                            session_id: Optional[str] = None) -> List[str]:
+    """Parallel generator calls sharing the node's stop sequences and token cap"""
+    max_tokens = output_lengths.max_tokens(node)
+    texts = generate_response_batch(
+        prompts,
+        max_tokens=max_tokens,
+        on_result=on_result,
+        session_id=session_id,
+        stop=NODE_LIMITS[node]["stop"]
+    )
+    for text in texts:
+        _record(node, text, max_tokens)
+    return texts
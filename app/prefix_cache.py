@@ -0,0 +1,122 @@
+"""
+Prefix Cache Module
+Pre-evaluated llama states for the fixed instruction prefixes of validator prompts
+
+The validation and systematic-check prompts start with hundreds of tokens of
+fixed instructions and end with the answer. At load time each prefix is
+evaluated once and its state is kept (optionally on disk, so restarts skip the
+evaluation). Before a validator call whose prompt starts with a cached prefix,
+that state is loaded into the model and llama-cpp only evaluates the tail.
+"""
+
+import hashlib
+import os
+import threading
+
+from app.kv_cache import compact_state, save_state_file, load_state_file
+
+
+# Two tails that differ right away; the common prefix of their evaluated
+# tokens is exactly the chat-formatted instruction prefix
+_PROBE_TAILS = ("A", "Z")
+
+
+def _longest_prefix(a, b) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+class PrefixEntry:
+    """One cached prefix: prompt text, its chat-formatted tokens and the evaluated state"""
+
+    def __init__(self, text: str, tokens: list, state):
+        self.text = text
+        self.tokens = tokens
+        self.state = state
+
+
+class PromptPrefixCache:
+    """Evaluated states for static prompt prefixes, per model"""
+
+    def __init__(self, persist_dir: str = None):
+        self.persist_dir = persist_dir
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.loads = 0
+        self.misses = 0
+
+    def _persist_path(self, model, text: str) -> str:
+        key = hashlib.sha256(f"{getattr(model, 'model_path', '')}\n{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.persist_dir, f"prefix-{key[:32]}.state")
+
+    def _evaluate(self, model, text: str):
+        """Run the prefix through the chat template and capture its tokens and state"""
+        states = []
+        for tail in _PROBE_TAILS:
+            model.create_chat_completion(
+                messages=[{"role": "user", "content": text + tail}],
+                max_tokens=1,
+                temperature=0.0
+            )
+            states.append(model.save_state())
+
+        first, second = (list(state.input_ids) for state in states)
+        n_prefix = _longest_prefix(first, second)
+        return second[:n_prefix], compact_state(states[-1])
+
+    def warm(self, model, prefixes: list):
+        """
+        Evaluate (or load from disk) every prefix for a model
+        Must run on the model's inference worker
+        """
+        entries = []
+        for text in prefixes:
+            path = self._persist_path(model, text) if self.persist_dir else None
+
+            if path and os.path.exists(path):
+                tokens, state = load_state_file(path)
+            else:
+                tokens, state = self._evaluate(model, text)
+                if path:
+                    os.makedirs(self.persist_dir, exist_ok=True)
+                    save_state_file(path, (tokens, state))
+
+            entries.append(PrefixEntry(text, tokens, state))
+            print(f"   Cached prompt prefix ({len(tokens)} tokens)")
+
+        with self._lock:
+            self._entries[id(model)] = entries
+
+    def prime(self, model, prompt: str) -> bool:
+        """
+        Make sure the model's context starts with the prompt's cached prefix
+        Must run on the model's inference worker
+        Returns False if no cached prefix applies
+        """
+        with self._lock:
+            entries = self._entries.get(id(model), [])
+        if not entries:
+            # No prefixes are cached for this model (the generator): not a lookup
+            return False
+
+        entry = next((e for e in entries if prompt.startswith(e.text)), None)
+        if entry is None:
+            self.misses += 1
+            return False
+
+        # The prefix may still be in the context from the previous call
+        if _longest_prefix(list(model.input_ids), entry.tokens) < len(entry.tokens):
+            model.load_state(entry.state)
+            self.loads += 1
+        self.hits += 1
+        return True
+
+    def stats(self) -> dict:
+        """Counters for monitoring; misses are lookups on a model with cached prefixes"""
+        return {"hits": self.hits, "loads": self.loads, "misses": self.misses}
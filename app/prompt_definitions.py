@@ -1,10 +1,28 @@
 """
 Prompt Definitions Module
-Exact copy from notebook: PROMPT DEFINITIONS section
-All prompts preserved verbatim with no modifications
+Based on the notebook's PROMPT DEFINITIONS section, but NOT an exact copy:
+the root cause and full report prompts were reordered and reworded to open
+with the why prompt's problem + history block (create_session_preamble), so
+the session KV cache can reuse the evaluated prefix. Their outputs are not
+comparable one-to-one with the notebook's. Changes to other prompts are
+noted on each function.
 """
 
 
+def create_session_preamble(problem: str, whys_context: str) -> str:
+    """
+    Shared opening of every generator prompt after Why 1
+    Keeping problem and history first and identical across why, root cause and
+    report prompts lets the session KV cache reuse the evaluated prefix
+    """
+    return f"""You are conducting a Root Cause Analysis using the 5 Whys technique.
+
+Problem/Incident: {problem}
+
+Previous questions and answers:
+{whys_context}"""
+
+
 def create_why_prompt(problem: str, why_no: int, previous_whys: str) -> str:
     """Create prompt for asking why question - exact copy from notebook"""
     if why_no == 1:
@@ -17,12 +35,7 @@ Generate the first "Why" question to dig deeper into this problem. The question
 Format your response as:
 Why 1: [your question here]"""
     else:
-        return f"""You are conducting a Root Cause Analysis using the 5 Whys technique.
-
-Problem/Incident: {problem}
-
-Previous questions and answers:
-{previous_whys}
+        return f"""{create_session_preamble(problem, previous_whys)}
 
 Generate the next "Why" question (Why {why_no}) based on the previous answer. Dig deeper into the root cause.
 
@@ -31,25 +44,36 @@ Why {why_no}: [your question here]"""
 
 
 def create_root_cause_prompt(problem: str, whys_context: str) -> str:
-    """Create prompt for extracting root cause - exact copy from notebook"""
-    return f"""You are analyzing a Root Cause Analysis session using the 5 Whys technique.
+    """Create prompt for extracting root cause - reworded from the notebook to start with the session preamble"""
+    return f"""{create_session_preamble(problem, whys_context)}
+
+Based on this 5 Whys analysis, extract and state the root cause in 1-2 clear sentences. Be specific and actionable.
+
+Root Cause:"""
+
+
+def create_whys_summary_prompt(problem: str, previous_summary: str, whys_context: str) -> str:
+    """Create prompt that condenses earlier whys so long histories fit the context budget"""
+    earlier = f"Summary so far:\n{previous_summary}\n\n" if previous_summary else ""
+    return f"""You are conducting a Root Cause Analysis using the 5 Whys technique.
 
 Problem/Incident: {problem}
 
-5 Whys Analysis:
+{earlier}Questions and answers to add to the summary:
 {whys_context}
 
-Based on this analysis, extract and state the root cause in 1-2 clear sentences. Be specific and actionable.
+Summarize the causal chain above in at most 4 sentences. Keep concrete facts (systems, numbers, names, timings) and drop everything else.
 
-Root Cause:"""
+Summary:"""
 
 
-def create_validation_prompt(question: str, answer: str) -> str:
-    """Create prompt for validating user answer - exact copy from notebook"""
-    return f"""You are validating an answer in a Root Cause Analysis session.
+# ============================================================================
+# VALIDATOR PROMPTS
+# The fixed instructions come first and the answer last, so the instruction
+# prefix can be evaluated once and cached (see prefix_cache.py).
+# ============================================================================
 
-Question: {question}
-Answer: {answer}
+VALIDATION_PROMPT_PREFIX = """You are validating an answer in a Root Cause Analysis session.
 
 Evaluate the answer on these criteria:
 1. Specificity: Is the answer concrete and detailed, or vague and generic? (Rate 1-5, where 5 is very specific)
@@ -59,11 +83,12 @@ Respond in this exact format:
 Specificity: [score]
 Relevance: [score]
 Needs Improvement: [yes/no]
-Suggestion: [If needs improvement, provide a brief suggestion for what additional details would help]"""
+Suggestion: [If needs improvement, provide a brief suggestion for what additional details would help]
 
+Question: """
 
-def create_systematic_root_cause_check_prompt(answer: str) -> str:
-    return f"""You are evaluating whether the given answer identifies a SYSTEMATIC root cause.
+
+SYSTEMATIC_CHECK_PROMPT_PREFIX = """You are evaluating whether the given answer identifies a SYSTEMATIC root cause.
 
 Definition: A SYSTEMATIC root cause refers to failures at the organizational, process, or system level — not individual mistakes.
 
@@ -94,26 +119,125 @@ Random equipment failure with no maintenance or system implication
 ⚠️ Important Rule
 If the answer mentions that something was “skipped,” “not done,” “not followed,” or “missing” and that thing is normally governed by a process, policy, or schedule, it MUST be classified as SYSTEMATIC.
 
-Input Answer:
-
-"{answer}"
-
 Output Rules:
 
 Respond with ONLY ONE of the following (no explanation):
 
 Systematic: yes
 OR
-Systematic: no"""
+Systematic: no
 
+Input Answer:
 
-def create_full_report_prompt(problem, whys, root_cause, confidence):
-    return f"""
-Problem/Incident:
-{problem}
+\""""
 
-Analysis Process:
-{whys}
+
+COMBINED_VALIDATION_PROMPT_PREFIX = """You are validating an answer in a Root Cause Analysis session and checking whether it identifies a SYSTEMATIC root cause.
+
+Evaluate the answer on these criteria:
+1. Specificity: Is the answer concrete and detailed, or vague and generic? (Rate 1-5, where 5 is very specific)
+2. Relevance: Does the answer actually address the question asked? (Rate 1-5, where 5 is highly relevant)
+3. Systematic: Does the answer identify a SYSTEMATIC root cause?
+
+Definition: A SYSTEMATIC root cause refers to failures at the organizational, process, or system level — not individual mistakes.
+
+An answer IS systematic if it indicates any of the following:
+- Missing, skipped, inadequate, or undefined PROCESS
+- Missing, weak, unenforced, or unclear POLICY
+- Lack of TRAINING or standardized knowledge
+- Skipped, absent, or poorly managed PREVENTIVE MAINTENANCE
+- Design or failure of a SYSTEM, workflow, or tool
+- Organizational or structural failure
+- Repeated or routine issues (even if performed by people)
+
+An answer IS NOT systematic if it ONLY refers to:
+- A single individual’s mistake or negligence
+- A one-time human error with no process implication
+- Random equipment failure with no maintenance or system implication
+
+⚠️ Important Rule
+If the answer mentions that something was “skipped,” “not done,” “not followed,” or “missing” and that thing is normally governed by a process, policy, or schedule, it MUST be classified as SYSTEMATIC.
+
+Respond in this exact format:
+Specificity: [score]
+Relevance: [score]
+Needs Improvement: [yes/no]
+Suggestion: [If needs improvement, provide a brief suggestion for what additional details would help]
+Systematic: [yes/no]
+
+Question: """
+
+
+def create_validation_prompt(question: str, answer: str) -> str:
+    """Create prompt for validating user answer - notebook wording, answer moved to the end"""
+    return f"""{VALIDATION_PROMPT_PREFIX}{question}
+Answer: {answer}"""
+
+
+def create_systematic_root_cause_check_prompt(answer: str) -> str:
+    """Create prompt for the systematic root cause check - answer moved to the end"""
+    return f"""{SYSTEMATIC_CHECK_PROMPT_PREFIX}{answer}\""""
+
+
+def create_combined_validation_prompt(question: str, answer: str) -> str:
+    """Create prompt that validates the answer and runs the systematic check in one pass"""
+    return f"""{COMBINED_VALIDATION_PROMPT_PREFIX}{question}
+Answer: {answer}"""
+
+
+# ============================================================================
+# VALIDATOR OUTPUT GRAMMARS (GBNF)
+# Exactly the "Respond in this exact format" lines of the prompts above.
+# Scores are single digits 1-5 and the suggestion is only written when the
+# answer needs improvement, so an acceptable answer takes about 15 tokens.
+# The suggestion is bounded so the longest output fits the token cap derived
+# from it (see GRAMMAR_MAX_CHARS); an unbounded one could be cut off before
+# the Systematic line.
+# ============================================================================
+
+SUGGESTION_MAX_CHARS = 160
+
+VALIDATION_GRAMMAR = rf'''
+root ::= "Specificity: " score "\nRelevance: " score "\nNeeds Improvement: " improvement
+score ::= [1-5]
+improvement ::= "no" | "yes\nSuggestion: " suggestion
+suggestion ::= [^\n]{{1,{SUGGESTION_MAX_CHARS}}}
+'''
+
+COMBINED_VALIDATION_GRAMMAR = rf'''
+root ::= "Specificity: " score "\nRelevance: " score "\nNeeds Improvement: " improvement "\nSystematic: " yesno
+score ::= [1-5]
+improvement ::= "no" | "yes\nSuggestion: " suggestion
+suggestion ::= [^\n]{{1,{SUGGESTION_MAX_CHARS}}}
+yesno ::= "yes" | "no"
+'''
+
+SYSTEMATIC_CHECK_GRAMMAR = r'''
+root ::= "Systematic: " ("yes" | "no")
+'''
+
+# Longest output each grammar allows, in characters. A token covers at least
+# one character of this (ASCII) output, so it also bounds the token count.
+_LONGEST_VALIDATION = "Specificity: 5\nRelevance: 5\nNeeds Improvement: yes\nSuggestion: " + "x" * SUGGESTION_MAX_CHARS
+GRAMMAR_MAX_CHARS = {
+    VALIDATION_GRAMMAR: len(_LONGEST_VALIDATION),
+    COMBINED_VALIDATION_GRAMMAR: len(_LONGEST_VALIDATION + "\nSystematic: yes"),
+    SYSTEMATIC_CHECK_GRAMMAR: len("Systematic: yes")
+}
+
+
+def static_validator_prefixes() -> list:
+    """Fixed instruction prefixes of the validator prompts, for the prefix cache"""
+    return [VALIDATION_PROMPT_PREFIX, SYSTEMATIC_CHECK_PROMPT_PREFIX, COMBINED_VALIDATION_PROMPT_PREFIX]
+
+
+# Last line of a complete report; generation stops on it (see output_limits.py)
+REPORT_END_MARKER = "END OF REPORT"
+
+
+def create_full_report_prompt(problem, whys, root_cause, confidence):
+    """Report prompt - reworded from the notebook to start with the session preamble"""
+    return f"""{create_session_preamble(problem, whys)}
 
 Root Cause:
 {root_cause}
@@ -145,10 +269,63 @@ STRUCTURE:
 - Process improvements
 - Monitoring
 - Review schedule
+
+After section 4, write a final line containing only: {REPORT_END_MARKER}
 """
 
 
 
+# Sections of the report generated in parallel: (key, heading, instructions)
+# Instructions follow the sectional notebook version (commented out below)
+REPORT_SECTIONS = [
+    ("executive", "## 1. Executive Summary", """Write the EXECUTIVE SUMMARY section for this RCA report. Include:
+- Brief incident overview (2-3 sentences)
+- High-level root cause statement
+- Overall impact
+
+Keep it concise and executive-focused."""),
+    ("analysis", "## 2. Detailed Analysis", """Write the DETAILED ANALYSIS section. Include:
+- Problem Statement with impact details
+- The 5 Whys methodology application
+- Step-by-step breakdown of each Why and answer
+- Root cause identification with confidence reasoning
+
+Be thorough and technical."""),
+    ("actions", "## 3. Corrective and Preventive Actions", """Write the CORRECTIVE AND PREVENTIVE ACTIONS section. Include:
+- Immediate corrective actions (3 specific items)
+- Long-term preventive measures (3 specific items)
+- Each action should be concrete and actionable
+
+Focus on practical solutions."""),
+    ("recommendations", "## 4. Recommendations and Follow-up", """Write the RECOMMENDATIONS AND FOLLOW-UP section. Include:
+- Process improvement recommendations (2-3 items)
+- Monitoring and alerting improvements
+- Follow-up actions and review schedule
+- Key learnings
+
+Make it actionable and forward-looking.""")
+]
+
+
+def create_report_section_prompt(problem, whys, root_cause, confidence, instructions):
+    """
+    Create prompt for one report section - starts with the session preamble so
+    every generator context reuses the evaluated history
+    """
+    return f"""{create_session_preamble(problem, whys)}
+
+Root Cause:
+{root_cause}
+
+Confidence Level:
+{confidence:.1f}%
+
+{instructions}
+
+Write only the content of this section, without a heading and without other sections."""
+
+
+
 # def create_report_prompt(problem: str, whys_context: str, root_cause: str, confidence: float, section: str) -> str:
 #     """Create prompt for generating specific report section - exact copy from notebook"""
     
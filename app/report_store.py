@@ -0,0 +1,283 @@
+"""
+Report Store Module
+Generated reports per session, written in the background and rendered on demand
+
+Each report is kept as one JSON document (problem, whys, root cause, report,
+confidence) named after its session, so concurrent sessions never share a
+file. Writes go to a single background thread and are atomic; until a write
+lands the document is served from memory. Downloads are rendered to Markdown,
+HTML or JSON and cached, together with their gzipped form, under the
+document's content hash, which also gives each rendering its ETag.
+"""
+
+import gzip
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+
+from app.helpers import RCAState, format_report_markdown
+
+
+FORMATS = {
+    "md": "text/markdown; charset=utf-8",
+    "html": "text/html; charset=utf-8",
+    "json": "application/json"
+}
+
+# Session ids are UUIDs; anything else never names a file
+_SAFE_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def report_document(session_id: str, state: RCAState) -> Dict:
+    """Everything a report download is rendered from"""
+    return {
+        "session_id": session_id,
+        "problem": state["problem"],
+        "whys": [{"question": why["question"], "answer": why["answer"]} for why in state["whys"]],
+        "root_cause": state["root_cause"],
+        "confidence_score": state["confidence_score"],
+        "report": state["report"],
+        "generated_at": datetime.now().isoformat(timespec="seconds")
+    }
+
+
+def content_hash(document: Dict) -> str:
+    payload = json.dumps(document, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _inline_html(text: str) -> str:
+    text = html.escape(text)
+    return re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+
+
+def markdown_to_html(markdown: str) -> str:
+    """
+    HTML body for the Markdown the report prompts produce:
+    headings, bullet and numbered lists, bold text, rules and paragraphs
+    """
+    lines, paragraph, list_tag = [], [], None
+
+    def close_paragraph():
+        if paragraph:
+            lines.append(f"<p>{'<br>'.join(paragraph)}</p>")
+            paragraph.clear()
+
+    def close_list():
+        nonlocal list_tag
+        if list_tag:
+            lines.append(f"</{list_tag}>")
+            list_tag = None
+
+    for raw in markdown.splitlines():
+        line = raw.strip()
+        heading = re.match(r"(#{1,6})\s+(.*)", line)
+        item = re.match(r"(?:[-*]|(\d+)[.)])\s+(.*)", line)
+        if not line:
+            close_paragraph()
+            close_list()
+        elif heading:
+            close_paragraph()
+            close_list()
+            level = len(heading.group(1))
+            lines.append(f"<h{level}>{_inline_html(heading.group(2))}</h{level}>")
+        elif re.fullmatch(r"-{3,}|\*{3,}", line):
+            close_paragraph()
+            close_list()
+            lines.append("<hr>")
+        elif item:
+            close_paragraph()
+            tag = "ol" if item.group(1) else "ul"
+            if tag != list_tag:
+                close_list()
+                lines.append(f"<{tag}>")
+                list_tag = tag
+            lines.append(f"<li>{_inline_html(item.group(2))}</li>")
+        else:
+            close_list()
+            paragraph.append(_inline_html(line))
+    close_paragraph()
+    close_list()
+    return "\n".join(lines)
+
+
+def render_report(document: Dict, fmt: str) -> str:
+    """Report document as Markdown, HTML or JSON text"""
+    if fmt == "json":
+        return json.dumps(document, indent=2, ensure_ascii=False)
+
+    markdown = format_report_markdown(document, datetime.fromisoformat(document["generated_at"]))
+    if fmt == "md":
+        return markdown
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Root Cause Analysis Report</title>
+</head>
+<body>
+{markdown_to_html(markdown)}
+</body>
+</html>
+"""
+
+
+class ReportStore:
+    """Per-session report documents with background writes and a render cache"""
+
+    def __init__(self, directory: str, render_cache_entries: int):
+        self.directory = directory
+        self.render_cache_entries = render_cache_entries
+        os.makedirs(directory, exist_ok=True)
+
+        # Documents saved but not yet on disk
+        self._pending: Dict[str, Dict] = {}
+        self._rendered: "OrderedDict[tuple, Dict]" = OrderedDict()
+        # (session id, format) -> ETag of the rendering last written by export()
+        self._exported: Dict[tuple, str] = {}
+        self._lock = threading.Lock()
+        # One writer keeps the writes of a session in order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rca-report-writer")
+
+        self.render_hits = 0
+        self.render_misses = 0
+
+    def _path(self, session_id: str) -> str:
+        if not _SAFE_ID.fullmatch(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def save(self, session_id: str, state: RCAState) -> Dict:
+        """Store a session's report; returns at once, the file is written in the background"""
+        document = report_document(session_id, state)
+        path = self._path(session_id)
+        with self._lock:
+            self._pending[session_id] = document
+        self._writer.submit(self._write, session_id, path, document)
+        return document
+
+    def _write(self, session_id: str, path: str, document: Dict):
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Stays in memory for this process; lost on restart
+            print(f"Report write failed for {session_id}: {e}")
+            return
+        with self._lock:
+            if self._pending.get(session_id) is document:
+                del self._pending[session_id]
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """A session's report document, or None (blocking read; call off the event loop)"""
+        with self._lock:
+            document = self._pending.get(session_id)
+        if document is not None:
+            return document
+
+        try:
+            with open(self._path(session_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def render(self, session_id: str, fmt: str) -> Optional[Dict]:
+        """
+        A session's report rendered as fmt ("md", "html" or "json"), or None
+        Returns {"body", "gzip", "etag", "media_type", "filename"}
+        """
+        document = self.get(session_id)
+        if document is None:
+            return None
+
+        key = (content_hash(document), fmt)
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is not None:
+                self._rendered.move_to_end(key)
+                self.render_hits += 1
+                return rendered
+            self.render_misses += 1
+
+        body = render_report(document, fmt).encode("utf-8")
+        rendered = {
+            "body": body,
+            # mtime=0 keeps the gzipped bytes (and their ETag) stable
+            "gzip": gzip.compress(body, compresslevel=6, mtime=0),
+            "etag": f"{key[0][:32]}-{fmt}",
+            "media_type": FORMATS[fmt],
+            "filename": f"rca-report-{session_id[:8]}.{fmt}"
+        }
+        with self._lock:
+            self._rendered[key] = rendered
+            while len(self._rendered) > self.render_cache_entries:
+                self._rendered.popitem(last=False)
+        return rendered
+
+    def export(self, session_id: str, fmt: str) -> Optional[str]:
+        """
+        Path of a file holding the rendered report, or None (for UIs that serve files)
+        The file is rewritten only when the report changed
+        """
+        rendered = self.render(session_id, fmt)
+        if rendered is None:
+            return None
+
+        directory = self._export_dir(session_id)
+        path = os.path.join(directory, rendered["filename"])
+        with self._lock:
+            current = self._exported.get((session_id, fmt)) == rendered["etag"] and os.path.exists(path)
+        if not current:
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(rendered["body"])
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._exported[(session_id, fmt)] = rendered["etag"]
+        return path
+
+    def _export_dir(self, session_id: str) -> str:
+        return os.path.join(self.directory, "exports", session_id)
+
+    def delete(self, session_id: str):
+        """Remove a session's report and exports, after any write still queued for it"""
+        path = self._path(session_id)
+        with self._lock:
+            self._pending.pop(session_id, None)
+            for fmt in FORMATS:
+                self._exported.pop((session_id, fmt), None)
+        self._writer.submit(self._remove, path, self._export_dir(session_id))
+
+    @staticmethod
+    def _remove(path: str, export_dir: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(export_dir, ignore_errors=True)
+
+    def shutdown(self, wait: bool = True):
+        """Finish queued writes"""
+        self._writer.shutdown(wait=wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.render_hits + self.render_misses
+            return {
+                "pending_writes": len(self._pending),
+                "rendered_entries": len(self._rendered),
+                "hits": self.render_hits,
+                "misses": self.render_misses,
+                "hit_rate": self.render_hits / lookups if lookups else 0.0
+            }
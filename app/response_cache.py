@@ -0,0 +1,127 @@
+"""
+Response Cache Module
+Content-addressed cache of LLM completions
+
+Keys are a hash of the model id, the prompt and the sampling parameters, so an
+identical call (a retried or double-submitted answer, a regenerated report over
+unchanged state) returns the stored text instead of running the model again.
+Entries live in an in-memory LRU and, optionally, in a bounded SQLite file that
+survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def make_cache_key(model_id: str, prompt: str, params: dict) -> str:
+    """Stable hash of everything that determines a completion"""
+    payload = json.dumps([model_id, prompt, params], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-memory LRU with an optional on-disk tier"""
+
+    def __init__(self, max_entries: int, disk_path: Optional[str] = None, disk_max_entries: int = 0):
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            conn = self._conn()
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access)")
+            conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.disk_path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, value: str):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion for a key, or None"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+        if self.disk_path:
+            conn = self._conn()
+            row = conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                with conn:
+                    conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._remember(key, row[0])
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str):
+        """Store a completion in every tier"""
+        self._remember(key, value)
+
+        if self.disk_path:
+            conn = self._conn()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, last_access) VALUES (?, ?, ?)",
+                    (key, value, time.time())
+                )
+                if self.disk_max_entries > 0:
+                    conn.execute(
+                        """DELETE FROM responses WHERE key IN (
+                               SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                           )""",
+                        (self.disk_max_entries,)
+                    )
+
+    def stats(self) -> dict:
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries_in_memory": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,324 @@
+"""
+Session Store Module
+Bounded, optionally durable storage for API sessions
+
+A session is the dict the API keeps per analysis: {"state": RCAState, "completed": bool}.
+Stores expire sessions that have not been touched for a TTL, evict the least
+recently used ones above a size limit, and notify listeners (e.g. the KV cache)
+when a session goes away.
+
+- MemorySessionStore: process-local, lost on restart
+- SQLiteSessionStore: WAL-mode SQLite file shared by all API workers on a host
+
+Every put bumps a session's version. A step that read a session with
+get_with_version writes it back with that version, and the write fails with
+SessionConflict if another request (on any worker) saved the session first.
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import (
+    SESSION_STORE,
+    SESSION_DB_PATH,
+    SESSION_TTL_SECONDS,
+    SESSION_MAX_SESSIONS
+)
+
+
+def serialize_session(session: Dict) -> bytes:
+    """Compact binary form of a session (minified JSON, zlib-compressed)"""
+    return zlib.compress(json.dumps(session, separators=(",", ":")).encode("utf-8"))
+
+
+def deserialize_session(data: bytes) -> Dict:
+    """Inverse of serialize_session"""
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+class SessionConflict(Exception):
+    """Raised by put when the session changed since the version it was read at"""
+
+
+class SessionStore:
+    """Interface shared by all session stores"""
+
+    def __init__(self, ttl_seconds: int, max_sessions: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._listeners: List[Callable[[str], None]] = []
+        self._locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return a session (marking it recently used), or None if missing/expired"""
+        found = self.get_with_version(session_id)
+        return None if found is None else found[0]
+
+    def get_with_version(self, session_id: str) -> Optional[Tuple[Dict, int]]:
+        """Like get, with the session's current version for a later put"""
+        raise NotImplementedError
+
+    def put(self, session_id: str, session: Dict, version: Optional[int] = None):
+        """
+        Insert or replace a session
+        With a version, only replace it if it is still at that version, else
+        raise SessionConflict
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        """Remove a session"""
+        raise NotImplementedError
+
+    def exists(self, session_id: str) -> bool:
+        """Check for a live session without loading it"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Number of stored sessions"""
+        raise NotImplementedError
+
+    def sweep(self) -> List[str]:
+        """Delete expired sessions and return their ids"""
+        raise NotImplementedError
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.exists(session_id)
+
+    def add_eviction_listener(self, listener: Callable[[str], None]):
+        """Call listener(session_id) whenever a session is deleted, expired or evicted"""
+        self._listeners.append(listener)
+
+    def _notify(self, session_ids: List[str]):
+        for session_id in session_ids:
+            for listener in self._listeners:
+                try:
+                    listener(session_id)
+                except Exception as e:
+                    print(f"Session eviction listener failed for {session_id}: {e}")
+
+    def lock(self, session_id: str) -> threading.Lock:
+        """
+        Per-session lock serializing requests for one session in this process
+        Other processes are only kept out by versioned puts
+        """
+        with self._locks_guard:
+            lock = self._locks.get(session_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[session_id] = lock
+            return lock
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store: an LRU-ordered dict with TTL expiry"""
+
+    def __init__(self, ttl_seconds: int, max_sessions: int):
+        super().__init__(ttl_seconds, max_sessions)
+        # session_id -> (session, last_access, version)
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, last_access: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - last_access > self.ttl_seconds
+
+    def get_with_version(self, session_id: str) -> Optional[Tuple[Dict, int]]:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if not self._expired(entry[1], now):
+                self._sessions[session_id] = (entry[0], now, entry[2])
+                self._sessions.move_to_end(session_id)
+                # A copy, like the SQLite store: steps that fail or are
+                # cancelled part way must not leave changes behind
+                return copy.deepcopy(entry[0]), entry[2]
+            del self._sessions[session_id]
+
+        self._notify([session_id])
+        return None
+
+    def put(self, session_id: str, session: Dict, version: Optional[int] = None):
+        evicted = []
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            current = entry[2] if entry is not None else 0
+            if version is not None and (entry is None or current != version):
+                raise SessionConflict(session_id)
+            self._sessions[session_id] = (copy.deepcopy(session), time.time(), current + 1)
+            self._sessions.move_to_end(session_id)
+            while self.max_sessions > 0 and len(self._sessions) > self.max_sessions:
+                old_id, _ = self._sessions.popitem(last=False)
+                evicted.append(old_id)
+        self._notify(evicted)
+
+    def delete(self, session_id: str):
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+        if removed:
+            self._notify([session_id])
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            return entry is not None and not self._expired(entry[1], time.time())
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def sweep(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, last_access, _) in self._sessions.items()
+                       if self._expired(last_access, now)]
+            for session_id in expired:
+                del self._sessions[session_id]
+        self._notify(expired)
+        return expired
+
+
+class SQLiteSessionStore(SessionStore):
+    """Durable store in a WAL-mode SQLite database"""
+
+    def __init__(self, path: str, ttl_seconds: int, max_sessions: int):
+        super().__init__(ttl_seconds, max_sessions)
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                completed INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        # Databases created before sessions were versioned
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+        if "version" not in columns:
+            conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _cutoff(self, now: float) -> float:
+        return now - self.ttl_seconds if self.ttl_seconds > 0 else float("-inf")
+
+    def get_with_version(self, session_id: str) -> Optional[Tuple[Dict, int]]:
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT data, last_access, version FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        if row[1] < self._cutoff(now):
+            self.delete(session_id)
+            return None
+
+        with conn:
+            conn.execute("UPDATE sessions SET last_access = ? WHERE session_id = ?", (now, session_id))
+        return deserialize_session(row[0]), row[2]
+
+    def put(self, session_id: str, session: Dict, version: Optional[int] = None):
+        now = time.time()
+        data, completed = serialize_session(session), int(session.get("completed", False))
+        conn = self._conn()
+        with conn:
+            if version is None:
+                conn.execute(
+                    """INSERT INTO sessions (session_id, data, completed, created_at, last_access, version)
+                       VALUES (?, ?, ?, ?, ?, 1)
+                       ON CONFLICT(session_id) DO UPDATE SET
+                           data = excluded.data,
+                           completed = excluded.completed,
+                           last_access = excluded.last_access,
+                           version = sessions.version + 1""",
+                    (session_id, data, completed, now, now)
+                )
+            else:
+                # Compare-and-set: a write from another worker since the read wins
+                updated = conn.execute(
+                    """UPDATE sessions SET data = ?, completed = ?, last_access = ?, version = version + 1
+                       WHERE session_id = ? AND version = ?""",
+                    (data, completed, now, session_id, version)
+                ).rowcount
+                if not updated:
+                    raise SessionConflict(session_id)
+
+            evicted = []
+            if self.max_sessions > 0:
+                rows = conn.execute(
+                    "SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?",
+                    (self.max_sessions,)
+                ).fetchall()
+                evicted = [r[0] for r in rows]
+                conn.executemany("DELETE FROM sessions WHERE session_id = ?", rows)
+
+        self._notify(evicted)
+
+    def delete(self, session_id: str):
+        conn = self._conn()
+        with conn:
+            removed = conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount
+        if removed:
+            self._notify([session_id])
+
+    def exists(self, session_id: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM sessions WHERE session_id = ? AND last_access >= ?",
+            (session_id, self._cutoff(time.time()))
+        ).fetchone()
+        return row is not None
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def sweep(self) -> List[str]:
+        if self.ttl_seconds <= 0:
+            return []
+        conn = self._conn()
+        with conn:
+            rows = conn.execute(
+                "SELECT session_id FROM sessions WHERE last_access < ?", (self._cutoff(time.time()),)
+            ).fetchall()
+            conn.executemany("DELETE FROM sessions WHERE session_id = ?", rows)
+        expired = [r[0] for r in rows]
+        self._notify(expired)
+        return expired
+
+
+def create_session_store() -> SessionStore:
+    """Build the store selected by RCA_SESSION_STORE ("sqlite" or "memory")"""
+    if SESSION_STORE == "memory":
+        return MemorySessionStore(SESSION_TTL_SECONDS, SESSION_MAX_SESSIONS)
+    if SESSION_STORE == "sqlite":
+        return SQLiteSessionStore(SESSION_DB_PATH, SESSION_TTL_SECONDS, SESSION_MAX_SESSIONS)
+    raise ValueError(f"Unknown session store: {SESSION_STORE}")
@@ -0,0 +1,111 @@
+"""
+Tracing Module
+Per-session timeline of API steps, graph nodes and LLM calls
+
+Spans are recorded as Chrome trace events ("X" complete events, microseconds)
+into a list kept in the session record, so they persist with the session and
+are shared by all API workers. /trace/{session_id} returns them as a trace
+file that chrome://tracing and https://ui.perfetto.dev open directly.
+
+Recording is tied to the thread running a session step through a context
+variable; work handed to another thread must be wrapped with bind().
+"""
+
+import contextvars
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from app.config import TRACING_ENABLED, TRACE_MAX_EVENTS
+
+
+class SessionTrace:
+    """Appends trace events to a session's event list (thread-safe)"""
+
+    def __init__(self, events: List[Dict]):
+        self.events = events
+        self._lock = threading.Lock()
+        self._named_threads = {
+            (event["pid"], event["tid"]) for event in events if event.get("ph") == "M"
+        }
+
+    def add(self, name: str, category: str, start_us: int, duration_us: int, args: Dict):
+        pid, tid = os.getpid(), threading.get_native_id()
+        with self._lock:
+            if len(self.events) >= TRACE_MAX_EVENTS:
+                return
+            if (pid, tid) not in self._named_threads:
+                # Label the row in the viewer with the Python thread name
+                self._named_threads.add((pid, tid))
+                self.events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                                    "args": {"name": threading.current_thread().name}})
+            self.events.append({"name": name, "cat": category, "ph": "X", "ts": start_us,
+                                "dur": duration_us, "pid": pid, "tid": tid, "args": args})
+
+
+_active: contextvars.ContextVar[Optional[SessionTrace]] = contextvars.ContextVar("rca_trace", default=None)
+
+
+@contextmanager
+def span(name: str, category: str, **args):
+    """
+    Record the enclosed block on the active session trace (no-op without one)
+    Yields the span's args so callers can add results before it closes
+    """
+    trace = _active.get()
+    if trace is None:
+        yield args
+        return
+
+    start_us = time.time_ns() // 1000
+    started = time.perf_counter()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        trace.add(name, category, start_us, int((time.perf_counter() - started) * 1_000_000), args)
+
+
+@contextmanager
+def session_trace(events: List[Dict], step: str, **args):
+    """Trace a session step: everything recorded in this thread goes into events"""
+    if not TRACING_ENABLED:
+        yield
+        return
+
+    token = _active.set(SessionTrace(events))
+    try:
+        with span(step, "step", **args):
+            yield
+    finally:
+        _active.reset(token)
+
+
+def bind(fn: Callable) -> Callable:
+    """Wrap fn so it records on the caller's session trace when run on another thread"""
+    trace = _active.get()
+    if trace is None:
+        return fn
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _active.set(trace)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _active.reset(token)
+    return wrapper
+
+
+def chrome_trace(session_id: str, events: List[Dict]) -> Dict:
+    """Trace file contents for a session"""
+    return {
+        "traceEvents": sorted(events, key=lambda event: (event.get("ts", 0), -event.get("dur", 0))),
+        "displayTimeUnit": "ms",
+        "otherData": {"session_id": session_id}
+    }
@@ -0,0 +1,291 @@
+"""
+Load test: concurrent simulated analysts driving full 5-Whys sessions
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --users 8 --sessions 40              # in-process server, fake models
+    python -m benchmarks.load_test --users 4 --think-time 5 --backend llama_cpp
+    python -m benchmarks.load_test --url http://localhost:8000 --users 4 --duration 600
+
+Every simulated user runs /start -> /answer (until the root cause is
+extracted) -> /generate_report -> DELETE /session, waiting --think-time
+seconds (exponentially distributed) before each answer as an analyst would.
+--answer-quality is the share of specific answers; vague ones usually get an
+improvement request, which the user answers with a specific answer, and
+answers naming a missing process tend to stop the analysis early. With real
+models this exercises retries and early stops; the fake models decide from a
+hash of the prompt, so the mix only shifts the prompts there.
+
+Without --url the API is started in this process with --backend (default:
+mock, see --prompt-ms / --gen-ms) and caches isolated in a temporary directory.
+Reports p50/p95/p99 latency per endpoint and completed sessions per hour.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+
+PROBLEMS = [
+    "Checkout API returned 500 errors for 20 minutes after a release",
+    "Nightly billing job finished six hours late and invoices were sent twice",
+    "Search results were empty for all users in the EU region after a failover",
+    "Mobile app logins failed for 40% of users following a certificate rotation",
+    "Warehouse scanners lost connectivity every morning between 8 and 9 am"
+]
+
+# Specific, causal answers; the later ones name a missing process (systematic)
+SPECIFIC_ANSWERS = [
+    "The new release changed the database connection pool size from 50 to 5, so requests queued and timed out.",
+    "The config change was merged without anyone comparing it against the production values.",
+    "The deployment pipeline has no step that diffs configuration against the previous release.",
+    "There is no review process for configuration changes; only application code requires approval.",
+    "We never defined ownership for shared configuration, so no team checks it before a release."
+]
+
+VAGUE_ANSWERS = [
+    "It just broke.",
+    "Not sure, something with the system.",
+    "Because of the release.",
+    "Human error.",
+    "The server had a problem."
+]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(backend: str, prompt_ms: float, gen_ms: float) -> str:
+    """Run the API in a background thread with isolated caches; returns its base URL"""
+    workdir = tempfile.mkdtemp(prefix="rca-load-")
+    os.environ["RCA_BACKEND"] = backend
+    os.environ["RCA_MOCK_PROMPT_MS"] = str(prompt_ms)
+    os.environ["RCA_MOCK_GEN_MS"] = str(gen_ms)
+    os.environ.setdefault("RCA_CACHE_DIR", os.path.join(workdir, "cache"))
+    # Users share a few problems and answers; real analysts would not hit the cache
+    os.environ.setdefault("RCA_RESPONSE_CACHE", "0")
+    os.environ.setdefault("RCA_INCIDENT_INDEX", "0")
+
+    import uvicorn
+    from app.api import api_app
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(api_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="rca-load-api", daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 1800):
+    """Poll /ready until the models are loaded"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/ready")
+            if response.status_code == 200:
+                return response.json()
+            if response.json().get("state") == "failed":
+                raise RuntimeError(f"Model loading failed: {response.json().get('error')}")
+        except httpx.TransportError:
+            pass  # Server not listening yet
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"Models not ready after {timeout}s")
+
+
+class LoadTest:
+    """Simulated users and the latencies and outcomes they observed"""
+
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.counts = defaultdict(int)  # sessions, improvements, early_stops, whys
+        self._started_sessions = 0
+        self._deadline = None
+
+    async def _post(self, endpoint: str, payload: dict) -> dict:
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(endpoint, json=payload)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.errors[endpoint] += 1
+            raise
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        return response.json()
+
+    async def _think(self):
+        if self.args.think_time > 0:
+            await asyncio.sleep(self.random.expovariate(1 / self.args.think_time))
+
+    def _answer(self, why_no: int) -> str:
+        if self.random.random() < self.args.answer_quality:
+            return SPECIFIC_ANSWERS[min(why_no, len(SPECIFIC_ANSWERS)) - 1]
+        return self.random.choice(VAGUE_ANSWERS)
+
+    def _next_session(self) -> bool:
+        """Claim the next session to run, False once the run is over"""
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return False
+        if self.args.sessions and self._started_sessions >= self.args.sessions:
+            return False
+        self._started_sessions += 1
+        return True
+
+    async def session(self):
+        """One analyst working through a complete analysis"""
+        data = await self._post("/start", {"problem": self.random.choice(PROBLEMS)})
+        session_id = data["session_id"]
+        try:
+            while True:
+                await self._think()
+                answer = self._answer(data["why_no"])
+                data = await self._post("/answer", {"session_id": session_id, "answer": answer})
+                self.counts["whys"] += 1
+
+                if data.get("needs_improvement"):
+                    self.counts["improvements"] += 1
+                    await self._think()
+                    improved = SPECIFIC_ANSWERS[min(data["why_no"], len(SPECIFIC_ANSWERS)) - 1]
+                    data = await self._post("/answer", {"session_id": session_id, "answer": answer,
+                                                        "improved_answer": improved})
+
+                if data.get("root_cause_extracted"):
+                    if data["why_no"] < 5:
+                        self.counts["early_stops"] += 1
+                    break
+
+            await self._post("/generate_report", {"session_id": session_id})
+            self.counts["sessions"] += 1
+        finally:
+            try:
+                await self.client.delete(f"/session/{session_id}")
+            except httpx.HTTPError:
+                pass
+
+    async def user(self, index: int):
+        # Spread the users' first sessions over the ramp-up
+        if self.args.ramp_up > 0:
+            await asyncio.sleep(self.args.ramp_up * index / self.args.users)
+        while self._next_session():
+            try:
+                await self.session()
+            except httpx.HTTPError as e:
+                self.counts["failed_sessions"] += 1
+                print(f"Session failed: {e}")
+
+    async def run(self) -> float:
+        """Run all users; returns the elapsed wall time in seconds"""
+        if self.args.duration:
+            self._deadline = time.monotonic() + self.args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(self.user(i) for i in range(self.args.users)))
+        return time.perf_counter() - started
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples = sorted(samples)
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 1),
+                "max_ms": round(samples[-1] * 1000, 1)
+            }
+        sessions = self.counts["sessions"]
+        return {
+            "users": self.args.users,
+            "think_time_s": self.args.think_time,
+            "answer_quality": self.args.answer_quality,
+            "elapsed_s": round(elapsed, 1),
+            "sessions_completed": sessions,
+            "sessions_failed": self.counts["failed_sessions"],
+            "sessions_per_hour": round(sessions / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+            "answers_per_session": round(self.counts["whys"] / sessions, 2) if sessions else 0.0,
+            "improvement_requests": self.counts["improvements"],
+            "early_stops": self.counts["early_stops"],
+            "endpoints": endpoints
+        }
+
+
+def print_summary(summary: dict):
+    print(f"\n{'endpoint':<20}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint, stats in summary["endpoints"].items():
+        print(f"{endpoint:<20}{stats['requests']:>10}{stats['errors']:>8}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['max_ms']:>10.1f}")
+    print(f"\n{summary['sessions_completed']} sessions in {summary['elapsed_s']}s with {summary['users']} users "
+          f"({summary['sessions_failed']} failed): {summary['sessions_per_hour']} sessions/hour")
+    print(f"{summary['answers_per_session']} answers per session, "
+          f"{summary['improvement_requests']} improvement requests, {summary['early_stops']} early stops")
+
+
+async def run_load_test(args) -> dict:
+    base_url = args.url or start_local_server(args.backend, args.prompt_ms, args.gen_ms)
+    limits = httpx.Limits(max_connections=args.users + 4, max_keepalive_connections=args.users + 4)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        print(f"Waiting for {base_url} to be ready...")
+        await wait_until_ready(client)
+        print(f"Running {args.users} users...")
+        test = LoadTest(client, args)
+        elapsed = await test.run()
+        return test.summary(elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent 5-Whys sessions against the RCA API")
+    parser.add_argument("--url", help="Base URL of a running API (default: start one in this process)")
+    parser.add_argument("--backend", default="mock",
+                        choices=["mock", "llama_cpp", "model_server", "llama_server"],
+                        help="Inference backend of the in-process API (default: mock)")
+    parser.add_argument("--prompt-ms", type=float, default=0.0,
+                        help="Mock backend: prompt evaluation time per new token (ms)")
+    parser.add_argument("--gen-ms", type=float, default=0.0,
+                        help="Mock backend: generation time per token (ms)")
+    parser.add_argument("--users", type=int, default=4, help="Concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=0,
+                        help="Sessions to complete in total (default: 2 per user unless --duration)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Stop starting sessions after this many seconds")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds a user thinks before answering")
+    parser.add_argument("--answer-quality", type=float, default=0.7,
+                        help="Share of specific answers (the rest are vague, 0-1)")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which users start")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for problems, answers and think times")
+    parser.add_argument("--output", help="Also write the summary as JSON")
+    args = parser.parse_args()
+
+    if not args.sessions and not args.duration:
+        args.sessions = 2 * args.users
+
+    summary = asyncio.run(run_load_test(args))
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"\nSummary written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
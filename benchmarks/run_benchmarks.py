@@ -0,0 +1,312 @@
+"""
+Micro-benchmarks for the RCA graph, nodes and API with fake models
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks                        # run and print
+    python -m benchmarks.run_benchmarks --save-baseline        # store as baseline
+    python -m benchmarks.run_benchmarks --compare              # fail on regressions
+
+By default the mock backend (app.fake_model.FakeLlama) stands in for the
+models, so the numbers are the application's own overhead (graph compilation,
+routing, prompt building, parsing, caches, session store, FastAPI request path)
+plus whatever latency the fake is told to simulate (--prompt-ms / --gen-ms).
+Pass --backend to run the same workload against a real backend, e.g.
+    python -m benchmarks.run_benchmarks --suite nodes --suite api --backend llama_server
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+
+
+def _isolate_environment(workdir: str, backend: str, prompt_ms: float, gen_ms: float):
+    """Keep caches and reports out of the working tree; must run before app imports"""
+    os.environ["RCA_BACKEND"] = backend
+    os.environ["RCA_MOCK_PROMPT_MS"] = str(prompt_ms)
+    os.environ["RCA_MOCK_GEN_MS"] = str(gen_ms)
+    os.environ.setdefault("RCA_CACHE_DIR", os.path.join(workdir, "cache"))
+    # Repeated identical prompts would otherwise be answered by the response cache
+    os.environ.setdefault("RCA_RESPONSE_CACHE", "0")
+    os.environ.setdefault("RCA_INCIDENT_INDEX", "0")
+    # Background speculation would overlap with the next timed call
+    os.environ.setdefault("RCA_SPECULATIVE_NEXT_QUESTION", "0")
+    os.chdir(workdir)
+
+
+def measure(fn: Callable, iterations: int, warmup: int = 3) -> Dict[str, float]:
+    """Run fn repeatedly and summarize the wall time per call in microseconds"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1e6)
+
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "min_us": round(samples[0], 2),
+        "median_us": round(statistics.median(samples), 2),
+        "p95_us": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 2),
+        "mean_us": round(statistics.fmean(samples), 2)
+    }
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def _sample_state(why_no: int = 3) -> dict:
+    whys = [
+        {"question": f"Why {i}: Why did step {i} fail?",
+         "answer": f"Because the deployment config for service {i} was changed without review.",
+         "quality_score": 4.0}
+        for i in range(1, why_no)
+    ]
+    return {
+        "problem": "Checkout API returned 500 errors for 20 minutes after a release",
+        "why_no": why_no,
+        "whys": whys,
+        "root_cause": "The release pipeline has no config validation step.",
+        "confidence_score": 80.0,
+        "report": "",
+        "user_input": "The feature flag defaulted to on because the config schema was not validated.",
+        "needs_validation": True,
+        "retry_count": 0,
+        "current_question": "Why was the feature flag enabled?",
+        "needs_improvement": False,
+        "improvement_suggestion": "",
+        "improved_input": "",
+        "early_root_cause_found": False,
+        "session_id": "bench-session"
+    }
+
+
+def bench_graph(iterations: int) -> Dict[str, Dict]:
+    from app.graph_builder import build_graph, should_continue_or_validate
+    from app.graph_compiler import compile_graph
+
+    states = [
+        dict(_sample_state(), needs_validation=True),
+        dict(_sample_state(), needs_validation=False),
+        dict(_sample_state(5), needs_validation=False),
+        dict(_sample_state(4), needs_validation=False, early_root_cause_found=True)
+    ]
+
+    def route_all():
+        for state in states:
+            should_continue_or_validate(state)
+
+    return {
+        "graph.build_graph": measure(build_graph, iterations),
+        "graph.compile_graph": measure(compile_graph, iterations),
+        "graph.should_continue_or_validate_x4": measure(route_all, iterations * 100)
+    }
+
+
+def bench_prompts(iterations: int) -> Dict[str, Dict]:
+    from app.helpers import format_whys_context, parse_validation_response, parse_systematic_response
+    from app.prompt_definitions import (
+        create_why_prompt,
+        create_root_cause_prompt,
+        create_validation_prompt,
+        create_combined_validation_prompt,
+        create_full_report_prompt
+    )
+
+    state = _sample_state(5)
+    context = format_whys_context(state["whys"])
+    validation_output = ("Specificity: 4\nRelevance: 5\nNeeds Improvement: no\n"
+                         "Suggestion: Name the service and the config key.\nSystematic: yes")
+
+    n = iterations * 100
+    return {
+        "prompts.format_whys_context": measure(lambda: format_whys_context(state["whys"]), n),
+        "prompts.create_why_prompt": measure(lambda: create_why_prompt(state["problem"], 5, context), n),
+        "prompts.create_root_cause_prompt": measure(lambda: create_root_cause_prompt(state["problem"], context), n),
+        "prompts.create_validation_prompt": measure(
+            lambda: create_validation_prompt(state["current_question"], state["user_input"]), n),
+        "prompts.create_combined_validation_prompt": measure(
+            lambda: create_combined_validation_prompt(state["current_question"], state["user_input"]), n),
+        "prompts.create_full_report_prompt": measure(
+            lambda: create_full_report_prompt(state["problem"], context, state["root_cause"], 80.0), n),
+        "parsing.parse_validation_response": measure(lambda: parse_validation_response(validation_output), n),
+        "parsing.parse_systematic_response": measure(lambda: parse_systematic_response(validation_output), n)
+    }
+
+
+def bench_nodes(iterations: int) -> Dict[str, Dict]:
+    import copy
+    from app.node_definitions import why_asker, answer_validator, root_cause_extractor, report_generator
+
+    base = _sample_state(3)
+    fused = dict(_sample_state(4), needs_validation=True)
+
+    def run(node, state):
+        return lambda: node(copy.deepcopy(state))
+
+    return {
+        "node.why_asker": measure(run(why_asker, dict(base, why_no=2)), iterations),
+        "node.answer_validator": measure(run(answer_validator, base), iterations),
+        "node.answer_validator_fused": measure(run(answer_validator, fused), iterations),
+        "node.root_cause_extractor": measure(run(root_cause_extractor, _sample_state(5)), iterations),
+        "node.report_generator": measure(run(report_generator, _sample_state(5)), iterations)
+    }
+
+
+def bench_api(iterations: int) -> Dict[str, Dict]:
+    from fastapi.testclient import TestClient
+    from app.api import api_app
+
+    # No "with": startup would load the real models
+    client = TestClient(api_app)
+    problem = {"problem": "Checkout API returned 500 errors for 20 minutes after a release"}
+    answer = "The feature flag defaulted to on because the config schema was not validated."
+
+    def post(path, payload):
+        response = client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    def full_session():
+        session = post("/start", problem)
+        while True:
+            result = post("/answer", {"session_id": session["session_id"], "answer": answer,
+                                      "improved_answer": answer})
+            if result.get("root_cause_extracted"):
+                break
+        post("/generate_report", {"session_id": session["session_id"]})
+        client.delete(f"/session/{session['session_id']}")
+
+    session_id = post("/start", problem)["session_id"]
+
+    def answer_once():
+        # Re-answer the same why on a fresh copy so every call does the same work
+        sid = post("/start", problem)["session_id"]
+        post("/answer", {"session_id": sid, "answer": answer, "improved_answer": answer})
+
+    batch = {"items": [{"question": "Why was the flag enabled?", "answer": answer}] * 10}
+
+    return {
+        "api.health": measure(lambda: client.get("/health").raise_for_status(), iterations * 10),
+        "api.start": measure(lambda: post("/start", problem), iterations),
+        "api.start_and_answer": measure(answer_once, iterations),
+        "api.report": measure(lambda: client.get(f"/report/{session_id}").raise_for_status(), iterations * 10),
+        "api.validate_batch_10": measure(lambda: post("/validate_batch", batch), iterations),
+        "api.full_session": measure(full_session, max(1, iterations // 5))
+    }
+
+
+SUITES = {
+    "graph": bench_graph,
+    "prompts": bench_prompts,
+    "nodes": bench_nodes,
+    "api": bench_api
+}
+
+
+# ============================================================================
+# BASELINE COMPARISON
+# ============================================================================
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> list:
+    """Print median changes against the baseline and return the regressed names"""
+    regressions = []
+    print(f"\n{'benchmark':<45}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<45}{'-':>12}{result['median_us']:>12.1f}{'new':>10}")
+            continue
+        change = result["median_us"] / base["median_us"] - 1 if base["median_us"] else 0.0
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{name:<45}{base['median_us']:>12.1f}{result['median_us']:>12.1f}{change:>+10.1%}{flag}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RCA micro-benchmarks with fake models")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="Suite to run (repeatable, default: all)")
+    parser.add_argument("--iterations", type=int, default=50, help="Base iteration count")
+    parser.add_argument("--backend", default="mock",
+                        choices=["mock", "llama_cpp", "model_server", "llama_server"],
+                        help="Inference backend for the node and API suites (default: mock)")
+    parser.add_argument("--prompt-ms", type=float, default=0.0,
+                        help="Mock backend: prompt evaluation time per new token (ms)")
+    parser.add_argument("--gen-ms", type=float, default=0.0,
+                        help="Mock backend: generation time per token (ms)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare with")
+    parser.add_argument("--compare", action="store_true", help="Exit 1 if a median regressed past --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median slowdown (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results as the baseline")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+
+    workdir = tempfile.mkdtemp(prefix="rca-bench-")
+    _isolate_environment(workdir, args.backend, args.prompt_ms, args.gen_ms)
+
+    from app.model_loading import load_model
+    load_model()
+
+    results: Dict[str, Dict] = {}
+    for suite in args.suite or list(SUITES):
+        print(f"Running {suite} benchmarks...")
+        results.update(SUITES[suite](args.iterations))
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "prompt_ms_per_token": args.prompt_ms,
+            "gen_ms_per_token": args.gen_ms,
+            "iterations": args.iterations
+        },
+        "results": results
+    }
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.save_baseline:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {baseline_path}")
+
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("backend", "mock") != args.backend:
+            print(f"\nWarning: baseline was recorded with the {baseline['meta'].get('backend', 'mock')} backend")
+        regressions = compare(results, baseline["results"], args.tolerance)
+        if regressions and args.compare:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+    elif args.compare:
+        print(f"\nNo baseline at {baseline_path}; run with --save-baseline first")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
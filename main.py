@@ -7,8 +7,14 @@ Single command to run the entire RCA Analysis application
 import uvicorn
 import threading
 import time
+import requests
 from app.api import api_app
-from app.gradio_ui import launch_gradio
+from app.config import SINGLE_SERVER, UI_PATH
+from app.gradio_ui import launch_gradio, mount_gradio
+
+
+# How long to wait for the models before giving up (first run downloads them)
+READY_TIMEOUT_SECONDS = 1800
 
 
 def run_fastapi():
@@ -21,23 +27,73 @@ def run_fastapi():
     )
 
 
+def wait_until_ready(api_thread: threading.Thread) -> dict:
+    """
+    Poll /ready until the models are loaded and warmed up
+    Returns the load timings; raises if loading failed or the server died
+    """
+    deadline = time.monotonic() + READY_TIMEOUT_SECONDS
+    while time.monotonic() < deadline:
+        if not api_thread.is_alive():
+            raise RuntimeError("FastAPI server stopped during startup")
+        try:
+            response = requests.get("http://localhost:8000/ready", timeout=2)
+            body = response.json()
+            if response.status_code == 200:
+                return body
+            if body.get("state") == "failed":
+                raise RuntimeError(f"Model loading failed: {body.get('error')}")
+        except requests.RequestException:
+            pass  # Server not listening yet
+        time.sleep(0.25)
+    raise RuntimeError(f"Models not ready after {READY_TIMEOUT_SECONDS}s")
+
+
+def run_single_server():
+    """
+    Serve the API and the Gradio UI from one uvicorn server on port 8000
+    The UI calls the session steps in-process; models load in the background
+    """
+    mount_gradio(api_app, UI_PATH)
+    
+    print("\n" + "="*60)
+    print("✅ APPLICATION STARTING (single server)")
+    print("="*60)
+    print(f"\n📱 Gradio UI: http://localhost:8000{UI_PATH}")
+    print("🔌 FastAPI Backend: http://localhost:8000")
+    print("📚 API Docs: http://localhost:8000/docs")
+    print("⏳ Model readiness: http://localhost:8000/ready")
+    print("\n" + "="*60)
+    print("Press Ctrl+C to stop the application")
+    print("="*60 + "\n")
+    
+    run_fastapi()
+
+
 def main():
     """
     Main entry point
     Starts FastAPI backend and Gradio frontend
+    (one server unless RCA_SINGLE_SERVER=0)
     """
     print("\n" + "="*60)
     print("🚀 STARTING RCA ANALYSIS APPLICATION")
     print("="*60)
     
+    if SINGLE_SERVER:
+        run_single_server()
+        return
+    
     # Start FastAPI in background thread
     print("\n[1/2] Starting FastAPI backend server...")
     api_thread = threading.Thread(target=run_fastapi, daemon=True)
     api_thread.start()
     
     # Wait for FastAPI to be ready
-    print("Waiting for FastAPI to initialize...")
-    time.sleep(5)
+    print("Waiting for FastAPI to load the models...")
+    timings = wait_until_ready(api_thread)
+    print(f"Models ready in {timings['total_seconds']:.1f}s "
+          f"(load {timings['load_seconds']:.1f}s, warm-up {sum(timings['warmup_seconds'].values()):.1f}s)")
     
     # Launch Gradio UI
     print("\n[2/2] Launching Gradio UI...")
@@ -0,0 +1,16 @@
+"""
+Shared test setup: fake models, in-memory stores and caches in a temp directory
+Set before any app module reads app.config
+"""
+
+import os
+import tempfile
+
+os.environ["RCA_BACKEND"] = "mock"
+os.environ["RCA_SESSION_STORE"] = "memory"
+os.environ["RCA_CACHE_DIR"] = tempfile.mkdtemp(prefix="rca-tests-")
+os.environ["RCA_RESPONSE_CACHE"] = "0"
+os.environ["RCA_INCIDENT_INDEX"] = "0"
+os.environ["RCA_SPECULATIVE_NEXT_QUESTION"] = "0"
+# Slow enough generation that a test can act while a step is running
+os.environ["RCA_MOCK_GEN_MS"] = "20"
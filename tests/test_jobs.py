@@ -0,0 +1,46 @@
+"""Background jobs: cancelling a step leaves its session as it was"""
+
+import copy
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("langgraph")
+
+from app import api, model_loading
+
+
+@pytest.fixture(scope="module", autouse=True)
+def loaded_models():
+    model_loading.load_model()
+
+
+def _wait(predicate, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return False
+
+
+def test_cancelled_answer_job_leaves_session_unchanged():
+    session_id = api._start_session("Checkout API returned 500 errors after a release").session_id
+    before = copy.deepcopy(api.session_store.get(session_id))
+
+    # improved_answer skips the improvement check, so the step goes on to why_asker
+    answer = "The config change was merged without review."
+    request = api.AnswerRequest(session_id=session_id, answer=answer, improved_answer=answer)
+    record = api.job_runner.submit("answer", api._answer_session, request, session_id=session_id)
+    job_id = record["job_id"]
+
+    assert _wait(lambda: api.job_runner.get(job_id)["status"] == "running")
+    api.job_runner.cancel(job_id)
+    assert _wait(lambda: job_id not in api.job_runner._futures)
+
+    assert api.job_runner.get(job_id)["status"] == "cancelled"
+    after = api.session_store.get(session_id)
+    assert after["state"] == before["state"]
+    assert after["state"]["current_question"] == before["state"]["current_question"]
+
@@ -0,0 +1,90 @@
+"""Session KV snapshots: speculative runs keep theirs aside until promoted"""
+
+from app.kv_cache import SessionStateCache
+
+
+class _Tokens(list):
+    """List with the ndarray bits kv_cache uses"""
+
+    def __getitem__(self, index):
+        item = super().__getitem__(index)
+        return _Tokens(item) if isinstance(index, slice) else item
+
+    @property
+    def nbytes(self):
+        return 4 * len(self)
+
+    def copy(self):
+        return _Tokens(self)
+
+
+class _State:
+    def __init__(self, tokens):
+        self.input_ids = _Tokens(tokens)
+        self.scores = _Tokens([0])
+        self.llama_state_size = 0
+
+
+class _Model:
+    """Just the state handling of a llama model"""
+
+    def __init__(self):
+        self.tokens = []
+
+    def save_state(self):
+        return _State(self.tokens)
+
+    def load_state(self, state):
+        self.tokens = list(state.input_ids)
+
+
+def _cache(tmp_path):
+    return SessionStateCache("test", 1 << 20, str(tmp_path))
+
+
+def test_speculative_snapshot_replaces_session_only_when_promoted(tmp_path):
+    cache, model = _cache(tmp_path), _Model()
+    model.tokens = [1, 2]
+    cache.snapshot(model, "s")
+
+    # A speculative run resumes the session and saves its state aside
+    assert cache.restore(model, "s")
+    model.tokens = [1, 2, 3]
+    cache.snapshot(model, "s.speculative-1")
+
+    other = _Model()
+    assert cache.restore(other, "s")
+    assert other.tokens == [1, 2]
+
+    assert cache.promote("s.speculative-1", "s")
+    assert cache.restore(other, "s")
+    assert other.tokens == [1, 2, 3]
+    assert cache.stats()["sessions_in_memory"] == 1
+
+
+def test_promoted_snapshot_stays_resident(tmp_path):
+    cache, model = _cache(tmp_path), _Model()
+    model.tokens = [1]
+    cache.snapshot(model, "s")
+    cache.restore(model, "s")
+    model.tokens = [1, 2]
+    cache.snapshot(model, "s.speculative-1")
+    cache.promote("s.speculative-1", "s")
+
+    # Still in the model's context: no state load
+    model.tokens = ["not reloaded"]
+    assert cache.restore(model, "s")
+    assert model.tokens == ["not reloaded"]
+
+
+def test_discarded_speculation_leaves_session_snapshot(tmp_path):
+    cache, model = _cache(tmp_path), _Model()
+    model.tokens = [1, 2]
+    cache.snapshot(model, "s")
+    model.tokens = [1, 2, 9]
+    cache.snapshot(model, "s.speculative-1")
+
+    cache.discard("s.speculative-1")
+    assert not cache.promote("s.speculative-1", "s")
+    assert cache.restore(model, "s")
+    assert model.tokens == [1, 2]
@@ -0,0 +1,57 @@
+"""Stop sequences and token caps of generator nodes"""
+
+import pytest
+
+from app import output_limits
+from app.output_limits import NODE_LIMITS, generate_for_node
+
+
+@pytest.fixture(autouse=True)
+def word_token_counts(monkeypatch):
+    # Length statistics only; no model needs to be loaded
+    monkeypatch.setattr(output_limits, "count_tokens", lambda text: len(text.split()))
+
+
+def test_output_opening_with_stop_sequence_is_regenerated(monkeypatch):
+    calls = []
+
+    def fake_generate(prompt, max_tokens=300, on_token=None, session_id=None, stop=None):
+        calls.append({"max_tokens": max_tokens, "stop": stop})
+        # With the newline stop the model's leading newline ends the output at once
+        return "" if stop else "\nWhy 2: Why was the config change not reviewed?\nWhy 3: ..."
+
+    monkeypatch.setattr(output_limits, "generate_response_extended", fake_generate)
+
+    text = generate_for_node("why_asker", "prompt")
+
+    assert text == "Why 2: Why was the config change not reviewed?"
+    assert len(calls) == 2
+    assert calls[1] == {"max_tokens": NODE_LIMITS["why_asker"]["ceiling"], "stop": None}
+
+
+def test_non_empty_output_is_not_regenerated(monkeypatch):
+    calls = []
+
+    def fake_generate(prompt, max_tokens=300, on_token=None, session_id=None, stop=None):
+        calls.append(stop)
+        return "Why 1: Why did checkout fail?"
+
+    monkeypatch.setattr(output_limits, "generate_response_extended", fake_generate)
+
+    assert generate_for_node("why_asker", "prompt") == "Why 1: Why did checkout fail?"
+    assert calls == [NODE_LIMITS["why_asker"]["stop"]]
+
+
+def test_deferred_lengths_are_recorded_only_when_committed(monkeypatch):
+    monkeypatch.setattr(output_limits, "generate_response_extended",
+                        lambda prompt, **kwargs: "Why 2: Why was the change not reviewed?")
+    samples = lambda: output_limits.output_lengths.stats()["why_asker"]["samples"]
+    before = samples()
+
+    with output_limits.deferred_lengths() as lengths:
+        generate_for_node("why_asker", "prompt")
+    assert samples() == before
+    assert len(lengths) == 1
+
+    output_limits.record_lengths(lengths)
+    assert samples() == before + 1
@@ -0,0 +1,62 @@
+"""Session stores"""
+
+import sqlite3
+import time
+
+import pytest
+
+from app.session_store import MemorySessionStore, SQLiteSessionStore, SessionConflict, serialize_session
+
+
+def test_memory_store_returns_copies():
+    store = MemorySessionStore(ttl_seconds=0, max_sessions=0)
+    session = {"state": {"why_no": 1, "whys": []}}
+    store.put("s1", session)
+
+    # Changes to a loaded or a stored dict only count once they are put
+    store.get("s1")["state"]["whys"].append({"question": "q", "answer": "a"})
+    session["state"]["why_no"] = 2
+    assert store.get("s1") == {"state": {"why_no": 1, "whys": []}}
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_put_with_stale_version_conflicts(kind, tmp_path):
+    if kind == "memory":
+        first = second = MemorySessionStore(ttl_seconds=0, max_sessions=0)
+    else:
+        # Two API workers on one database
+        path = str(tmp_path / "sessions.db")
+        first = SQLiteSessionStore(path, ttl_seconds=0, max_sessions=0)
+        second = SQLiteSessionStore(path, ttl_seconds=0, max_sessions=0)
+    first.put("s1", {"state": {"why_no": 1}})
+
+    session_a, version_a = first.get_with_version("s1")
+    session_b, version_b = second.get_with_version("s1")
+    assert version_a == version_b
+
+    session_a["state"]["why_no"] = 2
+    first.put("s1", session_a, version=version_a)
+    session_b["state"]["why_no"] = 3
+    with pytest.raises(SessionConflict):
+        second.put("s1", session_b, version=version_b)
+
+    assert second.get("s1") == {"state": {"why_no": 2}}
+    assert second.get_with_version("s1")[1] == version_a + 1
+
+
+def test_sqlite_store_adds_version_to_existing_database(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        """CREATE TABLE sessions (session_id TEXT PRIMARY KEY, data BLOB NOT NULL,
+           completed INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, last_access REAL NOT NULL)"""
+    )
+    conn.execute("INSERT INTO sessions VALUES (?, ?, 0, ?, ?)",
+                 ("s1", serialize_session({"state": {}}), time.time(), time.time()))
+    conn.commit()
+    conn.close()
+
+    store = SQLiteSessionStore(path, ttl_seconds=0, max_sessions=0)
+    session, version = store.get_with_version("s1")
+    store.put("s1", session, version=version)
+    assert store.get_with_version("s1") == ({"state": {}}, version + 1)
@@ -0,0 +1,54 @@
+"""Speculative next questions resume the session's KV snapshot"""
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("fastapi")
+pytest.importorskip("langgraph")
+
+from app import api, model_loading
+
+
+ANSWERS = [
+    "The new release changed the database connection pool size from 50 to 5.",
+    "The config change was merged without anyone comparing it against production.",
+    "The deployment pipeline has no step that diffs configuration between releases.",
+    "There is no review process for configuration changes."
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def loaded_models():
+    model_loading.load_model()
+
+
+def _kv_stats():
+    return model_loading.backend.session_kv_cache.stats()
+
+
+def test_why_questions_resume_session_snapshot_with_speculation(monkeypatch):
+    monkeypatch.setattr(api, "SPECULATIVE_NEXT_QUESTION", True)
+    committed = []
+    commit = api._commit_speculation
+
+    def recording_commit(*args, **kwargs):
+        committed.append(commit(*args, **kwargs))
+        return committed[-1]
+
+    monkeypatch.setattr(api, "_commit_speculation", recording_commit)
+
+    session_id = api._start_session("Checkout API returned 500 errors after a release").session_id
+    # Why 1 had no snapshot to resume
+    misses = _kv_stats()["misses"]
+
+    for answer in ANSWERS:
+        hits = _kv_stats()["hits"]
+        request = api.AnswerRequest(session_id=session_id, answer=answer, improved_answer=answer)
+        response = api._answer_session(request)
+        if response.root_cause_extracted:
+            break
+        assert _kv_stats()["hits"] > hits
+        assert _kv_stats()["misses"] == misses
+
+    # The questions came from committed speculative runs
+    assert committed and all(state is not None for state in committed)
@@ -0,0 +1,45 @@
+"""Grammar-constrained validator output fits its token cap and parses"""
+
+from app.helpers import parse_constrained_validation
+from app.model_loading import constrained_max_tokens
+from app.prompt_definitions import (
+    COMBINED_VALIDATION_GRAMMAR,
+    SUGGESTION_MAX_CHARS,
+    SYSTEMATIC_CHECK_GRAMMAR,
+    VALIDATION_GRAMMAR
+)
+
+
+def _longest_output(systematic: bool) -> str:
+    suggestion = ("Name the service and the change involved. " * 10)[:SUGGESTION_MAX_CHARS]
+    text = f"Specificity: 2\nRelevance: 3\nNeeds Improvement: yes\nSuggestion: {suggestion}"
+    if systematic:
+        text += "\nSystematic: yes"
+    return text
+
+
+def test_suggestion_is_bounded_in_grammars():
+    for grammar in (VALIDATION_GRAMMAR, COMBINED_VALIDATION_GRAMMAR):
+        assert f"[^\\n]{{1,{SUGGESTION_MAX_CHARS}}}" in grammar
+
+
+def test_longest_output_fits_cap_and_parses():
+    for grammar, systematic in ((VALIDATION_GRAMMAR, False), (COMBINED_VALIDATION_GRAMMAR, True)):
+        text = _longest_output(systematic)
+        # Every token of this output covers at least one character
+        assert len(text) < constrained_max_tokens(grammar)
+
+        result = parse_constrained_validation(text)
+        assert result is not None
+        assert result["needs_improvement"] is True
+        assert len(result["suggestion"]) == SUGGESTION_MAX_CHARS
+        assert result["systematic"] is (True if systematic else None)
+
+
+def test_output_cut_at_cap_would_not_parse():
+    # The reason for the bound: losing the last line makes the strict parse fail
+    assert parse_constrained_validation(_longest_output(True)[:-5]) is None
+
+
+def test_systematic_cap():
+    assert len("Systematic: yes") < constrained_max_tokens(SYSTEMATIC_CHECK_GRAMMAR)